@@ -2,25 +2,306 @@ import discord
 from discord.ext import commands, tasks
 from discord.ui import View, Button, Modal, TextInput
 import os
+import sys
 import math
 import json
+import pickle
 import random
+import time
 import asyncio
-from typing import Dict, List, Any  # Import Any for type hinting
-from supabase import create_client, Client
+import heapq
+import itertools
+import contextvars
+from typing import Dict, List, Any, Optional  # Import Any for type hinting
 from cachetools import TTLCache
 import re
-from collections import deque
+import hashlib
+import secrets
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
-# --- Supabase Setup ---
-url: str = os.getenv("SUPABASE_URL")
-print("Supabase URL:", url)  # Print the URL for debugging
-key: str = os.getenv("SUPABASE_KEY")
-
-supabase: Client = create_client(url, key)
+# --- Storage Setup ---
+# STORAGE_BACKEND selects where persistent data lives: "supabase" (default)
+# or "sqlite" for a local file at SQLITE_STORE_PATH (offline runs, load tests, CI).
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "supabase").lower()
+SQLITE_STORE_PATH = os.getenv("SQLITE_STORE_PATH", "moonlight.db")
+
+# Both clients are synchronous, so every request runs on a bounded
+# thread pool instead of blocking the gateway loop.
+DB_MAX_WORKERS = int(os.getenv("DB_MAX_WORKERS", 8))
+DB_CALL_TIMEOUT = float(os.getenv("DB_CALL_TIMEOUT", 10))
+db_executor = ThreadPoolExecutor(max_workers=DB_MAX_WORKERS, thread_name_prefix="storage")
+
+# Run a blocking storage request on the db executor
+async def run_db(request, timeout: float = DB_CALL_TIMEOUT):
+    """Runs `request` (a zero-argument callable) off the event loop."""
+    loop = asyncio.get_running_loop()
+    return await asyncio.wait_for(loop.run_in_executor(db_executor, request), timeout)
+
+class StorageBackend(ABC):
+    """Everything the bot needs from a database. Rows are plain dicts."""
+
+    @abstractmethod
+    async def read_page(self, table_name: str, columns: str, order_by: str, start: int, stop: int,
+                        since: Optional[str] = None, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Rows `start`..`stop` (inclusive) ordered by `order_by`, optionally only those updated after `since`.
+
+        `filters` maps column names to values the rows must equal.
+        """
+
+    @abstractmethod
+    async def select_one(self, table_name: str, column: str, value: Any,
+                         filters: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def insert(self, table_name: str, row: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    async def update(self, table_name: str, row: Dict[str, Any], column: str = 'user_id') -> None:
+        ...
+
+    @abstractmethod
+    async def bulk_upsert(self, table_name: str, rows: List[Dict[str, Any]], on_conflict: str) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, table_name: str, column: Optional[str] = None, value: Any = None) -> None:
+        """Deletes rows where `column` equals `value`, or every row when `column` is None."""
+
+class SupabaseBackend(StorageBackend):
+    def __init__(self, url: str, key: str):
+        from supabase import create_client
+        self.client = create_client(url, key)
+
+    async def read_page(self, table_name, columns, order_by, start, stop, since=None, filters=None):
+        def request():
+            query = self.client.table(table_name).select(columns)
+            if since:
+                query = query.gt('updated_at', since)
+            for column, value in (filters or {}).items():
+                query = query.eq(column, value)
+            return query.order(order_by).range(start, stop).execute()
+        return (await run_db(request)).data
+
+    async def select_one(self, table_name, column, value, filters=None):
+        def request():
+            query = self.client.table(table_name).select("*").eq(column, value)
+            for key, match in (filters or {}).items():
+                query = query.eq(key, match)
+            return query.limit(1).execute()
+        response = await run_db(request)
+        return response.data[0] if response.data else None
+
+    async def insert(self, table_name, row):
+        await run_db(lambda: self.client.table(table_name).insert(row).execute())
+
+    async def update(self, table_name, row, column='user_id'):
+        await run_db(lambda: self.client.table(table_name).update(row).eq(column, row.get(column)).execute())
+
+    async def bulk_upsert(self, table_name, rows, on_conflict):
+        await run_db(lambda: self.client.table(table_name).upsert(rows, on_conflict=on_conflict).execute())
+
+    async def delete(self, table_name, column=None, value=None):
+        def request():
+            query = self.client.table(table_name).delete()
+            # PostgREST refuses an unfiltered delete
+            query = query.eq(column, value) if column else query.neq('id', 0)
+            return query.execute()
+        await run_db(request)
+
+class SQLiteBackend(StorageBackend):
+    """Local single-file store. Each table keeps JSON rows keyed by their primary key."""
+
+    def __init__(self, path: str):
+        self.db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.lock = threading.Lock()
+        self.tables = set()
+
+    def _table(self, table_name: str) -> str:
+        if table_name not in self.tables:
+            self.db.execute(f'''CREATE TABLE IF NOT EXISTS "{table_name}" (
+                pk TEXT PRIMARY KEY, row TEXT NOT NULL, updated_at TEXT NOT NULL)''')
+            self.db.execute(f'''CREATE INDEX IF NOT EXISTS "{table_name}_updated_at" ON "{table_name}" (updated_at)''')
+            if table_name in GUILD_TABLES and DEFAULT_GUILD_ID:
+                # Rows from before guild partitioning belong to DEFAULT_GUILD_ID
+                self.db.execute(f'''UPDATE "{table_name}" SET pk = ? || ':' || pk, row = json_set(row, '$.guild_id', ?)
+                    WHERE json_extract(row, '$.guild_id') IS NULL''', (str(DEFAULT_GUILD_ID), DEFAULT_GUILD_ID))
+            self.tables.add(table_name)
+        return f'"{table_name}"'
+
+    @staticmethod
+    def _pk(row: Dict[str, Any], column: Optional[str] = None) -> str:
+        if column is None:
+            column = GUILD_KEY if 'guild_id' in row and 'user_id' in row else ('user_id' if 'user_id' in row else 'id')
+        return row_key(row, column)
+
+    def _run(self, fn):
+        def locked():
+            with self.lock:
+                return fn()
+        return run_db(locked)
+
+    def _write(self, table_name: str, rows: List[Dict[str, Any]], column: Optional[str] = None, merge: bool = True):
+        table = self._table(table_name)
+        now = datetime.now(timezone.utc).isoformat()
+        self.db.execute("BEGIN")
+        try:
+            for row in rows:
+                pk = self._pk(row, column)
+                existing = self.db.execute(f"SELECT row FROM {table} WHERE pk = ?", (pk,)).fetchone()
+                merged = {**json.loads(existing[0]), **row} if existing and merge else dict(row)
+                merged['updated_at'] = now
+                self.db.execute(f"INSERT OR REPLACE INTO {table} (pk, row, updated_at) VALUES (?, ?, ?)",
+                                (pk, json.dumps(merged), now))
+            self.db.execute("COMMIT")
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _where(filters: Optional[Dict[str, Any]], since: Optional[str] = None):
+        clauses, params = (["updated_at > ?"], [since]) if since else ([], [])
+        for column, value in (filters or {}).items():
+            clauses.append("json_extract(row, ?) = ?")
+            params += [f"$.{column}", value]
+        return ("WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    async def read_page(self, table_name, columns, order_by, start, stop, since=None, filters=None):
+        def request():
+            table = self._table(table_name)
+            where, params = self._where(filters, since)
+            cursor = self.db.execute(
+                f"SELECT row FROM {table} {where} ORDER BY json_extract(row, ?) LIMIT ? OFFSET ?",
+                params + [f"$.{order_by}", stop - start + 1, start])
+            rows = [json.loads(item[0]) for item in cursor]
+            if columns != "*":
+                wanted = [column.strip() for column in columns.split(",")]
+                rows = [{column: row.get(column) for column in wanted} for row in rows]
+            return rows
+        return await self._run(request)
+
+    async def select_one(self, table_name, column, value, filters=None):
+        def request():
+            where, params = self._where({column: value, **(filters or {})})
+            cursor = self.db.execute(f"SELECT row FROM {self._table(table_name)} {where} LIMIT 1", params)
+            item = cursor.fetchone()
+            return json.loads(item[0]) if item else None
+        return await self._run(request)
+
+    async def insert(self, table_name, row):
+        await self._run(lambda: self._write(table_name, [row], merge=False))
+
+    async def update(self, table_name, row, column='user_id'):
+        await self._run(lambda: self._write(table_name, [row], column))
+
+    async def bulk_upsert(self, table_name, rows, on_conflict):
+        await self._run(lambda: self._write(table_name, rows, on_conflict))
+
+    async def delete(self, table_name, column=None, value=None):
+        def request():
+            table = self._table(table_name)
+            if column:
+                self.db.execute(f"DELETE FROM {table} WHERE json_extract(row, ?) = ?", (f"$.{column}", value))
+            else:
+                self.db.execute(f"DELETE FROM {table}")
+        await self._run(request)
+
+def create_storage_backend() -> StorageBackend:
+    if STORAGE_BACKEND == "sqlite":
+        print("Storage: SQLite at", SQLITE_STORE_PATH)
+        return SQLiteBackend(SQLITE_STORE_PATH)
+    if STORAGE_BACKEND != "supabase":
+        raise ValueError(f"Unknown STORAGE_BACKEND {STORAGE_BACKEND!r}, expected 'supabase' or 'sqlite'")
+    return SupabaseBackend(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+
+# Per-guild tables: each guild keeps its own economy, keyed by (guild_id, user_id).
+# On Supabase run migrations/001_guild_partition.sql first; the bot checks for it on startup.
+# DEFAULT_GUILD_ID (required to run the bot) is the guild that owns rows written
+# before partitioning, uses HUNT_CHANNEL_ID / ALLOWED_CHANNEL_IDS, and serves DMs.
+GUILD_TABLES = ('coin_data', 'player_data')
+GUILD_KEY = 'guild_id,user_id'
+DEFAULT_GUILD_ID = int(os.getenv("DEFAULT_GUILD_ID", 0))
+
+def row_key(row: Dict[str, Any], on_conflict: str = GUILD_KEY) -> str:
+    """The conflict key of `row` as one string, e.g. "guild:user" for GUILD_KEY."""
+    return ":".join(str(row[column]) for column in on_conflict.split(","))
+
+storage: StorageBackend = None  # Opened by open_storage() when the bot starts
+
+# Write-behind: upserts to these tables are coalesced per (table, user_id)
+# and flushed every WRITE_BEHIND_INTERVAL seconds or at WRITE_BEHIND_MAX_ROWS.
+WRITE_BEHIND_TABLES = ('player_data', 'coin_data')
+WRITE_BEHIND_INTERVAL = float(os.getenv("WRITE_BEHIND_INTERVAL", 5))
+WRITE_BEHIND_MAX_ROWS = int(os.getenv("WRITE_BEHIND_MAX_ROWS", 200))
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", 500))
+# Failed writes wait in a bounded retry queue with jittered exponential backoff
+RETRY_QUEUE_MAX = int(os.getenv("RETRY_QUEUE_MAX", 5000))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", 1))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", 300))
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", 12))
+
+# Local write-ahead journal: every buffered write is appended here before
+# save_data returns, and removed once the database has acknowledged it.
+JOURNAL_PATH = os.getenv("JOURNAL_PATH", "journal.db")
+journal: sqlite3.Connection = None  # Opened by open_storage() when the bot starts
+
+def migrate_journal() -> None:
+    """Keys entries from before guild partitioning, which only have a user id, to DEFAULT_GUILD_ID."""
+    journal.execute("""UPDATE journal SET user_id = ? || ':' || user_id, row = json_set(row, '$.guild_id', ?)
+        WHERE instr(user_id, ':') = 0""", (str(DEFAULT_GUILD_ID), DEFAULT_GUILD_ID))
+
+async def check_guild_tables() -> Optional[str]:
+    """Returns why the per-guild tables can't be used, or None if they can.
+
+    Reads a row by guild_id and writes it back unchanged on the (guild_id, user_id)
+    key, which fails on a table that hasn't been migrated.
+    """
+    for table_name in GUILD_TABLES:
+        try:
+            rows = await storage.read_page(table_name, "*", 'user_id', 0, 0, filters={'guild_id': DEFAULT_GUILD_ID})
+            # Postgres checks the conflict key even when there is no row to write
+            await storage.bulk_upsert(table_name, rows, GUILD_KEY)
+        except Exception as e:
+            return f"{table_name} has no guild_id column or ({GUILD_KEY}) key: {e!r}"
+    return None
+
+def open_storage() -> None:
+    """Connects the storage backend and opens the journal.
+
+    Called just before the bot runs, so the offline tools don't create database files.
+    """
+    global storage, journal
+    storage = create_storage_backend()
+    journal = sqlite3.connect(JOURNAL_PATH, isolation_level=None)
+    journal.execute("PRAGMA journal_mode=WAL")
+    journal.execute("PRAGMA synchronous=NORMAL")
+    journal.execute("""CREATE TABLE IF NOT EXISTS journal (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT NOT NULL,
+        user_id TEXT NOT NULL,
+        row TEXT NOT NULL
+    )""")
+    migrate_journal()
+
+
+# Local snapshot of the in-memory game state, so restarts only need the delta from storage
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", "state_snapshot.pkl")
+SNAPSHOT_INTERVAL = float(os.getenv("SNAPSHOT_INTERVAL", 60))
+SNAPSHOT_VERSION = 3
+GAME_STATE_TABLE = os.getenv("GAME_STATE_TABLE", "game_state")
+WEATHER_STATE_VERSION = 2
+WEATHER_SEED = os.getenv("WEATHER_SEED") or secrets.token_hex(8)  # Seeds a new timeline; a saved one keeps its seed
+FORECAST_SPELLS = int(os.getenv("FORECAST_SPELLS", 6))  # Spells shown by !forecast and generated ahead
 
 
 # --- Important ---
@@ -39,7 +320,14 @@ intents.messages = True
 intents.guilds = True
 intents.members = True
 intents.message_content = True
-bot = commands.Bot(command_prefix='!', 
+class MoonlightBot(commands.Bot):
+    async def close(self):
+        # Push buffered writes before the connection goes away
+        await flush_write_buffer()
+        await save_snapshot()
+        await super().close()
+
+bot = MoonlightBot(command_prefix='!', 
                    intents=intents,
                    case_insensitive=True,
                    help_command=None)
@@ -52,8 +340,14 @@ async def on_message(message):
     if message.author == bot.user:
         return
     
+    ctx = await bot.get_context(message)
+    if ctx.valid and not message.author.bot:
+        # Commands run in the game of their guild; DMs use the default guild's
+        guild_id = message.guild.id if message.guild else DEFAULT_GUILD_ID
+        if guild_id:
+            use_game(await get_game(guild_id))
     # Process all messages through the regular command system
-    await bot.process_commands(message)
+    await bot.invoke(ctx)
 # --- Allowed Channel IDs ---
 INFINITY_THRESHOLD = 9999999999999
 NEGATIVE_INFINITY_THRESHOLD = -9999999999999
@@ -61,13 +355,18 @@ NEGATIVE_INFINITY_THRESHOLD = -9999999999999
 # Load channel IDs from environment variables
 ALLOWED_CHANNEL_IDS = [int(os.getenv("ALLOWED_CHANNEL_IDS", 0))]
 HUNT_CHANNEL_ID = int(os.getenv("HUNT_CHANNEL_ID", 0))
+# Channels of every other guild, as JSON: {"<guild id>": {"hunt": <channel id>, "allowed": [<channel id>, ...]}}.
+# DEFAULT_GUILD_ID uses HUNT_CHANNEL_ID and ALLOWED_CHANNEL_IDS unless it is listed here.
+GUILD_CHANNELS = {int(guild_id): channels for guild_id, channels in json.loads(os.getenv("GUILD_CHANNELS", "{}")).items()}
 NOTIFICATION_CHANNEL_ID = int(os.getenv("NOTIFICATION_CHANNEL_ID", 0))
 ITEMS_PER_PAGE = 10
 # --- Admin Role ID ---
 ADMIN_ROLE_ID = int(os.getenv("ADMIN_ROLE_ID", 0))
 
+HUNT_COOLDOWN = 10
+HUNT_BATCH_MAX = int(os.getenv("HUNT_BATCH_MAX", 10))  # most hunts one `!hunt N` can run
 hunt_cooldown = commands.CooldownMapping.from_cooldown(
-    1, 10, commands.BucketType.user)  
+    1, HUNT_COOLDOWN, commands.BucketType.member)  
 
 # --- Weather and Storm System Variables ---
 REGULAR_WEATHER_DURATION = 900  # 15 minutes for regular weather
@@ -120,83 +419,388 @@ WEATHER_EMOJIS = {
     "Super Storm": "🌪️",
     "Blizzard": "🧊"  
 }
-current_weather = "Sunny"  # Initial weather
-weather_end_time = asyncio.get_event_loop().time() + REGULAR_WEATHER_DURATION
-weather_task = None  # Task for managing the current weather cycle
-blizzard_task = None # Task for managing blizzard cycles
 storm_active = False
 storm_warning_active = False
-storm_warned_users: Dict[int, float] = {}
-camp_users_lock = asyncio.Lock()
-camp_users: Dict[str, Any] = {}
-last_weathers = [] 
 bioweather_uses = 0
 bioweather_lock = asyncio.Lock() 
 chaos_active = False
-blizzard_event = asyncio.Event()
-blizzard_active = asyncio.Event() 
 manual_weather_active = False 
 current_chaos_task: asyncio.Task = None
-current_sub_weather = None
-last_weathers = deque(maxlen=5)
 markets = []
-player_data: Dict[str, Any] = {} 
-coin_data: Dict[str, int] = {}  
 user_cache = TTLCache(maxsize=100, ttl=600) 
+dirty_rows: Dict[tuple, Dict[str, Any]] = {}  # (table, "guild_id:user_id") -> latest row
+dirty_seqs: Dict[tuple, int] = {}  # (table, "guild_id:user_id") -> newest journal seq in dirty_rows
+write_buffer_lock = asyncio.Lock()
+size_flush_task: asyncio.Task = None
 stats_messages: Dict[int, discord.Message] = {}
 def log_admin_command(user, command):
     with open('admin_logs.txt', 'a') as f:
         f.write(f"[{user}] : {command}\n")
 
 # Save and Load data
-async def load_data(table_name: str) -> List[Dict[str, Any]]:
+LOAD_PAGE_SIZE = int(os.getenv("LOAD_PAGE_SIZE", 1000))  # keep at or below the PostgREST max-rows setting
+COIN_COLUMNS = "guild_id,user_id,coins,updated_at"
+TRANSACTION_COLUMNS = "id,buyer,seller,market_id,status,updated_at"
+
+async def iter_table(table_name: str, columns: str = "*", order_by: str = 'user_id',
+                     page_size: int = LOAD_PAGE_SIZE, since: str = None, filters: Dict[str, Any] = None):
+    """Yields the rows of a table page by page using range requests, ordered by `order_by`.
+
+    With `since`, only rows whose updated_at is newer are returned; `filters` keeps rows with matching columns.
+    """
+    start = 0
+    while True:
+        rows = await storage.read_page(table_name, columns, order_by, start, start + page_size - 1, since, filters)
+        for row in rows:
+            yield row
+        if len(rows) < page_size:
+            return
+        start += page_size
+
+async def load_data(table_name: str, columns: str = "*", order_by: str = 'user_id') -> List[Dict[str, Any]]:
     try:
-        response = supabase.table(table_name).select("*").execute()
-        return response.data
+        return [row async for row in iter_table(table_name, columns, order_by)]
     except Exception as e:
-        print(f"Error loading data from {table_name}: {e}")
+        print(f"Error loading data from {table_name}: {e!r}")
         return [] 
 
+# --- Build the full row that gets sent for a table ---
+def build_complete_row(table_name: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    if table_name == 'player_data':
+        user_id = data.get('user_id')
+        # Always get the complete data from player_data 
+        complete_data = game().player_data.get(str(user_id), {}).copy()
+        complete_data.update(data)  # Update with provided changes
+        complete_data['guild_id'] = game().guild_id
+    elif table_name == 'coin_data':
+        complete_data = {
+            'guild_id': game().guild_id,
+            'user_id': data.get('user_id'),
+            'coins': data.get('coins', 10)  # Default coins to 10
+        }
+    elif table_name == 'markets':
+        complete_data = {
+            'id': data.get('id'),
+            'name': data.get('name'),
+            'description': data.get('description'),
+            'cost': data.get('cost'),
+            'seller': data.get('seller')
+        }
+    elif table_name == 'transactions':
+        complete_data = {
+            'id': data.get('id'),
+            'buyer': data.get('buyer'),
+            'seller': data.get('seller'),
+            'market_id': data.get('market_id'),
+            'status': data.get('status', 'pending') # Default status
+        }
+    else:
+        complete_data = data  # For any other tables, use the provided data
+    return complete_data
+
 # --- Modified save_data to send all columns ---
 async def save_data(table_name: str, data: Dict[str, Any], upsert=False) -> None:
     try:
-        # Create complete data dictionaries for each table
-        if table_name == 'player_data':
-            user_id = data.get('user_id')
-            # Always get the complete data from player_data 
-            complete_data = player_data.get(str(user_id), {}).copy()
-            complete_data.update(data)  # Update with provided changes
-        elif table_name == 'coin_data':
-            complete_data = {
-                'user_id': data.get('user_id'),
-                'coins': data.get('coins', 10)  # Default coins to 10
-            }
-        elif table_name == 'markets':
-            complete_data = {
-                'id': data.get('id'),
-                'name': data.get('name'),
-                'description': data.get('description'),
-                'cost': data.get('cost'),
-                'seller': data.get('seller')
-            }
-        elif table_name == 'transactions':
-            complete_data = {
-                'id': data.get('id'),
-                'buyer': data.get('buyer'),
-                'seller': data.get('seller'),
-                'market_id': data.get('market_id'),
-                'status': data.get('status', 'pending') # Default status
-            }
-        else:
-            complete_data = data  # For any other tables, use the provided data
+        complete_data = build_complete_row(table_name, data)
 
+        if upsert and table_name in WRITE_BEHIND_TABLES:
+            mark_dirty(table_name, complete_data)
+            return
         if upsert:
-            response = supabase.table(table_name).update(complete_data).eq('user_id', data.get('user_id')).execute()
+            await storage.update(table_name, complete_data)
         else:
-            response = supabase.table(table_name).insert(complete_data).execute()
-        print(f"Data saved to {table_name}: {response}")
+            await storage.insert(table_name, complete_data)
+        print(f"Data saved to {table_name}")
     except Exception as e:
-        print(f"Error saving data to {table_name}: {e}")
+        print(f"Error saving data to {table_name}: {e!r}")
+        on_conflict = GUILD_KEY if table_name in GUILD_TABLES else ('user_id' if 'user_id' in complete_data else 'id')
+        if all(complete_data.get(column) is not None for column in on_conflict.split(",")):
+            # Retried as an upsert on the row's key, so a late duplicate is harmless
+            retry_queue.push(table_name, complete_data, on_conflict, error=e)
+
+# --- Bulk upsert ---
+async def save_data_bulk(table_name: str, rows: List[Dict[str, Any]], on_conflict: str = GUILD_KEY,
+                         chunk_size: int = BULK_CHUNK_SIZE, build: bool = True) -> List[Dict[str, Any]]:
+    """Upserts `rows` in chunks of `chunk_size`, one request per chunk.
+
+    Returns one result per chunk: {'rows': [...], 'ok': bool, 'error': str or None, 'transient': bool},
+    so callers can retry just the rows in failed chunks (see `failed_rows`). Pass build=False for rows
+    that are already complete, such as buffered ones, which may come from any guild.
+    """
+    complete_rows = [build_complete_row(table_name, row) for row in rows] if build else rows
+    results = []
+    for start in range(0, len(complete_rows), chunk_size):
+        chunk = complete_rows[start:start + chunk_size]
+        try:
+            await storage.bulk_upsert(table_name, chunk, on_conflict)
+            results.append({'rows': chunk, 'ok': True, 'error': None, 'transient': False})
+        except Exception as e:
+            print(f"Error upserting {len(chunk)} rows into {table_name}: {e!r}")
+            results.append({'rows': chunk, 'ok': False, 'error': repr(e), 'transient': is_transient_error(e)})
+    return results
+
+def failed_rows(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [row for result in results if not result['ok'] for row in result['rows']]
+
+# --- Retry Queue ---
+def is_transient_error(error: Exception) -> bool:
+    """True for errors worth retrying: timeouts, connection failures, 429 and 5xx responses."""
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError, OSError)):
+        return True
+    response = getattr(error, 'response', None)
+    status = getattr(response, 'status_code', None) or getattr(error, 'status', None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    # PostgREST errors carry a Postgres SQLSTATE such as '23505' for bad data
+    code = getattr(error, 'code', None)
+    return not (isinstance(code, str) and code[:2].isdigit())
+
+class RetryQueue:
+    """Failed writes waiting for another attempt, one entry per (table, key).
+
+    A newer write for a row that is already queued replaces the queued version
+    instead of adding a second entry. Every entry carries an idempotency key
+    (table, row key, journal seq), and is retried as an upsert of the full row,
+    so repeating an attempt that actually landed changes nothing.
+    """
+
+    def __init__(self, max_size: int = RETRY_QUEUE_MAX):
+        self.max_size = max_size
+        self.entries: Dict[tuple, Dict[str, Any]] = {}
+        self.wakeup = asyncio.Event()
+        self.task: asyncio.Task = None
+        self.counters = {'queued': 0, 'coalesced': 0, 'retried': 0, 'succeeded': 0, 'dropped': 0, 'overflow': 0}
+
+    def __contains__(self, key: tuple) -> bool:
+        return key in self.entries
+
+    def push(self, table_name: str, row: Dict[str, Any], on_conflict: str = GUILD_KEY,
+             seq: int = 0, error: Exception = None) -> bool:
+        key = (table_name, row_key(row, on_conflict))
+        now = time.monotonic()
+        entry = self.entries.get(key)
+        if entry:
+            entry['row'] = {**entry['row'], **row}
+            entry['seq'] = max(entry['seq'], seq)
+            self.counters['coalesced'] += 1
+        elif len(self.entries) >= self.max_size:
+            # Journaled rows are still replayed on the next start
+            self.counters['overflow'] += 1
+            print(f"Retry queue full, not queueing {key}")
+            return False
+        else:
+            self.entries[key] = {
+                'table': table_name, 'row': dict(row), 'on_conflict': on_conflict, 'seq': seq,
+                'attempts': 0, 'first_failed_at': now, 'next_at': now + self.backoff(0),
+            }
+            self.counters['queued'] += 1
+        if error is not None and not is_transient_error(error):
+            print(f"Non-transient error for {key}: {error!r}")
+        self.wakeup.set()
+        return True
+
+    def align(self, keys: List[tuple]) -> None:
+        """Makes the queued entries for `keys` come due together, so they are retried in one request."""
+        entries = [self.entries[key] for key in keys if key in self.entries]
+        if entries:
+            next_at = min(entry['next_at'] for entry in entries)
+            for entry in entries:
+                entry['next_at'] = next_at
+
+    @staticmethod
+    def backoff(attempts: int) -> float:
+        # Full jitter keeps many failed rows from retrying in lockstep
+        return random.uniform(0.5, 1.0) * min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempts)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        oldest = min((entry['first_failed_at'] for entry in self.entries.values()), default=now)
+        return {'depth': len(self.entries), 'oldest_age': now - oldest, **self.counters}
+
+    def start(self) -> None:
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    async def run(self) -> None:
+        while True:
+            if not self.entries:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+            delay = min(entry['next_at'] for entry in self.entries.values()) - time.monotonic()
+            if delay > 0:
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self.retry_due()
+
+    async def retry_due(self) -> None:
+        now = time.monotonic()
+        due = [(key, entry) for key, entry in self.entries.items() if entry['next_at'] <= now]
+        groups: Dict[tuple, list] = {}
+        for key, entry in due:
+            groups.setdefault((entry['table'], entry['on_conflict']), []).append((key, entry))
+        for (table_name, on_conflict), items in groups.items():
+            snapshot = [(key, dict(entry['row']), entry['seq']) for key, entry in items]
+            self.counters['retried'] += len(snapshot)
+            try:
+                await storage.bulk_upsert(table_name, [row for _, row, _ in snapshot], on_conflict)
+                error = None
+            except Exception as e:
+                error = e
+            for key, row, seq in snapshot:
+                entry = self.entries.get(key)
+                if error is None:
+                    self.counters['succeeded'] += 1
+                    if seq:
+                        journal_ack([(table_name, key[1], seq)])
+                    # A newer version may have been pushed while we were writing
+                    if entry is not None and entry['seq'] <= seq and entry['row'] == row:
+                        del self.entries[key]
+                    continue
+                entry['attempts'] += 1
+                if entry['attempts'] >= RETRY_MAX_ATTEMPTS or not is_transient_error(error):
+                    print(f"Giving up on {key} after {entry['attempts']} attempts: {error!r}")
+                    self.counters['dropped'] += 1
+                    del self.entries[key]
+                else:
+                    entry['next_at'] = time.monotonic() + self.backoff(entry['attempts'])
+            if error is not None:
+                print(f"Retry of {len(snapshot)} rows in {table_name} failed: {error!r}")
+
+retry_queue = RetryQueue()
+
+# --- Coin Transfers ---
+coin_transfer_lock = asyncio.Lock()
+
+async def transfer_coins(payer_id: str, payee_id: str, amount: int) -> Optional[Dict[str, int]]:
+    """Moves `amount` coins from payer to payee and persists both legs in one request.
+
+    Returns the before/after balances of both sides, or None if the payer can't afford it.
+    """
+    async with coin_transfer_lock:
+        payer_before = game().coin_data.get(payer_id, 0)
+        payee_before = game().coin_data.get(payee_id, 0)
+        if payer_before < amount and payer_before < INFINITY_THRESHOLD:
+            return None
+        if payer_id == payee_id:
+            # Paying yourself moves nothing; writing both legs would mint `amount` coins
+            return {'payer_before': payer_before, 'payer_after': payer_before,
+                    'payee_before': payee_before, 'payee_after': payee_before}
+        game().coin_data[payer_id] = subtract_with_infinity(payer_before, amount)
+        game().coin_data[payee_id] = add_with_infinity(payee_before, amount)
+        rows = [{'guild_id': game().guild_id, 'user_id': int(payer_id), 'coins': game().coin_data[payer_id]},
+                {'guild_id': game().guild_id, 'user_id': int(payee_id), 'coins': game().coin_data[payee_id]}]
+        # Both legs are journaled in one transaction and buffered together
+        seqs = journal_append_many([('coin_data', row) for row in rows])
+        for row, seq in zip(rows, seqs):
+            mark_dirty('coin_data', row, seq=seq)
+        result = {'payer_before': payer_before, 'payer_after': game().coin_data[payer_id],
+                  'payee_before': payee_before, 'payee_after': game().coin_data[payee_id]}
+    await flush_write_buffer([('coin_data', row_key(row)) for row in rows], together=True)
+    return result
+
+# --- Write-Ahead Journal ---
+def journal_append(table_name: str, row: Dict[str, Any]) -> int:
+    cursor = journal.execute("INSERT INTO journal (table_name, user_id, row) VALUES (?, ?, ?)",
+                             (table_name, row_key(row), json.dumps(row)))
+    return cursor.lastrowid
+
+def journal_append_many(rows: List[tuple]) -> List[int]:
+    """Appends several (table, row) entries in one transaction, so they survive a crash together."""
+    journal.execute("BEGIN")
+    try:
+        seqs = [journal_append(table_name, row) for table_name, row in rows]
+        journal.execute("COMMIT")
+    except Exception:
+        journal.execute("ROLLBACK")
+        raise
+    return seqs
+
+def journal_ack(entries: List[tuple]) -> None:
+    """Drops journal entries the database has stored. `entries` is a list of (table, "guild_id:user_id", seq)."""
+    journal.executemany("DELETE FROM journal WHERE table_name = ? AND user_id = ? AND seq <= ?", entries)
+
+def replay_journal() -> int:
+    """Applies the game's unacknowledged journal entries on top of its loaded tables and re-buffers them."""
+    pending: Dict[tuple, tuple] = {}
+    for seq, table_name, key, row in journal.execute(
+            "SELECT seq, table_name, user_id, row FROM journal WHERE user_id LIKE ? ORDER BY seq",
+            (f"{game().guild_id}:%",)):
+        _, merged = pending.get((table_name, key), (0, {}))
+        pending[(table_name, key)] = (seq, {**merged, **json.loads(row)})
+    for (table_name, _), (seq, row) in pending.items():
+        user_id = str(row['user_id'])
+        if table_name == 'coin_data':
+            game().coin_data[user_id] = row['coins']
+        elif table_name == 'player_data':
+            register_player(user_id, {**game().player_data.get(user_id, {}), **row})
+        mark_dirty(table_name, row, seq=seq)
+    return len(pending)
+
+# --- Write-Behind Buffer ---
+def mark_dirty(table_name: str, row: Dict[str, Any], seq: int = None) -> None:
+    """Journals and buffers the latest version of a row; later calls for the same user overwrite earlier ones."""
+    global size_flush_task
+    key = (table_name, row_key(row))
+    if seq is None:
+        seq = journal_append(table_name, row)
+    dirty_rows.setdefault(key, {}).update(row)
+    dirty_seqs[key] = max(seq, dirty_seqs.get(key, 0))
+    if len(dirty_rows) >= WRITE_BEHIND_MAX_ROWS and (size_flush_task is None or size_flush_task.done()):
+        size_flush_task = asyncio.create_task(flush_write_buffer())
+
+async def flush_write_buffer(keys: List[tuple] = None, together: bool = False) -> None:
+    """Writes dirty rows to the database (all of them, or only `keys`). Failed rows move to the retry queue.
+
+    With `together`, the rows of `keys` are written or retried as one: if any of
+    them is already waiting for a retry, all of them join it.
+    """
+    async with write_buffer_lock:
+        if keys is None:
+            keys = list(dirty_rows)
+        pending = {key: dirty_rows.pop(key) for key in keys if key in dirty_rows}
+        pending_seqs = {key: dirty_seqs.pop(key) for key in pending}
+        if not pending:
+            return
+        if together and any(key in retry_queue for key in pending):
+            for key, row in pending.items():
+                retry_queue.push(key[0], row, seq=pending_seqs[key])
+            retry_queue.align(list(pending))
+            print(f"Queued {len(pending)} buffered rows behind a pending retry")
+            return
+        for table_name in WRITE_BEHIND_TABLES:
+            rows = []
+            for key, row in pending.items():
+                if key[0] != table_name:
+                    continue
+                if key in retry_queue:
+                    # Coalesce behind the queued write so an old retry can't land after this one
+                    retry_queue.push(table_name, row, seq=pending_seqs[key])
+                else:
+                    rows.append(row)
+            if not rows:
+                continue
+            results = await save_data_bulk(table_name, rows, build=False)
+            acked = []
+            for result in results:
+                for row in result['rows']:
+                    key = (table_name, row_key(row))
+                    if result['ok']:
+                        acked.append((table_name, key[1], pending_seqs[key]))
+                    else:
+                        retry_queue.push(table_name, row, seq=pending_seqs[key])
+            journal_ack(acked)
+        if together:
+            retry_queue.align(list(pending))
+        print(f"Flushed {len(pending)} buffered rows")
+
+@tasks.loop(seconds=WRITE_BEHIND_INTERVAL)
+async def write_behind_flusher():
+    await flush_write_buffer()
 
 def handle_infinity(value):
     if value >= INFINITY_THRESHOLD:
@@ -236,7 +840,8 @@ def in_allowed_channels():
     def predicate(ctx):
         if any(role.id == ADMIN_ROLE_ID for role in ctx.author.roles):
             return True
-        return ctx.channel.id in ALLOWED_CHANNEL_IDS
+        current = current_game.get(None)
+        return current is not None and ctx.channel.id in current.allowed_channel_ids
 
     return commands.check(predicate)
 
@@ -245,7 +850,8 @@ def in_hunt_channel():
     def predicate(ctx):
         if any(role.id == ADMIN_ROLE_ID for role in ctx.author.roles):
             return True
-        return ctx.channel.id == HUNT_CHANNEL_ID
+        current = current_game.get(None)
+        return current is not None and ctx.channel.id == current.hunt_channel_id
 
     return commands.check(predicate)
 
@@ -254,7 +860,9 @@ def in_hunt_or_allowed_channels():
     def predicate(ctx):
         if any(role.id == ADMIN_ROLE_ID for role in ctx.author.roles):
             return True
-        return ctx.channel.id == HUNT_CHANNEL_ID or ctx.channel.id in ALLOWED_CHANNEL_IDS
+        current = current_game.get(None)
+        return current is not None and (ctx.channel.id == current.hunt_channel_id
+                                        or ctx.channel.id in current.allowed_channel_ids)
 
     return commands.check(predicate)
 
@@ -266,89 +874,403 @@ def check_no_role(role_id: int):
 
     return commands.check(predicate)
 # -- Initialize --
-async def initialize_player_data(user_id: str):
-    global player_data
-    existing_data = supabase.table('player_data').select("*").eq('user_id', int(user_id)).execute()
-    if not existing_data.data:
-        player_data[user_id] = {
-            "user_id": int(user_id),
-            "gun_durability": 30,
-            "ammo": 30,
-            "health": 100,
-            "camp_durability": 100,
-            "healing_potions": 1
-        }
-        await save_data('player_data', player_data[user_id])
-    else:
-        player_data[user_id] = existing_data.data[0]
-        # Apply infinity logic to player_data on load
-        for key in ["gun_durability", "ammo", "camp_durability", "healing_potions"]:
-            if player_data[user_id][key] >= INFINITY_THRESHOLD:
-                player_data[user_id][key] = INFINITY_THRESHOLD
-
-# --- Unified Weather Control Loop ---
-@tasks.loop(seconds=1)
-async def weather_manager():
-    global current_weather, weather_end_time, weather_task, storm_warned_users, blizzard_task
-    channel = bot.get_channel(HUNT_CHANNEL_ID)
-
-    if asyncio.get_event_loop().time() >= weather_end_time:
-        if current_weather == "Chaos":
-            await end_chaos_weather(channel)
-        else:
-            await change_weather(channel) 
-
-# --- Change Weather Function (Regular or Manual) ---
-async def change_weather(channel, new_weather=None, duration=REGULAR_WEATHER_DURATION):
-    global current_weather, weather_end_time, weather_task, last_weathers, blizzard_task 
-
-    # Cancel existing weather and blizzard tasks
-    if weather_task and not weather_task.done():
-        weather_task.cancel()
-    if blizzard_task and not blizzard_task.done():
-        blizzard_task.cancel()
-
-    # If new_weather is not provided, determine it automatically
-    if new_weather is None:
-        valid_weathers = ["Sunny", "Snowy", "Rainy", "Stormy"]
-        new_weather = random.choices(valid_weathers, weights=[43, 43, 43, 35], k=1)[0]
-        if new_weather == "Stormy" and random.random() <= 0.1:
-            new_weather = "Super Storm"
-
-    # ------------------------ CHAOS TRIGGER ------------------------
-    print(f"last_weathers before append: {last_weathers}")
+DEFAULT_PLAYER_DATA = {
+    "gun_durability": 30,
+    "ammo": 30,
+    "health": 100,
+    "camp_durability": 100,
+    "healing_potions": 1
+}
 
-# Always append the new weather
-    last_weathers.append(new_weather) 
+def register_player(user_id: str, row: Dict[str, Any]) -> Dict[str, Any]:
+    """Stores a database row in the in-memory player registry, keeping the dict shape consistent."""
+    data = {key: row.get(key) if row.get(key) is not None else default for key, default in DEFAULT_PLAYER_DATA.items()}
+    data["guild_id"] = game().guild_id
+    data["user_id"] = int(user_id)
+    # Apply infinity logic to player_data on load
+    for key in ["gun_durability", "ammo", "camp_durability", "healing_potions"]:
+        if data[key] >= INFINITY_THRESHOLD:
+            data[key] = INFINITY_THRESHOLD
+    game().player_data[user_id] = data
+    game().known_user_ids.add(user_id)
+    if data["health"] <= 0:
+        queue_defeat(user_id)  # Died while we were offline, or on another instance
+    return data
+
+async def row_exists(table_name: str, user_id: str) -> bool:
+    """Checks the in-memory registry first; only users we have never seen reach the database."""
+    local = game().player_data if table_name == 'player_data' else game().coin_data
+    if user_id in local:
+        return True
+    # Once the tables are loaded, anything not in memory is not in the database either
+    if game().registry_loaded or (table_name, user_id) in game().absent_user_ids:
+        return False
+    row = await storage.select_one(table_name, 'user_id', int(user_id), filters={'guild_id': game().guild_id})
+    if row is None:
+        game().absent_user_ids[(table_name, user_id)] = True
+        return False
+    if table_name == 'player_data':
+        register_player(user_id, row)
+    else:
+        game().coin_data[user_id] = row['coins']
+    return True
 
-    print(f"Added {new_weather} to last_weathers: {last_weathers}")
+async def initialize_player_data(user_id: str):
+    """Makes sure `player_data[user_id]` exists. Never overwrites a player already in memory."""
+    if user_id in game().player_data:
+        return game().player_data[user_id]
+    if not await row_exists('player_data', user_id):
+        register_player(user_id, {})
+        game().absent_user_ids.pop(('player_data', user_id), None)
+        await save_data('player_data', game().player_data[user_id])
+    return game().player_data[user_id]
+
+# --- Weather Clock ---
+class WeatherClock:
+    """Time source for the weather system. The weather simulator swaps in a VirtualClock."""
+
+    def now(self) -> float:
+        return asyncio.get_event_loop().time()
+
+    def wall(self) -> float:
+        return time.time()
+
+    async def sleep(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+
+    async def wait(self, event: asyncio.Event, timeout: float) -> bool:
+        """Waits up to `timeout` seconds for `event`. Returns whether it is set."""
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return event.is_set()
+
+weather_clock = WeatherClock()
+
+# --- Weather State ---
+class WeatherState:
+    """Weather, Chaos progress and the forecast position in one object, so it can be saved and resumed.
+
+    `spell` is the forecast entry being played (see Weather Forecast): its
+    sub-weathers and blizzard windows are offsets from `starts_at`. Deadlines
+    are event loop times while running. to_dict() stores them as wall-clock
+    times, since loop time does not survive a restart.
+    """
+
+    def __init__(self, seed: str = None):
+        self.seed = seed or WEATHER_SEED
+        self.weather = "Sunny"  # Initial weather
+        self.sub_weather: Optional[str] = None  # Set while Chaos runs
+        self.starts_at = weather_clock.now()
+        self.ends_at = self.starts_at + REGULAR_WEATHER_DURATION
+        self.sub_index = -1  # Position in spell['sub_weathers'] during Chaos
+        self.sub_ends_at = 0.0  # Next sub-weather change during Chaos
+        self.last_weathers = deque(maxlen=5)  # Five different weathers in a row trigger Chaos
+        self.spell = {'index': 0, 'weather': self.weather, 'duration': REGULAR_WEATHER_DURATION,
+                      'history': [], 'sub_weathers': [], 'blizzards': []}
+
+    @property
+    def chaos(self) -> bool:
+        return self.weather == "Chaos"
+
+    @property
+    def snowy(self) -> bool:
+        return (self.sub_weather if self.chaos else self.weather) == "Snowy"
+
+    def blizzard_windows(self) -> List[tuple]:
+        """(start, end) loop times of the blizzards in the current Snowy spell or Snowy sub-weather."""
+        if self.chaos:
+            low, high = self.sub_ends_at - CHAOS_SUB_WEATHER_DURATION, self.sub_ends_at
+        else:
+            low, high = self.starts_at, self.ends_at
+        windows = [(self.starts_at + start, self.starts_at + end) for start, end in self.spell['blizzards']]
+        return [(start, end) for start, end in windows if low <= start < high]
+
+    def to_dict(self) -> Dict[str, Any]:
+        loop_now = weather_clock.now()
+        wall_now = weather_clock.wall()
+        wall = lambda deadline: round(wall_now + (deadline - loop_now), 3)
+        return {
+            'version': WEATHER_STATE_VERSION,
+            'seed': self.seed,
+            'weather': self.weather,
+            'sub_weather': self.sub_weather,
+            'starts_at': wall(self.starts_at),
+            'ends_at': wall(self.ends_at),
+            'sub_index': self.sub_index,
+            'sub_ends_at': wall(self.sub_ends_at) if self.chaos else None,
+            'last_weathers': list(self.last_weathers),
+            'spell': self.spell,
+            'saved_at': round(wall_now, 3),
+        }
 
-    # Check for Chaos AFTER appending the new weather
-    if len(last_weathers) >= 5 and len(set(last_weathers)) == 5:
-        new_weather = "Chaos"
+    def restore(self, state: Dict[str, Any]) -> None:
+        """Loads a to_dict() result. Deadlines that passed while offline are simply due now."""
+        loop_now = weather_clock.now()
+        wall_now = weather_clock.wall()
+        local = lambda deadline: loop_now + (deadline - wall_now)
+        self.seed = state['seed']
+        self.weather = state['weather']
+        self.sub_weather = state['sub_weather']
+        self.starts_at = local(state['starts_at'])
+        self.ends_at = local(state['ends_at'])
+        self.sub_index = state['sub_index']
+        self.sub_ends_at = local(state['sub_ends_at']) if self.chaos else 0.0
+        self.last_weathers.clear()
+        self.last_weathers.extend(state['last_weathers'])
+        self.spell = state['spell']
+
+# --- Weather Forecast ---
+# The weather is a sequence of spells. Spell N rolls on its own random.Random,
+# seeded from the weather seed and N, and already contains its Chaos
+# sub-weathers and blizzard windows, so the timeline can be generated ahead
+# of time. The controller plays it, and !forecast shows it. Only an admin
+# override changes what follows, and then the forecast is regenerated from there.
+WEATHER_WEIGHTS = {"Sunny": 43, "Snowy": 43, "Rainy": 43, "Stormy": 35}
+SUPER_STORM_CHANCE = 0.1  # Share of Stormy spells that become a Super Storm
+CHAOS_SUB_WEATHERS = ["Sunny", "Snowy", "Rainy", "Stormy", "Super Storm"]
+
+def derive_weather_seed(seed: str, index: int) -> int:
+    digest = hashlib.blake2b(f"{seed}:weather:{index}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+def plan_blizzards(rng: random.Random, start: int, end: int, chaos: bool = False) -> List[List[int]]:
+    """Blizzard windows for snow between offsets `start` and `end`, alternating blizzards and breaks."""
+    windows = []
+    time_point = start
+    cycle_count = 0
+    while time_point < end:
+        time_remaining = end - time_point
+        if chaos:
+            # Chaos blizzards last 20-40 seconds
+            blizzard_duration = rng.randint(20, 40)
+            if time_remaining <= 60 and cycle_count < 1:
+                blizzard_duration = max(1, time_remaining - 5)
+        else:
+            # 60-180 seconds, leaving at least 60 seconds of snow after it; near the end, what is left
+            longest = min(180, time_remaining - 60)
+            blizzard_duration = rng.randint(60, longest) if longest >= 60 else max(1, time_remaining - 5)
+            if time_remaining <= 300 and cycle_count < 1:
+                blizzard_duration = max(1, time_remaining - 5)
+        windows.append([time_point, min(time_point + blizzard_duration, end)])
+        time_point += blizzard_duration
+        cycle_count += 1
+
+        # Rest until the next blizzard, if there is time for one
+        time_remaining = end - time_point
+        if time_remaining <= blizzard_duration:
+            break
+        shortest = 10 if chaos else 60
+        time_point += rng.randint(shortest, max(shortest, time_remaining - blizzard_duration))
+    return windows
+
+def forecast_spell(seed: str, index: int, history, weather: str = None,
+                   duration: int = REGULAR_WEATHER_DURATION) -> Dict[str, Any]:
+    """Spell `index` of the timeline, following the weathers in `history`. `weather` forces an admin override."""
+    rng = random.Random(derive_weather_seed(seed, index))
+    if weather is None:
+        weather = rng.choices(list(WEATHER_WEIGHTS), weights=list(WEATHER_WEIGHTS.values()), k=1)[0]
+        if weather == "Stormy" and rng.random() <= SUPER_STORM_CHANCE:
+            weather = "Super Storm"
+
+    # Five different weathers in a row trigger Chaos
+    history = deque(history, maxlen=5)
+    history.append(weather)
+    if len(history) >= 5 and len(set(history)) == 5:
+        weather = "Chaos"
         duration = CHAOS_DURATION
-        last_weathers.clear()  #s
-        print("Chaos triggered!")
+        history.clear()
+
+    sub_weathers, blizzards = [], []
+    if weather == "Chaos":
+        # A new sub-weather every CHAOS_SUB_WEATHER_DURATION, each different from the last
+        sub_weather = None
+        for start in range(0, duration, CHAOS_SUB_WEATHER_DURATION):
+            sub_weather = rng.choice([choice for choice in CHAOS_SUB_WEATHERS if choice != sub_weather])
+            sub_weathers.append(sub_weather)
+            if sub_weather == "Snowy":
+                blizzards += plan_blizzards(rng, start, min(start + CHAOS_SUB_WEATHER_DURATION, duration), chaos=True)
+    elif weather == "Snowy":
+        blizzards = plan_blizzards(rng, 0, duration)
+    return {'index': index, 'weather': weather, 'duration': duration, 'history': list(history),
+            'sub_weathers': sub_weathers, 'blizzards': blizzards}
+
+class WeatherForecast:
+    """The next spells after weather_state's, generated ahead and reused until the state diverges."""
+
+    def __init__(self):
+        self.spells = deque()  # (seed, history before the spell, spell)
+
+    def upcoming(self, count: int = FORECAST_SPELLS) -> List[Dict[str, Any]]:
+        if self.spells:
+            seed, history, spell = self.spells[0]
+            if (seed, history, spell['index']) != (game().weather_state.seed, game().weather_state.spell['history'],
+                                                   game().weather_state.spell['index'] + 1):
+                # An override or a restored state moved the timeline; everything after it changes
+                self.spells.clear()
+        while len(self.spells) < count:
+            previous = self.spells[-1][2] if self.spells else game().weather_state.spell
+            spell = forecast_spell(game().weather_state.seed, previous['index'] + 1, previous['history'])
+            self.spells.append((game().weather_state.seed, previous['history'], spell))
+        return [spell for _, _, spell in itertools.islice(self.spells, count)]
+
+    def pop(self) -> Dict[str, Any]:
+        spell = self.upcoming(1)[0]
+        self.spells.popleft()
+        return spell
+
+# --- Weather Persistence ---
+# Each guild's WeatherState is one row of the game_state table, with the guild
+# id as its id, rewritten in the background after every transition.
+
+def commit_weather_state() -> None:
+    """Call after every change to weather_state: re-arms the weather timer and saves the state."""
+    game().weather_controller.rearm()
+    game().weather_state_dirty = True
+    if game().weather_persist_task is None or game().weather_persist_task.done():
+        game().weather_persist_task = asyncio.create_task(persist_weather_state())
+
+async def persist_weather_state() -> None:
+    # Transitions that land during a write are folded into the next one
+    while game().weather_state_dirty:
+        game().weather_state_dirty = False
+        row = {'id': game().guild_id, 'state': game().weather_state.to_dict()}
+        try:
+            await storage.bulk_upsert(GAME_STATE_TABLE, [row], 'id')
+        except Exception as e:
+            print(f"Error saving weather state: {e!r}")
+            retry_queue.push(GAME_STATE_TABLE, row, on_conflict='id', error=e)
+
+async def resume_weather_state() -> bool:
+    """Rehydrates weather_state from storage and restarts its blizzards. Returns False if nothing was saved."""
+    try:
+        row = await storage.select_one(GAME_STATE_TABLE, 'id', game().guild_id)
+        if row is None and game().guild_id == DEFAULT_GUILD_ID:
+            row = await storage.select_one(GAME_STATE_TABLE, 'id', 1)  # Saved before weather was per guild
+    except Exception as e:
+        print(f"Error loading weather state: {e!r}")
+        return False
+    if not row or not row.get('state'):
+        return False
+    state = json.loads(row['state']) if isinstance(row['state'], str) else row['state']
+    if state.get('version') != WEATHER_STATE_VERSION:
+        print("Ignoring weather state from another version")
+        return False
+    game().weather_state.restore(state)
+    if game().weather_state.snowy and game().weather_state.ends_at > weather_clock.now():
+        # The windows are part of the spell, so a blizzard in progress picks up where it was
+        channel = game().weather_controller.get_channel()
+        game().blizzard_task = asyncio.create_task(blizzard_cycle(channel, game().weather_state.blizzard_windows(),
+                                                           chaos=game().weather_state.chaos))
+    game().weather_controller.rearm()
+    return True
+
+# --- Weather Controller ---
+class WeatherController:
+    """Runs every weather transition from one timer.
+
+    The task sleeps until the next deadline: the end of the weather, or during
+    Chaos the next sub-weather change if that comes first. Anything that moves
+    a deadline calls rearm() so the sleep is recomputed. Deadlines are
+    absolute, and each transition starts from the deadline it replaces rather
+    than from when the timer fired, so lateness never accumulates.
+    """
+
+    def __init__(self, channel=None):
+        self.task: asyncio.Task = None
+        self.wakeup = asyncio.Event()
+        self.channel = channel  # Defaults to the hunt channel
+        self.transitions = 0
+        self.errors = 0
+
+    def start(self) -> None:
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    def rearm(self) -> None:
+        self.wakeup.set()
+
+    def get_channel(self):
+        return self.channel or bot.get_channel(game().hunt_channel_id)
+
+    def next_deadline(self) -> float:
+        if game().weather_state.chaos:
+            return min(game().weather_state.ends_at, game().weather_state.sub_ends_at)
+        return game().weather_state.ends_at
+
+    async def run(self) -> None:
+        while True:
+            self.wakeup.clear()
+            delay = self.next_deadline() - weather_clock.now()
+            if delay > 0:
+                await weather_clock.wait(self.wakeup, delay)
+                continue
+            channel = self.get_channel()
+            try:
+                if weather_clock.now() >= game().weather_state.ends_at:
+                    if game().weather_state.chaos:
+                        await end_chaos_weather(channel, starts_at=game().weather_state.ends_at)
+                    else:
+                        await change_weather(channel, starts_at=game().weather_state.ends_at)
+                else:
+                    await advance_chaos_sub_weather(channel)
+                self.transitions += 1
+            except Exception as e:
+                self.errors += 1
+                print(f"Weather transition failed: {e!r}")
+                # Don't spin on a deadline that a failed transition left in the past
+                if self.next_deadline() <= weather_clock.now():
+                    await weather_clock.sleep(5)
+
+def stop_blizzard() -> None:
+    if game().blizzard_task and not game().blizzard_task.done():
+        game().blizzard_task.cancel()
+    game().blizzard_task = None
+    game().blizzard_event.clear()
 
-    # ----------------------- Update current_weather---------------------- 
-    current_weather = new_weather  
+# --- Change Weather Function (Regular or Manual) ---
+async def change_weather(channel, new_weather=None, duration=REGULAR_WEATHER_DURATION, starts_at=None):
+    """Switches to the next forecast spell, or to `new_weather` as an admin override.
 
-    # ----------------------- CHAOS TRIGGER----------------------
+    `starts_at` is the deadline being replaced, for drift-free scheduling.
+    """
 
-    current_weather = new_weather  # Update the current weather 
-    weather_end_time = asyncio.get_event_loop().time() + duration
+    previous_weather = game().weather_state.weather
+    stop_blizzard()
 
-    # --- Create a new weather task based on the current weather ---
-    if current_weather == "Snowy": 
-        weather_task = asyncio.create_task(handle_snowy_weather(channel)) 
-        blizzard_task = asyncio.create_task(blizzard_cycle(channel))
-    
-    elif current_weather == "Chaos":  # Start Chaos task here!
-        weather_task = asyncio.create_task(handle_chaos_weather(channel))
-    else:  
-        weather_task = asyncio.create_task(handle_regular_weather(channel))
+    # The next spell comes from the forecast unless an admin picked the weather
+    if new_weather is None:
+        spell = game().weather_forecast.pop()
+    else:
+        spell = forecast_spell(game().weather_state.seed, game().weather_state.spell['index'] + 1,
+                               game().weather_state.last_weathers, new_weather, duration)
+    duration = spell['duration']
+    print(f"Spell {spell['index']}: {spell['weather']}, last_weathers {spell['history']}")
+
+    # ----------------------- Update the weather ---------------------- 
+    game().weather_state.spell = spell
+    game().weather_state.weather = spell['weather']  # Update the current weather 
+    # Chaos opens on its first sub-weather so hunts never see it without one
+    game().weather_state.sub_weather = spell['sub_weathers'][0] if spell['weather'] == "Chaos" else None
+    game().weather_state.last_weathers.clear()
+    game().weather_state.last_weathers.extend(spell['history'])
+    now = weather_clock.now()
+    # A timer that fired late still ends this weather on schedule, unless it is more than a whole duration behind
+    start = now if starts_at is None else max(starts_at, now - duration)
+    game().weather_state.starts_at = start
+    game().weather_state.ends_at = start + duration
+
+    if game().weather_state.weather == "Snowy": 
+        game().blizzard_task = asyncio.create_task(blizzard_cycle(channel, game().weather_state.blizzard_windows()))
+    elif game().weather_state.chaos:
+        # The controller announces the first sub-weather straight away
+        game().weather_state.sub_index = -1
+        game().weather_state.sub_ends_at = start
+    commit_weather_state()
 
     # --- Send weather update embed ---
+    current_weather = game().weather_state.weather
     embed = discord.Embed(
         title="Weather Update",
         color=random.choice(WEATHER_COLORS.get(current_weather, [discord.Color.dark_teal()]))
@@ -371,16 +1293,13 @@ async def change_weather(channel, new_weather=None, duration=REGULAR_WEATHER_DUR
     await channel.send(embed=embed)
 
     # --- Check if the weather is actually changing ---
-    if current_weather != new_weather:  
-        weather_end_time = asyncio.get_event_loop().time() + duration
-    else: 
-        # The weather is not actually changing, so do nothing! 
+    if current_weather == previous_weather:  
         await channel.send(f"The weather is already {current_weather}.")
-        return
+
 # --- End Chaos Weather ---
-async def end_chaos_weather(channel):
+async def end_chaos_weather(channel, starts_at=None):
     """Resets the weather after Chaos ends."""
-    global current_weather, weather_end_time, chaos_triggered_naturally, weather_task
+    global chaos_triggered_naturally
 
     await channel.send(
         embed=discord.Embed(
@@ -391,152 +1310,72 @@ async def end_chaos_weather(channel):
     )
 
     chaos_triggered_naturally = False
-    await change_weather(channel)
-# --- Handle Regular Weather (Sunny, Rainy, Stormy, Super Storm) ---
-async def handle_regular_weather(channel):
-    """Manages regular weather cycles (not Chaos)."""
-    global current_weather, weather_end_time 
-    await asyncio.sleep(weather_end_time - asyncio.get_event_loop().time())  
-
-# --- Handle Snowy Weather and Potential Blizzards ---
-async def handle_snowy_weather(channel): 
-    """Handles Snowy weather, allowing blizzards to start."""
-    global current_weather, weather_end_time
-    await asyncio.sleep(weather_end_time - asyncio.get_event_loop().time())
-
-# --- Handle Chaos Weather ---
-async def handle_chaos_weather(channel):
-    """Manages sub-weather changes during Chaos."""
-    global current_weather, weather_end_time, current_sub_weather
-    start_time = asyncio.get_event_loop().time()
-    previous_sub_weather = None
-    first_transition = True
-    current_blizzard_task = None 
-    # Set weather_end_time ONCE at the beginning of Chaos
-    weather_end_time = start_time + CHAOS_DURATION  
-
-    while asyncio.get_event_loop().time() < weather_end_time:
-        current_sub_weather = random.choice(["Sunny", "Snowy", "Rainy", "Stormy", "Super Storm"])
-        print(f"Current sub-weather during Chaos: {current_sub_weather}") 
-
-        if current_sub_weather == "Snowy":
-            # Cancel existing blizzard task (if any)
-            if current_blizzard_task and not current_blizzard_task.done():
-                current_blizzard_task.cancel()
-
-            current_blizzard_task = asyncio.create_task(chaos_blizzard_cycle(channel)) 
-
-        if current_sub_weather != previous_sub_weather:
-            # Perform the transition only once
-            if first_transition:
-                await chaos_transition(channel, current_sub_weather)
-                first_transition = False
-
-            # Send the announcement
-            embed = discord.Embed(
-                title=f"🌪️ 𝕮𝖍𝖆𝖔𝖘 𝕽𝖊𝖎𝖌𝖓𝖘! 🌪️",
-                description=f"The chaotic weather shifts to {current_sub_weather}!", 
-                color=random.choice(WEATHER_COLORS.get(current_sub_weather, [discord.Color.dark_teal()]))
-            )
-            embed.set_thumbnail(url=WEATHER_THUMBNAILS.get("Chaos"))  # Add thumbnail for sub-weather
-            await channel.send(embed=embed)
-            await asyncio.sleep(CHAOS_SUB_WEATHER_DURATION) 
-        previous_sub_weather = current_sub_weather
-
-# --- Normal Blizzard Cycle Logic ---
-async def blizzard_cycle(ctx):
-    global blizzard_event, current_weather, blizzard_active, weather_end_time
-    blizzard_active.set()
-
-    if current_weather == "Snowy":
-        start_time = asyncio.get_event_loop().time()
-        duration = REGULAR_WEATHER_DURATION  # 15 minutes (900 seconds)
-        cycle_count = 0
-
-        while asyncio.get_event_loop().time() < (start_time + duration) and blizzard_active.is_set():
-            # 1 & 2: Random Blizzard Duration (1-3 minutes) BUT ensure it's less than remaining time
-            time_remaining = start_time + duration - asyncio.get_event_loop().time()
-            blizzard_duration = random.randint(60, min(180, int(max(0, time_remaining - 60)))) # <-- Ensure blizzard_duration is at least 60 seconds less than time_remaining 
-
-            # 3: Force 2nd Cycle if Time is Running Out (no changes needed here)
-            if time_remaining <= 300 and cycle_count < 1: 
-                blizzard_duration = int(time_remaining - 5) 
-             # Use almost all remaining time (leave 5 seconds)
-
-            blizzard_event.set()
-            blizzard_embed = discord.Embed(
-                title=f"{WEATHER_EMOJIS['Blizzard']} Blizzard Warning!",
-                color=random.choice(WEATHER_COLORS["Snowy"])
-            )
-            blizzard_embed.description = f"A blizzard has descended! It will last for {blizzard_duration} seconds."
-            await ctx.send(embed=blizzard_embed)
-            await asyncio.sleep(blizzard_duration)
-            blizzard_event.clear()
-
-            cycle_count += 1
-
-            # 4: Calculate Rest Time
-            time_remaining = start_time + duration - asyncio.get_event_loop().time()
-            if time_remaining > blizzard_duration:  # Enough time for another cycle
-                break_duration = random.randint(60, max(60, int(time_remaining - blizzard_duration)))
-                break_embed = discord.Embed(
-                    title=f"The blizzard has subsided for now...",
-                    color=random.choice(WEATHER_COLORS["Snowy"])
-                )
-                await ctx.send(embed=break_embed)
-                await asyncio.sleep(break_duration)
-            else:  # Not enough time, end the cycle
-                break
-
-    blizzard_active.clear()
-# --- Chaos Blizzard Cycle Logic ---
-async def chaos_blizzard_cycle(ctx):
-    global blizzard_event, current_sub_weather, blizzard_active
-    blizzard_active.set()  
+    await change_weather(channel, starts_at=starts_at)
+
+# --- Chaos Sub-weather ---
+async def advance_chaos_sub_weather(channel):
+    """Moves Chaos to the spell's next sub-weather. Ones missed while offline are skipped."""
+    first_transition = game().weather_state.sub_index < 0
+    stop_blizzard()
+    sub_weathers = game().weather_state.spell['sub_weathers']
+    elapsed = int((weather_clock.now() - game().weather_state.starts_at) // CHAOS_SUB_WEATHER_DURATION)
+    game().weather_state.sub_index = min(max(game().weather_state.sub_index + 1, elapsed), len(sub_weathers) - 1)
+    game().weather_state.sub_weather = sub_weathers[game().weather_state.sub_index]
+    current_sub_weather = game().weather_state.sub_weather
+    print(f"Current sub-weather during Chaos: {current_sub_weather}") 
+    game().weather_state.sub_ends_at = game().weather_state.starts_at + (game().weather_state.sub_index + 1) * CHAOS_SUB_WEATHER_DURATION
+    commit_weather_state()
 
     if current_sub_weather == "Snowy":
-        start_time = asyncio.get_event_loop().time()
-        duration = CHAOS_SUB_WEATHER_DURATION  # 5 minutes 
-        cycle_count = 0
+        game().blizzard_task = asyncio.create_task(blizzard_cycle(channel, game().weather_state.blizzard_windows(), chaos=True))
 
-        while asyncio.get_event_loop().time() < (start_time + duration) and blizzard_active.is_set():
-            # 1 & 2: Random Blizzard Duration (20-40 seconds)
-            blizzard_duration = random.randint(20, 40)
+    # Perform the transition only once
+    if first_transition:
+        await chaos_transition(channel, current_sub_weather)
 
-            # 3: Force 2nd Cycle if Time is Running Out
-            time_remaining = start_time + duration - asyncio.get_event_loop().time()
-            if time_remaining <= 60 and cycle_count < 1:  # 1 minute left & only 1 cycle done
-                blizzard_duration = int(time_remaining - 5)  # Use almost all remaining time (leave 5 seconds)
+    # Send the announcement
+    embed = discord.Embed(
+        title=f"🌪️ 𝕮𝖍𝖆𝖔𝖘 𝕽𝖊𝖎𝖌𝖓𝖘! 🌪️",
+        description=f"The chaotic weather shifts to {current_sub_weather}!", 
+        color=random.choice(WEATHER_COLORS.get(current_sub_weather, [discord.Color.dark_teal()]))
+    )
+    embed.set_thumbnail(url=WEATHER_THUMBNAILS.get("Chaos"))  # Add thumbnail for sub-weather
+    await channel.send(embed=embed)
 
-            blizzard_event.set()
+# --- Blizzard Cycle ---
+async def blizzard_cycle(ctx, windows: List[tuple], chaos: bool = False):
+    """Plays the blizzard windows of the current Snowy spell or Chaos sub-weather.
+
+    Windows are (start, end) clock times from the forecast. One already under
+    way when this starts, after a restart, carries on without a new warning.
+    """
+    prefix = "₵Ⱨ₳Ø₴ " if chaos else ""
+    for position, (start, end) in enumerate(windows):
+        now = weather_clock.now()
+        if end <= now:
+            continue
+        resumed = start < now
+        if not resumed:
+            await weather_clock.sleep(start - now)
+        game().blizzard_event.set()
+        if not resumed:
             blizzard_embed = discord.Embed(
-                title=f"{WEATHER_EMOJIS['Blizzard']} ₵Ⱨ₳Ø₴ Blizzard Warning!",
+                title=f"{WEATHER_EMOJIS['Blizzard']} {prefix}Blizzard Warning!",
                 color=random.choice(WEATHER_COLORS["Snowy"])
             )
-            blizzard_embed.description = f"₳ ₵Ⱨ₳Ø₴ blizzard has descended! It will last for {blizzard_duration} seconds."
+            blizzard_embed.description = f"{'₳ ₵Ⱨ₳Ø₴' if chaos else 'A'} blizzard has descended! It will last for {int(end - start)} seconds."
             await ctx.send(embed=blizzard_embed)
-            await asyncio.sleep(blizzard_duration)
-            blizzard_event.clear()
-
-            cycle_count += 1
-
-            # 4: Calculate Rest Time
-            time_remaining = start_time + duration - asyncio.get_event_loop().time()
-            if time_remaining > blizzard_duration:  # Enough time for another cycle
-                break_duration = random.randint(10, int(time_remaining - blizzard_duration))
-                break_embed = discord.Embed(
-                    title=f"The ₵Ⱨ₳Ø₴ blizzard has subsided for now...",
-                    color=random.choice(WEATHER_COLORS["Snowy"])
-                )
-                await ctx.send(embed=break_embed)
-                await asyncio.sleep(break_duration)
-            else:
-                break  # Not enough time, end the cycle
+        await weather_clock.sleep(end - weather_clock.now())
+        game().blizzard_event.clear()
 
-    blizzard_active.clear()
+        if position < len(windows) - 1:
+            break_embed = discord.Embed(
+                title=f"The {prefix}blizzard has subsided for now...",
+                color=random.choice(WEATHER_COLORS["Snowy"])
+            )
+            await ctx.send(embed=break_embed)
 
 async def chaos_transition(ctx, next_weather): 
-    global current_weather
 
     chaos_colors = [
         discord.Color.purple(),
@@ -552,60 +1391,363 @@ async def chaos_transition(ctx, next_weather):
             color=color
         )
         await ctx.send(embed=embed)
-        await asyncio.sleep(0.5)  
-
+        await weather_clock.sleep(0.5)  
+
+
+# --- Guild Games ---
+# Every guild plays its own game: weather, storms, camps, defeats and an
+# economy partition keyed by (guild_id, user_id). A game is loaded the first
+# time its guild is active and evicted after GAME_IDLE_TTL seconds without a
+# command. Code reaches the game it serves through game(), which reads a
+# context variable, so the tasks a game starts keep serving that game.
+GAME_IDLE_TTL = float(os.getenv("GAME_IDLE_TTL", 3600))
+GAME_EVICT_INTERVAL = float(os.getenv("GAME_EVICT_INTERVAL", 60))
+
+class GuildGame:
+    """Everything one guild's game keeps in memory."""
+
+    def __init__(self, guild_id: int):
+        self.guild_id = guild_id
+        channels = GUILD_CHANNELS.get(guild_id, {})
+        default = guild_id == DEFAULT_GUILD_ID
+        self.hunt_channel_id = int(channels.get('hunt', HUNT_CHANNEL_ID if default else 0))
+        self.allowed_channel_ids = [int(channel_id) for channel_id in
+                                    channels.get('allowed', ALLOWED_CHANNEL_IDS if default else [])]
+        # Player registry: loaded with the game, then authoritative
+        self.player_data: Dict[str, Any] = {}
+        self.coin_data: Dict[str, int] = {}
+        self.registry_loaded = False
+        self.known_user_ids: set = set()
+        self.absent_user_ids = TTLCache(maxsize=10000, ttl=3600)  # (table, user_id) confirmed missing
+        self.sync_high_water: Dict[str, str] = {}
+        self.delta_sync_task: asyncio.Task = None
+        # Hunting, storms and camps
+        self.camp_users_lock = asyncio.Lock()
+        self.camp_users: Dict[str, Any] = {}
+        self.storm_warned_users: Dict[int, float] = {}
+        self.storm_scheduler = StormScheduler()
+        self.hunt_budget_start: Dict[str, float] = {}
+        self.defeat_pending: Dict[str, None] = {}  # insertion-ordered set of user ids
+        self.defeat_wakeup = asyncio.Event()
+        self.defeat_task: asyncio.Task = None
+        # Weather, on a timeline of its own
+        self.weather_state = WeatherState(f"{WEATHER_SEED}:{guild_id}")
+        self.weather_forecast = WeatherForecast()
+        self.weather_controller = WeatherController()
+        self.weather_state_dirty = False
+        self.weather_persist_task: asyncio.Task = None
+        self.blizzard_task: asyncio.Task = None
+        self.blizzard_event = asyncio.Event()
+        self.last_active = time.monotonic()
+
+    def busy(self) -> bool:
+        """True while storms or defeats are still waiting to resolve, or while the weather runs.
+
+        Weather follows a timeline that would stop (and skip its announcements)
+        while the game is unloaded, so games with a hunt channel stay loaded.
+        """
+        weather_running = self.weather_controller.task is not None and not self.weather_controller.task.done()
+        return bool(self.storm_scheduler.pending or self.defeat_pending) or weather_running
+
+current_game: contextvars.ContextVar = contextvars.ContextVar('current_game')
+games: Dict[int, GuildGame] = {}  # guild id -> loaded game
+game_loads: Dict[int, asyncio.Task] = {}
+game_evictions: Dict[int, asyncio.Task] = {}
+
+def game() -> GuildGame:
+    """The game being served. Raises LookupError outside of one."""
+    return current_game.get()
+
+def use_game(current: GuildGame) -> None:
+    """Serves `current` for the rest of this task, and the tasks it starts."""
+    current.last_active = time.monotonic()
+    current_game.set(current)
+
+def in_game(callback):
+    """Binds a view or modal callback to the game of the command that creates it.
+
+    discord.py runs those callbacks in tasks of their own, outside the
+    command's context. The game is looked up again on each call, in case it
+    was evicted while the view was open.
+    """
+    guild_id = game().guild_id
+
+    async def run_in_game(*args, **kwargs):
+        use_game(await get_game(guild_id))
+        return await callback(*args, **kwargs)
+    return run_in_game
+
+async def get_game(guild_id: int) -> GuildGame:
+    """The game of `guild_id`, loading it first if needed. Concurrent callers share one load."""
+    current = games.get(guild_id)
+    if current is not None:
+        return current
+    eviction = game_evictions.get(guild_id)
+    if eviction is not None:
+        # Let the evicted game finish saving before it is read back
+        await asyncio.wait([eviction])
+        return await get_game(guild_id)
+    task = game_loads.get(guild_id)
+    if task is None:
+        task = game_loads[guild_id] = asyncio.create_task(load_game(GuildGame(guild_id)))
+    try:
+        return await asyncio.shield(task)
+    finally:
+        # A failed load is retried by the next caller
+        if task.done() and game_loads.get(guild_id) is task:
+            del game_loads[guild_id]
+
+async def load_game(current: GuildGame) -> GuildGame:
+    """Loads a guild's economy and starts its game. Runs in its own task, serving `current`."""
+    use_game(current)
+    phase_start = time.perf_counter()
+    snapshot = load_snapshot(snapshot_path(current.guild_id))
+    if snapshot:
+        # Warm start: restore the snapshot, then pull only what changed in storage since it was taken
+        restore_guild_snapshot(snapshot)
+        load_ok = await run_delta_sync()
+    else:
+        load_ok = await load_guild_tables()
+    print(f"[game {current.guild_id}] {len(current.player_data)} players, {len(current.coin_data)} coin rows from "
+          f"{'snapshot and delta' if snapshot else 'storage'}: {time.perf_counter() - phase_start:.2f}s")
+    # Writes that never reached the database before the last shutdown, crash or eviction
+    print(f"[game {current.guild_id}] replayed {replay_journal()} journaled rows")
+    if not load_ok:
+        # A partial load must not be treated as authoritative, or we would overwrite real rows
+        print(f"[game {current.guild_id}] player tables incomplete, skipping member reconciliation")
+    else:
+        current.registry_loaded = True
+        await reconcile_members(bot.get_guild(current.guild_id))
+    current.storm_scheduler.start()
+    start_defeat_processor()
+    if current.hunt_channel_id:
+        # Carry on with the weather from before the restart or eviction
+        if await resume_weather_state():
+            print(f"[game {current.guild_id}] resumed {current.weather_state.weather} weather, "
+                  f"{current.weather_state.ends_at - weather_clock.now():.0f}s left")
+        current.weather_controller.start()
+    games[current.guild_id] = current
+    return current
+
+async def evict_game(current: GuildGame) -> None:
+    """Saves and unloads a game. Its guild's next command loads it again.
+
+    Only games without running weather get here (see GuildGame.busy), so there
+    are no storms to camp through; hunt budgets are kept in the snapshot.
+    """
+    games.pop(current.guild_id, None)
+    current_game.set(current)
+    for task in (current.weather_controller.task, current.blizzard_task, current.storm_scheduler.task,
+                 current.defeat_task, current.delta_sync_task):
+        if task is not None and not task.done():
+            task.cancel()
+    if current.weather_controller.task is not None:
+        current.weather_state_dirty = True
+        await persist_weather_state()
+    prefix = f"{current.guild_id}:"
+    await flush_write_buffer([key for key in dirty_rows if key[1].startswith(prefix)])
+    await write_snapshot(snapshot_path(current.guild_id), build_guild_snapshot(current))
+    print(f"[game {current.guild_id}] evicted after {time.monotonic() - current.last_active:.0f}s idle")
+
+@tasks.loop(seconds=GAME_EVICT_INTERVAL)
+async def game_evictor():
+    now = time.monotonic()
+    for current in list(games.values()):
+        # The default guild stays loaded, as the only game did before guilds were split
+        if current.guild_id == DEFAULT_GUILD_ID or current.busy() or now - current.last_active < GAME_IDLE_TTL:
+            continue
+        task = game_evictions[current.guild_id] = asyncio.create_task(evict_game(current))
+        try:
+            await task
+        except Exception as e:
+            print(f"Error evicting game {current.guild_id}: {e!r}")
+        finally:
+            del game_evictions[current.guild_id]
 
 @bot.event
 async def on_ready():
     print(f'Logged in as {bot.user.name}')
 
-    # 1. LOAD ALL DATA FIRST
-    global coin_data, player_data, market_view, markets, transactions
-    coin_data_temp = await load_data('coin_data')
-    player_data_temp = await load_data('player_data')
-    markets = await load_data('markets')
-    transactions = await load_data('transactions')
-
-    # Update coin_data 
-    for item in coin_data_temp:
-        user_id = str(item['user_id'])
-        coin_data[user_id] = item['coins']
-
-    # Update player_data 
-    for item in player_data_temp:
-        user_id = str(item['user_id']) if item['user_id'] is not None else str(item['id'])
-        player_data[user_id] = {
-            'gun_durability': item['gun_durability'],
-            'ammo': item['ammo'],
-            'health': item.get('health', 100),
-            'camp_durability': item.get('camp_durability'),
-            'healing_potions': item.get('healing_potions')
-        } 
-
-    # 2. INITIALIZE ONLY MISSING PLAYERS
-    for guild in bot.guilds:
-        for member in guild.members:
-            user_id = str(member.id)
-            if user_id not in player_data:  # Check if player data exists
-                await initialize_player_data(user_id)  
-
-            if user_id not in coin_data:
-                coin_data[user_id] = 0
-                await save_data('coin_data', {'user_id': int(user_id), 'coins': 0})
+    # 1. LOAD SHARED DATA FIRST; each guild's game loads when the guild is first active
+    global market_view, markets, transactions, shared_tables_loaded
+    phase_start = time.perf_counter()
+    snapshot = None if shared_tables_loaded else load_snapshot()
+    if shared_tables_loaded:
+        # Reconnect: memory is already authoritative, loaded games catch up in on_guild_available
+        print("[startup] reconnected")
+    elif snapshot:
+        # Warm start: restore the snapshot, then pull only what changed in storage since it was taken
+        restore_snapshot(snapshot)
+        try:
+            transactions_by_id = {t['id']: t for t in transactions}
+            async for item in iter_table('transactions', TRANSACTION_COLUMNS, order_by='id',
+                                         since=sync_high_water.get('transactions')):
+                transactions_by_id[item['id']] = item
+                advance_high_water('transactions', [item])
+            transactions = sorted(transactions_by_id.values(), key=lambda t: t['id'])
+        except Exception as e:
+            print(f"Error syncing transactions: {e!r}")
+        markets = await load_data('markets', order_by='id')
+        print(f"[startup] restored snapshot from {snapshot['taken_at']:.0f} and applied delta: "
+              f"{time.perf_counter() - phase_start:.2f}s")
+    else:
+        markets = await load_data('markets', order_by='id')
+        transactions = await load_data('transactions', TRANSACTION_COLUMNS, order_by='id')
+        advance_high_water('transactions', transactions)
+        print(f"[startup] load tables: {time.perf_counter() - phase_start:.2f}s")
+    shared_tables_loaded = True
 
     # Start your tasks 
-    weather_manager.start()
-    check_player_health.start()
+    if not write_behind_flusher.is_running():
+        write_behind_flusher.start()
+    retry_queue.start()
+    if not snapshot_writer.is_running():
+        snapshot_writer.start()
+    if not game_evictor.is_running():
+        game_evictor.start()
+    await get_game(DEFAULT_GUILD_ID)
 
-    weather_end_time = asyncio.get_running_loop().time() + REGULAR_WEATHER_DURATION
     market_view = View(timeout=180) 
 
-    print("Coin Data:", coin_data)
-    print("Player Data:", player_data)
-    print("Markets:", markets)
-    print("Transactions:", transactions)
+    print(f"Games: {len(games)} loaded")
+    print(f"Markets: {len(markets)}")
+    print(f"Transactions: {len(transactions)}")
+
+
+
+
+async def load_guild_tables() -> bool:
+    """Cold start of a game: streams the guild's rows into memory. Returns False if they are incomplete."""
+    load_ok = True
+    guild_filter = {'guild_id': game().guild_id}
+    try:
+        # Keep anything changed locally since the last load
+        async for item in iter_table('coin_data', COIN_COLUMNS, filters=guild_filter):
+            user_id = str(item['user_id'])
+            if user_id not in game().coin_data:
+                game().coin_data[user_id] = item['coins']
+            advance_high_water('coin_data', [item])
+        async for item in iter_table('player_data', filters=guild_filter):
+            user_id = str(item['user_id']) if item['user_id'] is not None else str(item['id'])
+            if user_id not in game().player_data:
+                register_player(user_id, item)
+            advance_high_water('player_data', [item])
+    except Exception as e:
+        load_ok = False
+        print(f"Error streaming player tables: {e!r}")
+    return load_ok
+
+# --- State Snapshot ---
+# SNAPSHOT_PATH holds the shared tables; each loaded game is saved next to it
+# as state_snapshot.<guild id>.pkl.
+shared_tables_loaded = False
+
+def snapshot_path(guild_id: int = None) -> str:
+    if guild_id is None:
+        return SNAPSHOT_PATH
+    root, extension = os.path.splitext(SNAPSHOT_PATH)
+    return f"{root}.{guild_id}{extension}"
+
+def build_snapshot() -> Dict[str, Any]:
+    return {
+        'version': SNAPSHOT_VERSION,
+        'taken_at': time.time(),
+        'markets': markets,
+        'transactions': transactions,
+        'sync_high_water': sync_high_water,
+    }
+
+def build_guild_snapshot(current: GuildGame) -> Dict[str, Any]:
+    return {
+        'version': SNAPSHOT_VERSION,
+        'taken_at': time.time(),
+        'guild_id': current.guild_id,
+        'coin_data': current.coin_data,
+        'player_data': current.player_data,
+        'sync_high_water': current.sync_high_water,
+        # Monotonic times only mean something in this process, so they are kept relative to now
+        'hunt_budget_start': {user_id: start - time.monotonic() for user_id, start in current.hunt_budget_start.items()},
+    }
 
+def write_snapshot_file(path: str, data: bytes) -> None:
+    temp_path = path + ".tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
 
+async def write_snapshot(path: str, snapshot: Dict[str, Any]) -> None:
+    try:
+        data = pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL)
+        await asyncio.get_running_loop().run_in_executor(None, write_snapshot_file, path, data)
+    except Exception as e:
+        print(f"Error writing snapshot {path}: {e!r}")
+
+async def save_snapshot() -> None:
+    """Writes the shared snapshot and one for every loaded game."""
+    await write_snapshot(snapshot_path(), build_snapshot())
+    for current in list(games.values()):
+        await write_snapshot(snapshot_path(current.guild_id), build_guild_snapshot(current))
+
+def load_snapshot(path: str = SNAPSHOT_PATH) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, 'rb') as f:
+            snapshot = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Ignoring unreadable snapshot: {e!r}")
+        return None
+    if snapshot.get('version') != SNAPSHOT_VERSION:
+        print("Ignoring snapshot from another version")
+        return None
+    return snapshot
+
+def restore_snapshot(snapshot: Dict[str, Any]) -> None:
+    global markets, transactions
+    markets = snapshot['markets']
+    transactions = snapshot['transactions']
+    sync_high_water.update(snapshot['sync_high_water'])
+
+def restore_guild_snapshot(snapshot: Dict[str, Any]) -> None:
+    game().coin_data.update(snapshot['coin_data'])
+    for user_id, row in snapshot['player_data'].items():
+        register_player(user_id, row)
+    game().sync_high_water.update(snapshot['sync_high_water'])
+    game().hunt_budget_start.update({user_id: time.monotonic() + offset
+                                     for user_id, offset in snapshot.get('hunt_budget_start', {}).items()})
+
+@tasks.loop(seconds=SNAPSHOT_INTERVAL)
+async def snapshot_writer():
+    await save_snapshot()
+
+async def reconcile_members(guild) -> None:
+    """Creates rows for the guild's members missing from the registry, using bulk inserts."""
+    if guild is None:
+        return
+    # Set difference in memory, then bulk insert
+    phase_start = time.perf_counter()
+    member_ids = {str(member.id) for member in guild.members}
+    missing_players = member_ids - game().player_data.keys()
+    missing_coins = member_ids - game().coin_data.keys()
+    for user_id in missing_players:
+        register_player(user_id, {})
+    for user_id in missing_coins:
+        game().coin_data[user_id] = 0
+    print(f"[game {guild.id}] diff {len(member_ids)} members: {len(missing_players)} missing players, "
+          f"{len(missing_coins)} missing coin rows ({time.perf_counter() - phase_start:.2f}s)")
+
+    phase_start = time.perf_counter()
+    player_results = await save_data_bulk('player_data', [game().player_data[user_id] for user_id in missing_players])
+    coin_results = await save_data_bulk('coin_data', [{'user_id': int(user_id), 'coins': 0} for user_id in missing_coins])
+    # Failed chunks fall back to the write-behind buffer and get retried on the next flush
+    for row in failed_rows(player_results):
+        mark_dirty('player_data', row)
+    for row in failed_rows(coin_results):
+        mark_dirty('coin_data', row)
+    print(f"[game {guild.id}] bulk insert {len(player_results) + len(coin_results)} chunks: "
+          f"{time.perf_counter() - phase_start:.2f}s")
 
 
 @bot.event
@@ -615,58 +1757,120 @@ async def on_command_error(ctx, error):
 
 @bot.event
 async def on_guild_available(guild):
-    """Update coin_data and player_data when a guild becomes available."""
-    global coin_data, player_data
+    """Pull rows changed since the last sync when a guild becomes available (including reconnects)."""
     print(f"Guild available: {guild.name}")
-
-    # Load coin_data 
-    coin_data_temp = await load_data('coin_data')
-    # Update coin_data 
-    for item in coin_data_temp:
-        user_id = str(item['user_id'])
-        coin_data[user_id] = item['coins']
-
-    # Load player_data
-    player_data_temp = await load_data('player_data')
-    # Update player_data
-    for item in player_data_temp:
-        user_id = str(item['user_id']) if item['user_id'] is not None else str(item['id'])
-        player_data[user_id] = {}
-
-        # Update existing player data or add new keys if needed
-        player_data[user_id].update({
-            'gun_durability': item['gun_durability'],
-            'ammo': item['ammo'],
-            'health': item.get('health', 100),
-            'camp_durability': item.get('camp_durability', 100),
-            'healing_potions': item.get('healing_potions', 1)
-        })
+    if guild.id in games:
+        # Games that aren't loaded catch up when they next load
+        current_game.set(games[guild.id])
+        await delta_sync()
+
+# --- Delta Sync ---
+# Each synced table needs an `updated_at timestamptz` column maintained by a
+# trigger; only rows newer than the table's high-water mark are pulled.
+# Guild tables are synced per game and keep their marks in the game.
+SYNC_TABLES = ('coin_data', 'player_data')
+sync_high_water: Dict[str, str] = {}
+
+def high_water(table_name: str) -> Dict[str, str]:
+    return game().sync_high_water if table_name in GUILD_TABLES else sync_high_water
+
+def advance_high_water(table_name: str, rows: List[Dict[str, Any]]) -> None:
+    marks = high_water(table_name)
+    for item in rows:
+        updated_at = item.get('updated_at')
+        if updated_at and updated_at > marks.get(table_name, ''):
+            marks[table_name] = updated_at
+
+def merge_rows(table_name: str, rows: List[Dict[str, Any]]) -> int:
+    """Merges changed rows into memory. Rows with local writes the database hasn't stored yet are left alone."""
+    # Buffered, retrying and journaled-but-unacknowledged writes are all newer than the database
+    journaled = {key for key, in journal.execute("SELECT DISTINCT user_id FROM journal WHERE table_name = ? AND user_id LIKE ?",
+                                                 (table_name, f"{game().guild_id}:%"))}
+    merged = 0
+    for item in rows:
+        user_id = str(item['user_id']) if item.get('user_id') is not None else str(item['id'])
+        key = (table_name, f"{game().guild_id}:{user_id}")
+        if key in dirty_rows or key in retry_queue or key[1] in journaled:
+            continue  # Unstored local changes win
+        if table_name == 'coin_data':
+            game().coin_data[user_id] = item['coins']
+        else:
+            register_player(user_id, {**game().player_data.get(user_id, {}), **item})
+        merged += 1
+    advance_high_water(table_name, rows)
+    return merged
+
+async def fetch_changed_rows(table_name: str) -> List[Dict[str, Any]]:
+    columns = COIN_COLUMNS if table_name == 'coin_data' else "*"
+    return [row async for row in iter_table(table_name, columns, since=high_water(table_name).get(table_name),
+                                            filters={'guild_id': game().guild_id})]
+
+async def run_delta_sync() -> bool:
+    """Returns False if any table could not be synced."""
+    ok = True
+    for table_name in SYNC_TABLES:
+        try:
+            rows = await fetch_changed_rows(table_name)
+        except Exception as e:
+            print(f"Error syncing {table_name}: {e!r}")
+            ok = False
+            continue
+        merged = merge_rows(table_name, rows)
+        print(f"Delta sync {table_name}: {merged}/{len(rows)} rows merged, "
+              f"high-water {high_water(table_name).get(table_name)}")
+    return ok
+
+async def delta_sync() -> None:
+    """Runs one delta sync; concurrent callers share the sync that is already in flight."""
+    if game().delta_sync_task is None or game().delta_sync_task.done():
+        game().delta_sync_task = asyncio.create_task(run_delta_sync())
+    await asyncio.shield(game().delta_sync_task)
 
 @bot.event
 async def on_member_join(member):
+    use_game(await get_game(member.guild.id))
     user_id = str(member.id)
     # Initialize player data first
     await initialize_player_data(user_id) 
     # Then check and update coin_data
-    existing_user = supabase.table('coin_data').select("*").eq('user_id', int(user_id)).execute()
-    if not existing_user.data:
+    if not await row_exists('coin_data', user_id):
+        game().coin_data[user_id] = 0
+        game().absent_user_ids.pop(('coin_data', user_id), None)
         await save_data('coin_data', {'user_id': int(user_id), 'coins': 0})
     # Give the new member a healing potion
-    async with camp_users_lock:
-        if user_id in player_data:
-            player_data[user_id]["healing_potions"] += 1 
+    async with game().camp_users_lock:
+        if user_id in game().player_data:
+            game().player_data[user_id]["healing_potions"] += 1 
             await save_data('player_data', 
-                            {'user_id': int(user_id), 'healing_potions': player_data[user_id]['healing_potions']}, 
+                            {'user_id': int(user_id), 'healing_potions': game().player_data[user_id]['healing_potions']}, 
                             upsert=True) 
 
 @bot.command(name='stop')
 async def stop_command(ctx):
     if ctx.author.id in AUTHORIZED_USERS:
         await ctx.send("Shutting down immediately!")
-        await bot.logout()
+        await flush_write_buffer()
+        await bot.close()
     else:
         await ctx.send("You are not authorized to use this command.")
 
+@bot.command(name='db_status')
+async def db_status_command(ctx):
+    if ctx.author.id not in AUTHORIZED_USERS and ctx.author.id not in AUTHORIZED_MEMBER:
+        await ctx.send("You are not authorized to use this command.")
+        return
+    stats = retry_queue.stats()
+    embed = discord.Embed(title="Storage Status", color=discord.Color.blue())
+    embed.add_field(name="Buffered Rows", value=str(len(dirty_rows)), inline=True)
+    embed.add_field(name="Retry Depth", value=str(stats['depth']), inline=True)
+    embed.add_field(name="Oldest Retry", value=f"{stats['oldest_age']:.0f}s", inline=True)
+    embed.add_field(
+        name="Retry Counters",
+        value=", ".join(f"{name}: {stats[name]}" for name in ['queued', 'coalesced', 'retried', 'succeeded', 'dropped', 'overflow']),
+        inline=False
+    )
+    await ctx.send(embed=embed)
+
 @bot.command(name='set_reminder_1')
 async def set_reminder(ctx):
     global reminder_task
@@ -768,6 +1972,8 @@ async def help_command(ctx):
         name="**Hunt Commands**",
         value=
         "`!hunt` - Gonna hunt a random mob whit a chance(like gambling ig\n"
+        f"`!hunt <count>` - Hunt up to {HUNT_BATCH_MAX} times at once with the cooldown you saved up\n"
+        "`!forecast` - See the coming weather, Chaos and blizzards\n"
         "`!inventory` - Check your shotgun durability and ammo\n"
         "`!shop` - A shop to buy a guj and ammo\n",
         inline=False)
@@ -815,7 +2021,8 @@ async def help_admin_command(ctx):
     embed.add_field(
         name="**Game Control**",
         value="`!edit_user [user]` - Edit user's gun durability and ammo amount\n"
-              "`!bioweather [weather]` - Change the weather in the game\n",
+              "`!bioweather [weather]` - Change the weather in the game\n"
+              "`!replay_hunt [hunt_id]` - Re-run a logged hunt and check its result\n",
         inline=False
     )
     
@@ -840,7 +2047,8 @@ async def help_owner_command(ctx):
               "`!force_pay [amount] [payer] [payee]` - Force a transaction between two users\n"
               "`!give_abmin [member]` - Assign or remove a role randomly with a chance to get nothing\n"
               "`!add_member [member]` - Add a member to the authorized members list\n"
-              "`!remove_member [member]` - Remove a member from the authorized members list",
+              "`!remove_member [member]` - Remove a member from the authorized members list\n"
+              "`!db_status` - Show buffered writes and the retry queue",
         inline=False
     )
     await ctx.send(embed=embed)
@@ -960,14 +2168,579 @@ mobs = [("Aardvark", 10, 45.0, discord.Color.random()),
 for mob in mobs:
     random.shuffle(mobs)
 
+# --- Hunt Rules ---
+# One declarative entry per weather a hunt can run in. Chaos sub-weathers are
+# keyed "Chaos <weather>" and Snowy during a blizzard gets a "(Blizzard)" entry.
+# The hunt executor and the economy simulator both read this table:
+#   num_mobs: (counts, weights) for how many mobs a hunt catches
+#   min_reward: mob pool threshold (see mob_samplers)
+#   attempt / fail: chance the hunt happens at all, then chance it fails with `fail_damage`
+#   exhaust: chance of losing `exhaust_damage` health and the reward
+#   storm: (warning chance, damage if not camping, camp degradation)
+#   field / nothing / failed: embed text, the shared lines live in HUNT_TEXT
+RAINY_COUNT_WEIGHTS = [64, 57, 52, 47, 43, 37, 33, 26, 15]
+HUNT_RULES = {
+    "Sunny": {'num_mobs': ([2, 3, 4], [43, 22, 15]), 'min_reward': 20, 'exhaust': 0.15, 'exhaust_damage': 5,
+              'field': "You hunted in Sunny weather:"},
+    "Snowy": {'num_mobs': ([1, 2, 3], [55, 39, 25]), 'min_reward': 50, 'attempt': 0.78,
+              'field': "You hunted in Snowy weather:",
+              'nothing': "The weather was too cold, and you couldn't hunt anything!"},
+    "Snowy (Blizzard)": {'num_mobs': ([1, 2, 3, 4], [54, 43, 33, 21]), 'min_reward': 200,
+                         'attempt': 0.55, 'fail': 0.19, 'fail_damage': 20,
+                         'field': "You hunted in a Blizzard!:",
+                         'nothing': "The blizzard's thick snow reduced visibility, and you couldn't hunt anything!",
+                         'failed': "You got too cold from the blizzard, and you took **20 damages** and couldn't hunt anything!"},
+    "Rainy": {'num_mobs': ([2, 3, 4, 5, 6, 7, 8, 9, 10], RAINY_COUNT_WEIGHTS), 'min_reward': 10,
+              'field': "You hunted in Rainy weather:"},
+    # The storm counts are uniform: the old branches passed (count, weight) tuples to random.choices
+    "Stormy": {'num_mobs': ([1, 2, 3], [1, 1, 1]), 'min_reward': 50,
+               'storm': (0.30, STORM_DAMAGE["Stormy"], CAMP_DEGRADATION["Stormy"]),
+               'field': "You hunted in Stormy weather:"},
+    "Super Storm": {'num_mobs': ([1, 3, 4], [1, 1, 1]), 'min_reward': 400,
+                    'storm': (0.20, STORM_DAMAGE["Super Storm"], CAMP_DEGRADATION["Super Storm"]),
+                    'field': "You hunted in Super Storm weather:"},
+    "Chaos Sunny": {'num_mobs': ([2, 3, 4], [43, 22, 15]), 'min_reward': 500, 'exhaust': 0.15, 'exhaust_damage': 5,
+                    'field': "ɎØɄ ⱧɄ₦₮ɆĐ ł₦ ₴Ʉ₦₦Ɏ ₵Ⱨ₳Ø₴ :"},
+    "Chaos Snowy": {'num_mobs': ([1, 2, 3], [55, 39, 25]), 'min_reward': 500, 'attempt': 0.50,
+                    'field': "ɎØɄ ⱧɄ₦₮ɆĐ ł₦ ₵Ⱨ₳Ø₴ ₴₦Ø₩Ɏ :",
+                    'nothing': "₮ⱧɆ ₩Ɇ₳₮ⱧɆⱤ ₩₳₴ ₮ØØ ₵ØⱠĐ, ₳₦Đ ɎØɄ ₵ØɄⱠĐ₦'₮ ⱧɄ₦₮ ₳₦Ɏ₮Ⱨł₦₲!"},
+    "Chaos Snowy (Blizzard)": {'num_mobs': ([1, 2, 3, 4], [54, 43, 33, 21]), 'min_reward': 1500,
+                               'attempt': 0.55, 'fail': 0.25, 'fail_damage': 40,
+                               'field': "ɎØɄ ⱧɄ₦₮ɆĐ ł₦ ₳ ₵Ⱨ₳Ø₴ ฿ⱠłⱫⱫ₳ⱤĐ! :",
+                               'nothing': "₮ⱧɆ ฿ⱠłⱫⱫ₳ⱤĐ'₴ ₮Ⱨł₵₭ ₴₦Ø₩ ⱤɆĐɄ₵ɆĐ Vł₴ł฿łⱠł₮Ɏ, ₳₦Đ ɎØɄ ₵ØɄⱠĐ₦'₮ ⱧɄ₦₮ ₳₦Ɏ₮Ⱨł₦₲!",
+                               'failed': "ɎØɄ ₲Ø₮ ₮ØØ ₵ØⱠĐ ₣ⱤØ₥ ₮ⱧɆ ฿ⱠłⱫⱫ₳ⱤĐ, ₳₦Đ ɎØɄ ₮ØØ₭ **𝟰𝟬 Đ₳₥₳₲Ɇ₴** ₳₦Đ ₵ØɄⱠĐ₦'₮ ⱧɄ₦₮ ₳₦Ɏ₮Ⱨł₦₲!"},
+    # Chaos Rainy skips 3 mobs and can catch a single one
+    "Chaos Rainy": {'num_mobs': ([1, 2, 4, 5, 6, 7, 8, 9, 10], RAINY_COUNT_WEIGHTS), 'min_reward': 500,
+                    'field': "ɎØɄ ⱧɄ₦₮ɆĐ ł₦ ₵Ⱨ₳Ø₴ Ɽ₳ł₦Ɏ :"},
+    "Chaos Stormy": {'num_mobs': ([1, 2, 3], [1, 1, 1]), 'min_reward': 2000,
+                     'storm': (0.40, STORM_DAMAGE_CHAOS["Stormy"], CAMP_DEGRADATION_CHAOS["Stormy"]),
+                     'field': "ɎØɄ ⱧɄ₦₮ɆĐ ł₦ ₵Ⱨ₳Ø₴ STORMY :"},
+    "Chaos Super Storm": {'num_mobs': ([1, 3, 4], [1, 1, 1]), 'min_reward': 8000,
+                          'storm': (0.50, STORM_DAMAGE_CHAOS["Super Storm"], CAMP_DEGRADATION_CHAOS["Super Storm"]),
+                          'field': "ɎØɄ ⱧɄ₦₮ɆĐ ł₦ ₵Ⱨ₳Ø₴ SUPER STORM :"},
+}
+
+# Text shared by every rule, picked by whether the hunt ran under Chaos
+HUNT_TEXT = {
+    False: {
+        'title': "Hunt Results {emoji}",
+        'exhausted_title': "You are exhausted!",
+        'exhausted': "You were exhausted! You lost **{damage}** health.",
+        'count': "You hunted {num_mobs} animals at the same time!",
+        'mobs': "Mobs Hunted:",
+        'reward': "Reward:",
+        'earned': "You earned **{coins:,} coins**!",
+    },
+    True: {
+        'title': " **₵Ⱨ₳Ø₴** Results **₵Ⱨ₳Ø₴** ",
+        'exhausted_title': "ɎØɄ ₳ⱤɆ ɆӾⱧ₳Ʉ₴₮ɆĐ!",
+        'exhausted': "ɎØɄ ₩ɆⱤɆ ɆӾⱧ₳Ʉ₴₮ɆĐ! ɎØɄ ⱠØ₴₮ **{damage}** ⱧɆ₳Ⱡ₮Ⱨ.",
+        'count': "ɎØɄ ⱧɄ₦₮ɆĐ {num_mobs} ₳₦ł₥₳Ⱡ₴ ₳₮ ₮ⱧɆ ₴₳₥Ɇ ₮ł₥Ɇ!",
+        'mobs': "₥Ø฿₴ ⱧɄ₦₮ɆĐ:",
+        'reward': "ⱤɆ₩₳ⱤĐ:",
+        'earned': "ɎØɄ Ɇ₳Ɽ₦ɆĐ **{coins:,} ₵Øł₦₴**!",
+    },
+}
+
+STORM_TEXT = {
+    False: {
+        'warning_title': "Storm Warning!",
+        'warning': "<@{user_id}>, a storm is approaching or in progress! Seek shelter using `!camp` or risk taking damage!",
+        'caught_title': "Caught in the Storm!",
+        'caught': "<@{user_id}> You took {damage} damage from the {weather}!",
+        'destroyed_title': "Camp Destroyed!",
+        'destroyed': ("<@{user_id}> Your camp has been destroyed by the storm! You also took **{damage}** damage! "
+                      "Buy camp at the `!shop` or you will be in danger."),
+        'damaged_title': "Storm Damage!",
+        'damaged': "Your camp took **{damage}** durability damage from the storm!",
+        'passed_title': "Weather Update",
+        'passed': "<@{user_id}>, the storm has passed!",
+    },
+    True: {
+        'warning_title': " ₵Ⱨ₳Ø₴ {weather} ₩₳Ɽ₦ł₦₲!",
+        'warning': "<@{user_id}>, ₳ ₵Ⱨ₳Ø₴ {weather}  ł₴ Ɽ₳₲ł₦₲! ₴ɆɆ₭ ₴ⱧɆⱠ₮ɆⱤ Ʉ₴ł₦₲ `!camp` ØⱤ Ɽł₴₭ ₮₳₭ł₦₲ Đ₳₥₳₲Ɇ!",
+        'caught_title': "₵₳Ʉ₲Ⱨ₮ ł₦ ₮ⱧɆ ₵Ⱨ₳Ø₴ {weather}!",
+        'caught': "<@{user_id}> ɎØɄ ₮ØØ₭ {damage} Đ₳₥₳₲Ɇ ₣ⱤØ₥ ₮ⱧɆ {weather}!",
+        'destroyed_title': "₵₳₥₱ ĐɆ₴₮ⱤØɎɆĐ! ",
+        'destroyed': "<@{user_id}> ɎØɄⱤ ₵₳₥₱ Ⱨ₳₴ ฿ɆɆ₦ ĐɆ₴₮ⱤØɎɆĐ ฿Ɏ ₮ⱧɆ ₵Ⱨ₳Ø₴ {weather}! You also took **{damage}** damage!",
+        'damaged_title': "₵Ⱨ₳Ø₴ {weather} Đ₳₥₳₲Ɇ!",
+        'damaged': "ɎØɄⱤ ₵₳₥₱ ₮ØØ₭ **{damage}** ĐɄⱤ₳฿łⱠł₮Ɏ Đ₳₥₳₲Ɇ ₣ⱤØ₥ ₮ⱧɆ {weather}!",
+        'passed_title': "₩Ɇ₳₮ⱧɆⱤ Ʉ₱Đ₳₮Ɇ",
+        'passed': "<@{user_id}>, ₮ⱧɆ ₵Ⱨ₳Ø₴ {weather} Ⱨ₳₴ ₱₳₴₴ɆĐ!",
+    },
+}
+
+# --- Mob Sampling ---
+# Every hunt draws from the mobs worth at least some reward threshold. Each
+# threshold gets a Walker alias table built once, so a draw is O(1) instead
+# of rebuilding the candidate list and weights for every mob.
+MOB_REWARD_THRESHOLDS = tuple(sorted({rule['min_reward'] for rule in HUNT_RULES.values()}))
+
+class MobSampler:
+    """Alias table over `pool`, weighted by each mob's chance (mob[2])."""
+
+    def __init__(self, pool):
+        self.mobs = list(pool)
+        n = len(self.mobs)
+        total = sum(mob[2] for mob in self.mobs)
+        scaled = [mob[2] * n / total for mob in self.mobs]
+        self.prob = [1.0] * n
+        self.alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        # Vose's method: pair each under-full column with an over-full one
+        while small and large:
+            low, high = small.pop(), large.pop()
+            self.prob[low] = scaled[low]
+            self.alias[low] = high
+            scaled[high] -= 1.0 - scaled[low]
+            (small if scaled[high] < 1.0 else large).append(high)
+
+    def draw(self, k: int, rng=random) -> List[tuple]:
+        n = len(self.mobs)
+        picks = []
+        for _ in range(k):
+            u = rng.random() * n
+            column = int(u)
+            picks.append(self.mobs[column] if u - column < self.prob[column] else self.mobs[self.alias[column]])
+        return picks
+
+    def probabilities(self) -> Dict[str, float]:
+        """The exact distribution the table encodes, for checking it against the weights."""
+        n = len(self.mobs)
+        result = {mob[0]: 0.0 for mob in self.mobs}
+        for column, mob in enumerate(self.mobs):
+            result[mob[0]] += self.prob[column] / n
+            result[self.mobs[self.alias[column]][0]] += (1.0 - self.prob[column]) / n
+        return result
+
+mob_samplers: Dict[int, MobSampler] = {}
+
+def rebuild_mob_samplers() -> None:
+    """Call again whenever `mobs` changes; recompiles the hunt rules too."""
+    mob_samplers.clear()
+    for threshold in MOB_REWARD_THRESHOLDS:
+        # `mobs` is shuffled at import; a fixed column order lets a logged seed replay in any process
+        pool = sorted((mob for mob in mobs if mob[1] >= threshold), key=lambda mob: mob[:3])
+        mob_samplers[threshold] = MobSampler(pool)
+    compile_hunt_rules()
+
+def draw_mobs(min_reward: int, k: int, rng=random):
+    """Draws `k` mobs worth at least `min_reward`. Returns (names, total reward)."""
+    picks = mob_samplers[min_reward].draw(k, rng)
+    return [mob[0] for mob in picks], sum(mob[1] for mob in picks)
+
+# --- Hunt Engine ---
+# HUNT_RULES compiled once into HUNT_DISPATCH: each entry carries its cumulative
+# count weights and mob sampler, so a hunt is a dict lookup plus a few draws.
+HUNT_DISPATCH: Dict[str, Dict[str, Any]] = {}
+
+def compile_hunt_rules() -> None:
+    """Run by rebuild_mob_samplers; call again if HUNT_RULES changes."""
+    HUNT_DISPATCH.clear()
+    for key, rule in HUNT_RULES.items():
+        chaos = key.startswith("Chaos ")
+        counts, weights = rule['num_mobs']
+        cum_weights = []
+        for weight in weights:
+            cum_weights.append((cum_weights[-1] if cum_weights else 0) + weight)
+        HUNT_DISPATCH[key] = dict(
+            rule,
+            key=key,
+            chaos=chaos,
+            weather=key.removeprefix("Chaos ").removesuffix(" (Blizzard)"),
+            counts=tuple(counts),
+            cum_weights=tuple(cum_weights),
+            sampler=mob_samplers[rule['min_reward']],
+            # Seconds between the storm warning and the hit (see StormScheduler)
+            storm_delay=STORM_WARNING_DURATION_CHAOS + 5 if chaos else STORM_WARNING_DURATION,
+        )
+
+def hunt_rule_key(weather: str, sub_weather: Optional[str], blizzard: bool) -> str:
+    key = f"Chaos {sub_weather}" if weather == "Chaos" else weather
+    if key.endswith("Snowy") and blizzard:
+        key += " (Blizzard)"
+    return key
+
+def current_hunt_rule() -> Dict[str, Any]:
+    """The compiled rule for the weather right now."""
+    return HUNT_DISPATCH[hunt_rule_key(game().weather_state.weather, game().weather_state.sub_weather, game().blizzard_event.is_set())]
+
+def roll_hunt(rule: Dict[str, Any], rng=random) -> Dict[str, Any]:
+    """Rolls one hunt under a compiled rule without touching any player state.
+
+    `result` is 'hunted', 'exhausted' (mobs caught but no reward), 'failed'
+    (took `damage`, caught nothing) or 'nothing'.
+    """
+    outcome = {'rule': rule['key'], 'result': 'hunted', 'num_mobs': 0, 'mobs': [], 'coins': 0, 'damage': 0, 'storm': False}
+    if 'attempt' in rule and rng.random() > rule['attempt']:
+        outcome['result'] = 'nothing'
+        return outcome
+    if 'fail' in rule and rng.random() <= rule['fail']:
+        outcome.update(result='failed', damage=rule['fail_damage'])
+        return outcome
+    num_mobs = rng.choices(rule['counts'], cum_weights=rule['cum_weights'], k=1)[0]
+    picks = rule['sampler'].draw(num_mobs, rng)
+    outcome.update(num_mobs=num_mobs, mobs=[mob[0] for mob in picks], coins=sum(mob[1] for mob in picks))
+    if 'exhaust' in rule and rng.random() <= rule['exhaust']:
+        outcome.update(result='exhausted', damage=rule['exhaust_damage'])
+    if 'storm' in rule and rng.random() <= rule['storm'][0]:
+        outcome['storm'] = True
+    return outcome
+
+def apply_hunt_outcome(user_id: str, outcome: Dict[str, Any]) -> None:
+    if outcome['damage']:
+        damage_player(user_id, outcome['damage'])
+    if outcome['result'] == 'hunted' and game().coin_data.get(user_id, 0) < INFINITY_THRESHOLD:
+        game().coin_data[user_id] = game().coin_data.get(user_id, 0) + outcome['coins']
+
+def build_hunt_embed(rule: Dict[str, Any], outcome: Dict[str, Any], user_id: str) -> discord.Embed:
+    text = HUNT_TEXT[rule['chaos']]
+    embed = discord.Embed(title=text['title'].format(emoji=WEATHER_EMOJIS[rule['weather']]),
+                          color=random.choice(WEATHER_COLORS[rule['weather']]))
+    if outcome['result'] == 'nothing':
+        embed.description = rule['nothing']
+    elif outcome['result'] == 'failed':
+        embed.description = rule['failed']
+    else:
+        if outcome['result'] == 'exhausted':
+            embed.title = text['exhausted_title']
+            embed.description = text['exhausted'].format(damage=outcome['damage'])
+            embed.color = discord.Color.red()
+        embed.add_field(name=rule['field'], value=text['count'].format(num_mobs=outcome['num_mobs']), inline=False)
+        embed.add_field(name=text['mobs'], value=", ".join(outcome['mobs']), inline=False)
+        embed.add_field(name=text['reward'], value=text['earned'].format(coins=outcome['coins']), inline=False)
+    embed.add_field(name="❤️ Health:", value=handle_infinity(game().player_data[user_id]["health"]), inline=True)
+    embed.add_field(name="<:shotgun:1267441675639459964> Durability:", value=handle_infinity(game().player_data[user_id]["gun_durability"]), inline=True)
+    embed.add_field(name="<:ammo:1267441870519144518> Ammo:", value=handle_infinity(game().player_data[user_id]["ammo"]), inline=True)
+    embed.set_footer(text=f"Hunt {outcome['seed']} | WARNING The data is just a reference, the error can be from 2 to 3 compared to normal. For more accuracy, use the `!inventory` command.")
+    return embed
+
+# --- Hunt Audit Log ---
+# Every hunt rolls on its own random.Random, seeded from HUNT_SEED, this
+# process's boot id, the hunter and a per-hunter counter, and is appended to
+# HUNT_LOG_PATH as one JSON line. Rolling a record's seed under its weather
+# reproduces the hunt exactly. The counters start again after a restart, so the
+# boot id keeps a fixed HUNT_SEED from repeating (and predicting) earlier seeds.
+HUNT_SEED = os.getenv("HUNT_SEED") or secrets.token_hex(8)
+HUNT_BOOT_ID = secrets.token_hex(8)
+HUNT_LOG_PATH = os.getenv("HUNT_LOG_PATH", "hunt_log.jsonl")
+HUNT_LOG_MAX_BYTES = int(os.getenv("HUNT_LOG_MAX_BYTES", 10 * 1024 * 1024))
+HUNT_LOG_BACKUPS = int(os.getenv("HUNT_LOG_BACKUPS", 5))  # hunt_log.jsonl.1 ... .N
+# Counters stay global rather than per game: a player hunting in two guilds
+# would otherwise roll the same seeds, and hunt ids, in both
+hunt_counters: Dict[str, int] = {}
+hunt_log_file = None
+hunt_log_bytes = 0
+
+def derive_hunt_seed(user_id: str, counter: int, boot_id: str = HUNT_BOOT_ID) -> int:
+    digest = hashlib.blake2b(f"{HUNT_SEED}:{boot_id}:{user_id}:{counter}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+def hunt_log_paths() -> List[str]:
+    """Newest first."""
+    return [HUNT_LOG_PATH] + [f"{HUNT_LOG_PATH}.{i}" for i in range(1, HUNT_LOG_BACKUPS + 1)]
+
+def append_hunt_log(record: Dict[str, Any]) -> None:
+    global hunt_log_file, hunt_log_bytes
+    # Encoded once, so rotation and the running total both count bytes
+    line = (json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n").encode('utf-8')
+    try:
+        if hunt_log_file is None:
+            hunt_log_file = open(HUNT_LOG_PATH, 'ab')
+            hunt_log_bytes = hunt_log_file.tell()
+        if hunt_log_bytes and hunt_log_bytes + len(line) > HUNT_LOG_MAX_BYTES:
+            hunt_log_file.close()
+            paths = hunt_log_paths()
+            for older, newer in zip(reversed(paths[1:]), reversed(paths[:-1])):
+                if os.path.exists(newer):
+                    os.replace(newer, older)
+            hunt_log_file = open(HUNT_LOG_PATH, 'ab')
+            hunt_log_bytes = 0
+        hunt_log_file.write(line)
+        hunt_log_file.flush()
+        hunt_log_bytes += len(line)
+    except OSError as e:
+        print(f"Could not write hunt log: {e}")
+
+def roll_logged_hunt(user_id: str, rule: Dict[str, Any]) -> Dict[str, Any]:
+    """roll_hunt on a derived seed, logged. The outcome carries the hex seed as the hunt id."""
+    counter = hunt_counters.get(user_id, 0) + 1
+    hunt_counters[user_id] = counter
+    seed = derive_hunt_seed(user_id, counter)
+    outcome = roll_hunt(rule, random.Random(seed))
+    hunt_id = f"{seed:016x}"
+    append_hunt_log({
+        'seed': hunt_id,
+        'boot': HUNT_BOOT_ID,
+        'counter': counter,
+        'guild_id': game().guild_id,
+        'user_id': user_id,
+        'at': round(time.time(), 3),
+        'weather': game().weather_state.weather,
+        'sub_weather': game().weather_state.sub_weather,
+        'blizzard': game().blizzard_event.is_set(),
+        'outcome': dict(outcome),
+    })
+    outcome['seed'] = hunt_id
+    return outcome
+
+def find_hunt_record(hunt_id: str) -> Optional[Dict[str, Any]]:
+    """Searches the log and its backups. Blocking, run it off the event loop."""
+    needle = f'"seed":"{hunt_id}"'
+    for path in hunt_log_paths():
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if needle in line:
+                    return json.loads(line)
+    return None
+
+def replay_hunt_record(record: Dict[str, Any]):
+    """Re-rolls a logged hunt. Returns (matches the log, replayed outcome)."""
+    key = hunt_rule_key(record['weather'], record['sub_weather'], record['blizzard'])
+    outcome = roll_hunt(HUNT_DISPATCH[key], random.Random(int(record['seed'], 16)))
+    return outcome == record['outcome'], outcome
+
+# --- Storm Scheduler ---
+def apply_storm_hit(user_id: str, rule: Dict[str, Any]) -> discord.Embed:
+    """Hits a warned hunter, or their camp, in memory. Call with camp_users_lock held."""
+    text = STORM_TEXT[rule['chaos']]
+    weather = rule['weather'].upper() if rule['chaos'] else rule['weather']
+    _, damage, degradation = rule['storm']
+    if user_id not in game().camp_users:
+        damage_player(user_id, damage)
+        return discord.Embed(title=text['caught_title'].format(weather=weather),
+                             description=text['caught'].format(user_id=user_id, damage=damage, weather=weather),
+                             color=discord.Color.red())
+    game().player_data[user_id]['camp_durability'] = subtract_with_infinity(game().player_data[user_id]['camp_durability'], degradation)
+    if game().player_data[user_id]['camp_durability'] <= 0:
+        # The storm tears through the camp and hits the player too
+        damage_player(user_id, degradation)
+        del game().camp_users[user_id]
+        return discord.Embed(title=text['destroyed_title'],
+                             description=text['destroyed'].format(user_id=user_id, damage=degradation, weather=weather),
+                             color=discord.Color.red())
+    embed = discord.Embed(title=text['damaged_title'].format(weather=weather),
+                          description=text['damaged'].format(damage=degradation, weather=weather),
+                          color=discord.Color.dark_gray())
+    embed.add_field(name="Camp Durability:", value=handle_infinity(game().player_data[user_id]['camp_durability']), inline=False)
+    return embed
+
+class StormScheduler:
+    """Pending storm resolutions as a heap of deadlines served by one task.
+
+    A warning only records when the storm hits; the hunt handler returns
+    straight away. When deadlines pass, every due hunter is resolved in one
+    pass under camp_users_lock, and the messages go out after it is released.
+    """
+
+    def __init__(self):
+        self.heap: List[tuple] = []  # (deadline, seq, user_id)
+        self.pending: Dict[str, Dict[str, Any]] = {}
+        self.seq = 0
+        self.wakeup = asyncio.Event()
+        self.task: asyncio.Task = None
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    def schedule(self, ctx, user_id: str, rule: Dict[str, Any]) -> None:
+        deadline = time.monotonic() + rule['storm_delay']
+        game().storm_warned_users[user_id] = asyncio.get_event_loop().time()
+        self.seq += 1
+        # Rescheduling a user leaves the old heap record behind; it is skipped when popped
+        self.pending[user_id] = {'deadline': deadline, 'seq': self.seq, 'ctx': ctx, 'rule': rule}
+        heapq.heappush(self.heap, (deadline, self.seq, user_id))
+        self.wakeup.set()
+
+    def start(self) -> None:
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    async def run(self) -> None:
+        while True:
+            if not self.heap:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+            delay = self.heap[0][0] - time.monotonic()
+            if delay > 0:
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self.resolve_due()
+            except Exception as e:
+                print(f"Error resolving storms: {e!r}")
+
+    async def resolve_due(self) -> None:
+        now = time.monotonic()
+        resolved = []
+        async with game().camp_users_lock:
+            while self.heap and self.heap[0][0] <= now:
+                _, seq, user_id = heapq.heappop(self.heap)
+                entry = self.pending.get(user_id)
+                if entry is None or entry['seq'] != seq:
+                    continue
+                del self.pending[user_id]
+                if game().storm_warned_users.pop(user_id, None) is None or user_id not in game().player_data:
+                    continue
+                resolved.append((user_id, entry, apply_storm_hit(user_id, entry['rule'])))
+
+        for user_id, entry, embed in resolved:
+            await save_data('player_data', {
+                'user_id': int(user_id),
+                'health': game().player_data[user_id]['health'],
+                'camp_durability': game().player_data[user_id]['camp_durability']
+            }, upsert=True)
+            rule = entry['rule']
+            text = STORM_TEXT[rule['chaos']]
+            weather = rule['weather'].upper() if rule['chaos'] else rule['weather']
+            try:
+                await entry['ctx'].reply(embed=embed)
+                await entry['ctx'].send(embed=discord.Embed(title=text['passed_title'],
+                                                            description=text['passed'].format(user_id=user_id, weather=weather),
+                                                            color=discord.Color.gold()))
+            except discord.HTTPException as e:
+                print(f"Could not announce storm damage for {user_id}: {e}")
+
+def build_storm_warning(user_id: str, rule: Dict[str, Any]) -> discord.Embed:
+    text = STORM_TEXT[rule['chaos']]
+    weather = rule['weather'].upper() if rule['chaos'] else rule['weather']
+    return discord.Embed(
+        title=text['warning_title'].format(weather=weather),
+        description=text['warning'].format(user_id=user_id, weather=weather),
+        color=discord.Color.magenta()
+    )
+
+async def execute_hunt(ctx, user_id: str) -> Dict[str, Any]:
+    """Runs one hunt under the current weather and replies with the results."""
+    rule = current_hunt_rule()
+    outcome = roll_logged_hunt(user_id, rule)
+    apply_hunt_outcome(user_id, outcome)
+    await save_data('coin_data', {'user_id': int(user_id), 'coins': game().coin_data.get(user_id, 0)}, upsert=True)
+    if outcome['storm']:
+        game().storm_scheduler.schedule(ctx, user_id, rule)
+        await ctx.reply(embed=build_storm_warning(user_id, rule))
+    await ctx.reply(embed=build_hunt_embed(rule, outcome, user_id))
+    return outcome
+
+rebuild_mob_samplers()
+
+# --- Hunt Budget ---
+# A plain !hunt is limited by hunt_cooldown. `!hunt N` spends banked credit:
+# one hunt per HUNT_COOLDOWN seconds since the player's last hunt, up to
+# HUNT_BATCH_MAX, so batching never earns more than hunting every cooldown.
+# A player without a bucket (new, or after a restart or eviction) starts with
+# one hunt and nothing banked.
+
+def hunt_credits(user_id: str) -> int:
+    start = game().hunt_budget_start.get(user_id)
+    if start is None:
+        return 1
+    return max(0, min(HUNT_BATCH_MAX, int((time.monotonic() - start) // HUNT_COOLDOWN)))
+
+def next_hunt_credit_in(user_id: str) -> float:
+    start = game().hunt_budget_start.get(user_id, time.monotonic() - HUNT_COOLDOWN)
+    return max(0.0, start + (hunt_credits(user_id) + 1) * HUNT_COOLDOWN - time.monotonic())
+
+def spend_hunt_credits(user_id: str, hunts: int) -> None:
+    now = time.monotonic()
+    start = game().hunt_budget_start.get(user_id, now - HUNT_COOLDOWN)
+    game().hunt_budget_start[user_id] = max(start, now - HUNT_BATCH_MAX * HUNT_COOLDOWN) + hunts * HUNT_COOLDOWN
+
+def spend_hunt_resources(user_id: str) -> None:
+    """Ammo and gun wear for one hunt."""
+    game().player_data[user_id]["gun_durability"] = subtract_with_infinity(game().player_data[user_id]["gun_durability"], 2)
+    game().player_data[user_id]["ammo"] = subtract_with_infinity(game().player_data[user_id]["ammo"], 3)
+
+async def execute_hunt_batch(ctx, user_id: str, count: int) -> Dict[str, Any]:
+    """Runs up to `count` hunts under the current weather with one save and one reply.
+
+    The save is one row per table, coin_data and player_data, the same two a
+    single hunt writes, journaled together whatever the batch size.
+
+    Stops early when ammo, gun durability or health runs out, or when a storm
+    warning fires (warned players can't hunt until it resolves).
+    """
+    rule = current_hunt_rule()
+    summary = {'hunts': 0, 'coins': 0, 'damage': 0, 'mobs': {}, 'results': {}, 'stopped': None, 'storm': False}
+    start_gun = game().player_data[user_id]["gun_durability"]
+    start_ammo = game().player_data[user_id]["ammo"]
+    for _ in range(count):
+        if game().player_data[user_id]["ammo"] <= 0:
+            summary['stopped'] = "Out of ammo"
+            break
+        if game().player_data[user_id]["gun_durability"] <= 0:
+            summary['stopped'] = "Your gun broke"
+            break
+        outcome = roll_logged_hunt(user_id, rule)
+        apply_hunt_outcome(user_id, outcome)
+        summary['hunts'] += 1
+        summary['damage'] += outcome['damage']
+        summary['results'][outcome['result']] = summary['results'].get(outcome['result'], 0) + 1
+        if outcome['result'] == 'hunted':
+            summary['coins'] += outcome['coins']
+        for name in outcome['mobs']:
+            summary['mobs'][name] = summary['mobs'].get(name, 0) + 1
+        if game().player_data[user_id]["health"] <= 0:
+            summary['stopped'] = "Out of health"
+            break
+        spend_hunt_resources(user_id)
+        if outcome['storm']:
+            game().storm_scheduler.schedule(ctx, user_id, rule)
+            summary['storm'] = True
+            summary['stopped'] = "Storm warning! Seek shelter using `!camp`"
+            break
+
+    # Both rows are journaled in one transaction and buffered together, like a transfer's legs
+    rows = [('coin_data', build_complete_row('coin_data', {'user_id': int(user_id), 'coins': game().coin_data.get(user_id, 0)})),
+            ('player_data', build_complete_row('player_data', {'user_id': int(user_id)}))]
+    for (table_name, row), seq in zip(rows, journal_append_many(rows)):
+        mark_dirty(table_name, row, seq=seq)
+    if summary['storm']:
+        # Same warning as a single hunt, so the player knows to camp before it hits
+        await ctx.reply(embed=build_storm_warning(user_id, rule))
+
+    text = HUNT_TEXT[rule['chaos']]
+    embed = discord.Embed(title=f"{text['title'].format(emoji=WEATHER_EMOJIS[rule['weather']])} x{summary['hunts']}",
+                          color=random.choice(WEATHER_COLORS[rule['weather']]))
+    outcomes = ", ".join(f"{name} x{n}" for name, n in summary['results'].items())
+    embed.add_field(name="Hunts:", value=f"{summary['hunts']}/{count} ({outcomes or 'none'})", inline=False)
+    if summary['stopped']:
+        embed.description = f"Stopped early: {summary['stopped']}"
+    mobs_line = ", ".join(f"{name} x{n}" if n > 1 else name
+                          for name, n in sorted(summary['mobs'].items(), key=lambda item: -item[1]))
+    if len(mobs_line) > 1024:
+        mobs_line = mobs_line[:1020] + " ..."
+    embed.add_field(name=text['mobs'], value=mobs_line or "-", inline=False)
+    embed.add_field(name=text['reward'], value=text['earned'].format(coins=summary['coins']), inline=False)
+    embed.add_field(
+        name="Losses:",
+        value=(f"-{summary['damage']} health, "
+               f"-{handle_infinity(start_gun - game().player_data[user_id]['gun_durability'])} durability, "
+               f"-{handle_infinity(start_ammo - game().player_data[user_id]['ammo'])} ammo"),
+        inline=False)
+    embed.add_field(name="❤️ Health:", value=handle_infinity(game().player_data[user_id]["health"]), inline=True)
+    embed.add_field(name="<:shotgun:1267441675639459964> Durability:", value=handle_infinity(game().player_data[user_id]["gun_durability"]), inline=True)
+    embed.add_field(name="<:ammo:1267441870519144518> Ammo:", value=handle_infinity(game().player_data[user_id]["ammo"]), inline=True)
+    embed.set_footer(text="WARNING The data is just a reference, the error can be from 2 to 3 compared to normal. For more accuracy, use the `!inventory` command.")
+    await ctx.reply(embed=embed)
+    return summary
+
 # --- Hunt Command ---
 @bot.command(name='hunt')
 @in_hunt_channel()
-async def hunt_command(ctx):
-    """Hunts for a mob, taking into account the current weather."""
-    global coin_data, player_data, current_weather, storm_active, camp_users, current_sub_weather, storm_warning_active 
+async def hunt_command(ctx, count: int = 1):
+    """Hunts for a mob, taking into account the current weather. `!hunt N` runs a batch."""
+    global storm_active, storm_warning_active
     user_id = str(ctx.author.id)
-    channel = bot.get_channel(HUNT_CHANNEL_ID)
+    channel = bot.get_channel(game().hunt_channel_id)
     # --- Call initialize_player_data before reloading ---
     await initialize_player_data(user_id) 
     admin_role_id = 1227279982435500032
@@ -976,29 +2749,33 @@ async def hunt_command(ctx):
     coin_reward = 0
 
     # --- Check if a storm warning is active ---
-    if user_id in storm_warned_users:  # Check if user was warned about the storm
+    if user_id in game().storm_warned_users:  # Check if user was warned about the storm
         await ctx.reply("You can't hunt while a storm warning is active for you! Seek camp by using `!camp`")
         return
 
     # --- Early Check for Camping ---
-    if user_id in camp_users:
+    if user_id in game().camp_users:
         await ctx.reply("You can't hunt while you are in a camp!")
         return
 
+    count = max(1, min(count, HUNT_BATCH_MAX))
     # Apply cooldown ONLY if not admin
     if not is_admin:
         retry_after = hunt_cooldown.get_bucket(ctx.message).update_rate_limit()
+        if not retry_after and hunt_credits(user_id) < 1:
+            retry_after = next_hunt_credit_in(user_id)
         if retry_after:
             await ctx.send(
                 f"You're in cooldown! Try again in {int(retry_after)} seconds."
             )
             return
+        count = min(count, hunt_credits(user_id))
 
     # --- Access player data AFTER initialization --- 
-    gun_durability = player_data[user_id]["gun_durability"]
-    ammo_count = player_data[user_id]["ammo"]
-    player_health = player_data[user_id]["health"]
-    camp_durability = player_data[user_id]['camp_durability']
+    gun_durability = game().player_data[user_id]["gun_durability"]
+    ammo_count = game().player_data[user_id]["ammo"]
+    player_health = game().player_data[user_id]["health"]
+    camp_durability = game().player_data[user_id]['camp_durability']
 
     # --- Check if ammo or gun durability is 0 ---
     if ammo_count <= 0:
@@ -1013,500 +2790,270 @@ async def hunt_command(ctx):
         await ctx.reply(embed=embed)
         return
 
+    if count > 1:
+        summary = await execute_hunt_batch(ctx, user_id, count)
+        if not is_admin:
+            spend_hunt_credits(user_id, summary['hunts'])
+        return
+
     # --- Apply Weather Logic ---
-    result_embed = None  # Store the result embed
-    if current_weather != "Chaos":
-        await apply_weather_logic(ctx, user_id, is_admin) 
-    else:
-        result_embed = await apply_sub_weather_logic(ctx, current_sub_weather, user_id, is_admin) 
+    await execute_hunt(ctx, user_id)
+    if not is_admin:
+        spend_hunt_credits(user_id, 1)
     # --- Resource Deduction Logic (add this back) ---
-    if player_data[user_id]["health"] > 0:
-        if not (current_weather in ["Stormy", "Super Storm"] and user_id in camp_users):
-            # Use subtract_with_infinity for gun durability and ammo 
-            player_data[user_id]["gun_durability"] = subtract_with_infinity(player_data[user_id]["gun_durability"], 2) 
-            player_data[user_id]["ammo"] = subtract_with_infinity(player_data[user_id]["ammo"], 3) 
-        if user_id in camp_users:
+    if game().player_data[user_id]["health"] > 0:
+        if not (game().weather_state.weather in ["Stormy", "Super Storm"] and user_id in game().camp_users):
+            spend_hunt_resources(user_id)
+        if user_id in game().camp_users:
             # Use subtract_with_infinity for camp durability 
-            player_data[user_id]['camp_durability'] = subtract_with_infinity(player_data[user_id]['camp_durability'], 5) 
+            game().player_data[user_id]['camp_durability'] = subtract_with_infinity(game().player_data[user_id]['camp_durability'], 5) 
 
     # --- Save Player Data --- 
     await save_data('player_data', { 
         'user_id': int(user_id),
-        'gun_durability': player_data[user_id]['gun_durability'],
-        'ammo': player_data[user_id]['ammo'],
-        'health': player_data[user_id]['health'],
-        'camp_durability': player_data[user_id]['camp_durability'],
-        'healing_potions': player_data[user_id]['healing_potions']
+        'gun_durability': game().player_data[user_id]['gun_durability'],
+        'ammo': game().player_data[user_id]['ammo'],
+        'health': game().player_data[user_id]['health'],
+        'camp_durability': game().player_data[user_id]['camp_durability'],
+        'healing_potions': game().player_data[user_id]['healing_potions']
     }, upsert=True)
 
-# --- Check Player Health Task ---
-@tasks.loop(seconds=2)
-async def check_player_health():
-    global player_data, current_weather, camp_users
-    channel = bot.get_channel(HUNT_CHANNEL_ID)
-
-    for user_id, data in player_data.items():
-        if data["health"] <= 0:
-            user = user_cache.get(int(user_id))
+# --- Defeat Queue ---
+# Every health change goes through set_health, which queues the player the
+# moment their health reaches zero. process_defeats sleeps until something is
+# queued, so nothing scans player_data while nobody is dying. Defeats landing
+# within DEFEAT_BATCH_WINDOW seconds are announced together.
+DEFEAT_BATCH_WINDOW = float(os.getenv("DEFEAT_BATCH_WINDOW", 1.0))
+# Discord limits for one message
+EMBED_MAX_FIELDS = 25
+MESSAGE_MAX_EMBEDS = 10
+MESSAGE_MAX_EMBED_CHARS = 6000
+MESSAGE_MAX_CONTENT = 2000
+
+def set_health(user_id: str, health) -> None:
+    game().player_data[user_id]["health"] = health
+    if health <= 0:
+        queue_defeat(user_id)
+
+def damage_player(user_id: str, amount) -> None:
+    set_health(user_id, subtract_with_infinity(game().player_data[user_id].get("health", 100), amount))
+
+def queue_defeat(user_id: str) -> None:
+    game().defeat_pending[user_id] = None
+    game().defeat_wakeup.set()
+
+def start_defeat_processor() -> None:
+    if game().defeat_task is None or game().defeat_task.done():
+        game().defeat_task = asyncio.create_task(process_defeats())
+
+async def process_defeats():
+    while True:
+        await game().defeat_wakeup.wait()
+        # Give a mass death (a Super Storm hitting everyone) time to land so it goes out together
+        await asyncio.sleep(DEFEAT_BATCH_WINDOW)
+        game().defeat_wakeup.clear()
+        batch = list(game().defeat_pending)
+        game().defeat_pending.clear()
+        losses = []
+        for user_id in batch:
             try:
-                if user is None:
-                    user = await bot.fetch_user(int(user_id))
-                    user_cache[int(user_id)] = user
-
-                await channel.send(f"{user.mention} You are out of health and have been defeated!")
-                loss_embed = discord.Embed(title=f"{user.name} Defeat Losses", color=discord.Color.red())
-
-                # Apply loss logic to each item using subtract_with_infinity
-                for item in ["gun_durability", "ammo", "camp_durability", "healing_potions"]:
-                    loss = data[item] // 2  # Calculate loss
-                    data[item] -= subtract_with_infinity(data[item], loss)  # Subtract with infinity handling
-                    loss_embed.add_field(
-                        name=f"{item.replace('_', ' ').title()} Loss:",
-                        value=f"-{handle_infinity(loss)}", 
-                        inline=True
-                    )
-
-                data["health"] = 100
-                await save_data('player_data', {
-                    'user_id': int(user_id),
-                    'gun_durability': data['gun_durability'],
-                    'ammo': data['ammo'],
-                    'health': data['health'],
-                    'camp_durability': data['camp_durability'],
-                    'healing_potions': data['healing_potions']
-                }, upsert=True)
-
-                await channel.send(embed=loss_embed)
-            except discord.HTTPException as e:
-                if e.status == 429:
-                    retry_after = float(e.response.headers.get("Retry-After", 1))
-                    print(f"Rate limited, retrying in {retry_after} seconds.")
-                    await asyncio.sleep(retry_after)
-                else:
-                    raise e
-
-# --- Apply Weather and Sub-weather Logic ---
-async def apply_weather_logic(ctx, user_id, is_admin, sub_weather=None):
-    global coin_data, storm_warning_active, storm_warned_users 
-    weather_name = sub_weather if sub_weather else current_weather 
-    embed = discord.Embed(title=f"Hunt Results {WEATHER_EMOJIS[weather_name]}", color=random.choice(WEATHER_COLORS[weather_name]))
-    if weather_name == "Sunny":
-        num_mobs = random.choices([2, 3, 4], [43, 22, 15], k=1)[0]
-        coin_reward = 0
-        mobs_hunted = []
-        for _ in range(num_mobs):
-                    possible_mobs = [mob for mob in mobs if mob[1] >= 20]
-                    mob = random.choices(possible_mobs, weights=[mob[2] for mob in possible_mobs], k=1)[0]
-                    mob_name, reward, _, _ = mob
-                    coin_reward += reward
-                    mobs_hunted.append(mob_name)
-        if random.random() <= 0.15:
-            player_data[user_id]["health"] = subtract_with_infinity(player_data[user_id]["health"], 5) 
-            embed.title = "You are exhausted!"
-            embed.description = f"You were exhausted! You lost **5** health."
-            embed.color = discord.Color.red()
-        else: 
-            if coin_data[user_id] < INFINITY_THRESHOLD: 
-                coin_data[user_id] = coin_data.get(user_id, 0) + coin_reward
-        embed.add_field(name=f"You hunted in Sunny weather:", value=f"You hunted {num_mobs} animals at the same time!", inline=False)
-        embed.add_field(name="Mobs Hunted:", value=", ".join(mobs_hunted), inline=False)
-        embed.add_field(name="Reward:", value=f"You earned **{coin_reward:,} coins**!", inline=False)
-    elif weather_name == "Snowy":
-        if blizzard_event.is_set():
-            if random.random() <= 0.55:
-                if random.random() <= 0.19:
-                    player_data[user_id]["health"] = subtract_with_infinity(player_data[user_id]["health"], 20) 
-                    embed.description = "You got too cold from the blizzard, and you took **20 damages** and couldn't hunt anything!"
-                else:
-                    num_mobs = random.choices([1, 2, 3, 4], [54, 43, 33, 21], k=1)[0]
-                    coin_reward = 0
-                    mobs_hunted = []
-                    for _ in range(num_mobs):
-                        possible_mobs = [mob for mob in mobs if mob[1] >= 200]
-                        mob = random.choices(possible_mobs, weights=[mob[2] for mob in possible_mobs], k=1)[0]
-                        mob_name, reward, _, _ = mob
-                        coin_reward += reward
-                        mobs_hunted.append(mob_name)
-                    if coin_data[user_id] < INFINITY_THRESHOLD: 
-                        coin_data[user_id] = coin_data.get(user_id, 0) + coin_reward
-                    embed.add_field(name=f"You hunted in a Blizzard!:", value=f"You hunted {num_mobs} animals at the same time!", inline=False)
-                    embed.add_field(name="Mobs Hunted:", value=", ".join(mobs_hunted), inline=False)
-                    embed.add_field(name="Reward:", value=f"You earned **{coin_reward:,} coins**!", inline=False)
-            else: 
-                embed.description = "The blizzard's thick snow reduced visibility, and you couldn't hunt anything!"
-        else:
-            if random.random() <= 0.78: 
-                num_mobs = random.choices([1, 2, 3], [55, 39, 25], k=1)[0]
-                coin_reward = 0
-                mobs_hunted = []
-                for _ in range(num_mobs):
-                    possible_mobs = [mob for mob in mobs if mob[1] >= 50]
-                    mob = random.choices(possible_mobs, weights=[mob[2] for mob in possible_mobs], k=1)[0]
-                    mob_name, reward, _, _ = mob
-                    coin_reward += reward
-                    mobs_hunted.append(mob_name)
-                if coin_data[user_id] < INFINITY_THRESHOLD: 
-                    coin_data[user_id] = coin_data.get(user_id, 0) + coin_reward 
-                embed.add_field(name=f"You hunted in Snowy weather:", value=f"You hunted {num_mobs} animals at the same time!", inline=False)
-                embed.add_field(name="Mobs Hunted:", value=", ".join(mobs_hunted), inline=False)
-                embed.add_field(name="Reward:", value=f"You earned **{coin_reward:,} coins**!", inline=False)
-            else: 
-                embed.description = "The weather was too cold, and you couldn't hunt anything!"
-    elif weather_name == "Rainy":
-        num_mobs = random.choices([2, 3, 4, 5, 6, 7, 8, 9, 10], [64, 57, 52, 47, 43, 37, 33, 26, 15], k=1)[0]
-        coin_reward = 0
-        mobs_hunted = []
-        for _ in range(num_mobs):
-                    possible_mobs = [mob for mob in mobs if mob[1] >= 10]
-                    mob = random.choices(possible_mobs, weights=[mob[2] for mob in possible_mobs], k=1)[0]
-                    mob_name, reward, _, _ = mob
-                    coin_reward += reward
-                    mobs_hunted.append(mob_name)
-        if coin_data[user_id] < INFINITY_THRESHOLD: 
-            coin_data[user_id] = coin_data.get(user_id, 0) + coin_reward 
-        embed.add_field(name=f"You hunted in Rainy weather: ", value=f"You hunted {num_mobs} animals at the same time! ", inline=False)
-        embed.add_field(name="Mobs Hunted:", value=", ".join(mobs_hunted), inline=False)
-        embed.add_field(name="Reward:", value=f"You earned **{coin_reward:,} coins**!", inline=False)
-    elif weather_name in ["Stormy", "Super Storm"]:
-        num_mobs = random.choices([(1, 43), (2, 30), (3, 10)], k=1)[0][0] if current_weather == "Stormy" else random.choices([(1, 54), (3, 22), (4, 15)], k=1)[0][0]
-        coin_reward = 0
-        mobs_hunted = []
-        for _ in range(num_mobs): 
-            possible_mobs = [mob for mob in mobs if mob[1] >= 50] if current_weather == "Stormy" else [mob for mob in mobs if mob[1] >= 400]
-            mob = random.choices(possible_mobs, weights=[mob[2] for mob in possible_mobs], k=1)[0]
-            mob_name, reward, _, _ = mob
-            coin_reward += reward
-            mobs_hunted.append(mob_name)
-        if coin_data[user_id] < INFINITY_THRESHOLD: 
-            coin_data[user_id] = coin_data.get(user_id, 0) + coin_reward 
-        embed.add_field(name=f"You hunted in {current_weather} weather:", value=f"You hunted {num_mobs} animals at the same time!", inline=False)
-        embed.add_field(name="Mobs Hunted:", value=", ".join(mobs_hunted), inline=False)
-        embed.add_field(name="Reward:", value=f"You earned **{coin_reward:,} coins**!", inline=False)
-        # --- Storm Damage ---
-        storm_probability = 0.30 if current_weather == "Stormy" else 0.20
-        if random.random() <= storm_probability:
-            storm_warned_users[user_id] = asyncio.get_event_loop().time() 
-
-            await ctx.reply(embed=discord.Embed(
-                title="Storm Warning!",
-                description=f"<@{user_id}>, a storm is approaching or in progress! Seek shelter using `!camp` or risk taking damage!",
-                color=discord.Color.magenta()
-            ))
-            await asyncio.sleep(STORM_WARNING_DURATION)
-        if user_id in storm_warned_users:
-            async with camp_users_lock:
-                if user_id not in camp_users:
-                    player_data[user_id]["health"] = subtract_with_infinity(player_data[user_id]["health"], STORM_DAMAGE[current_weather]) 
-                    await ctx.reply(embed=discord.Embed(title="Caught in the Storm!", description=f"<@{user_id}> You took {STORM_DAMAGE[current_weather]} damage from the {current_weather}!", color=discord.Color.red()))
-                    del storm_warned_users[user_id]
-                    await ctx.send(embed=discord.Embed(title="Weather Update", description=f"<@{user_id}>, the storm has passed!", color=discord.Color.gold()))                    
-                    return  
-                else:  # Player is in camp
-                    damage_taken = CAMP_DEGRADATION[current_weather]
-                    player_data[user_id]['camp_durability'] -= damage_taken
-                    if player_data[user_id]['camp_durability'] <= 0:
-                        # Apply remaining damage to player's health 
-                        remaining_damage = damage_taken 
-                        player_data[user_id]['health'] = subtract_with_infinity(player_data[user_id]['health'], remaining_damage) 
-
-                        await ctx.reply(embed=discord.Embed(
-                            title="Camp Destroyed!", 
-                            description=
-                                f"<@{user_id}> Your camp has been destroyed by the storm! "
-                                f"You also took **{remaining_damage}** damage! "
-                                f"Buy camp at the `!shop` or you will be in danger.",
-                            color=discord.Color.red()
-                        ))
-                        del camp_users[user_id] 
-                        del storm_warned_users[user_id]
-                        await ctx.send(embed=discord.Embed(title="Weather Update", description=f"<@{user_id}>, the storm has passed!", color=discord.Color.gold()))                    
-                        return  
-                    else:
-                        await save_data("player_data", {
-                            'user_id': int(user_id),
-                            'gun_durability': player_data[user_id]['gun_durability'],
-                            'ammo': player_data[user_id]['ammo'],
-                            'health': player_data[user_id]['health'],
-                            'camp_durability': player_data[user_id]['camp_durability']
-                        }, upsert=True)
-                        storm_damage_embed = discord.Embed(
-                            title="Storm Damage!", 
-                            description=f"Your camp took **{damage_taken}** durability damage from the storm!", 
-                            color=discord.Color.dark_gray()
-                        )
-                        storm_damage_embed.add_field(name="Camp Durability:", value=handle_infinity(player_data[user_id]['camp_durability']), inline=False)
-                        await ctx.reply(embed=storm_damage_embed) 
-                        del storm_warned_users[user_id]
-                        await ctx.send(embed=discord.Embed(title="Weather Update", description=f"<@{user_id}>, the storm has passed!", color=discord.Color.gold()))                    
-                        return  
-
-    await save_data('coin_data', {'user_id': int(user_id), 'coins': coin_data[user_id]}, upsert=True)
-    embed.add_field(name="❤️ Health:", value=handle_infinity(player_data[user_id]["health"]), inline=True)  
-    embed.add_field(name="<:shotgun:1267441675639459964> Durability:", value=handle_infinity(player_data[user_id]["gun_durability"]), inline=True) 
-    embed.add_field(name="<:ammo:1267441870519144518> Ammo:", value=handle_infinity(player_data[user_id]["ammo"]), inline=True) 
-    embed.set_footer(text="WARNING The data is just a reference, the error can be from 2 to 3 compared to normal. For more accuracy, use the `!inventory` command.")
-    await ctx.reply(embed=embed)
-
-async def apply_sub_weather_logic(ctx, sub_weather, user_id, is_admin):
-    global coin_data, storm_warning_active, storm_warned_users 
-    embed = discord.Embed(title=f" **₵Ⱨ₳Ø₴** Results **₵Ⱨ₳Ø₴** ", color=random.choice(WEATHER_COLORS[sub_weather]))
-    if sub_weather == "Sunny":
-        # Sunny weather logic
-        num_mobs = random.choices([2, 3, 4], [43, 22, 15], k=1)[0]
-        coin_reward = 0
-        mobs_hunted = []
-        for _ in range(num_mobs):
-                    possible_mobs = [mob for mob in mobs if mob[1] >= 500]
-                    mob = random.choices(possible_mobs, weights=[mob[2] for mob in possible_mobs], k=1)[0]
-                    mob_name, reward, _, _ = mob
-                    coin_reward += reward
-                    mobs_hunted.append(mob_name)
-        coin_reward *= 1 
-        if random.random() <= 0.15:
-            player_data[user_id]["health"] = subtract_with_infinity(player_data[user_id]["health"], 5) 
-            embed.title = "ɎØɄ ₳ⱤɆ ɆӾⱧ₳Ʉ₴₮ɆĐ!"
-            embed.description = f"ɎØɄ ₩ɆⱤɆ ɆӾⱧ₳Ʉ₴₮ɆĐ! ɎØɄ ⱠØ₴₮ **5** ⱧɆ₳Ⱡ₮Ⱨ."
-            embed.color = discord.Color.red()
-        else:
-            if coin_data[user_id] < INFINITY_THRESHOLD: 
-                coin_data[user_id] = coin_data.get(user_id, 0) + coin_reward
-        embed.add_field(name=f"ɎØɄ ⱧɄ₦₮ɆĐ ł₦ ₴Ʉ₦₦Ɏ ₵Ⱨ₳Ø₴ :", value=f"ɎØɄ ⱧɄ₦₮ɆĐ {num_mobs} ₳₦ł₥₳Ⱡ₴ ₳₮ ₮ⱧɆ ₴₳₥Ɇ ₮ł₥Ɇ!", inline=False)
-        embed.add_field(name="₥Ø฿₴ ⱧɄ₦₮ɆĐ:", value=", ".join(mobs_hunted), inline=False)
-        embed.add_field(name="ⱤɆ₩₳ⱤĐ:", value=f"ɎØɄ Ɇ₳Ɽ₦ɆĐ **{coin_reward:,} ₵Øł₦₴**! ", inline=False)
-
-    elif sub_weather == "Snowy":
-        # Snowy weather logic
-        if blizzard_event.is_set():
-            if random.random() <= 0.55:
-                if random.random() <= 0.25:
-                    player_data[user_id]["health"] = subtract_with_infinity(player_data[user_id]["health"], 40) 
-                    embed.description = "ɎØɄ ₲Ø₮ ₮ØØ ₵ØⱠĐ ₣ⱤØ₥ ₮ⱧɆ ฿ⱠłⱫⱫ₳ⱤĐ, ₳₦Đ ɎØɄ ₮ØØ₭ **𝟰𝟬 Đ₳₥₳₲Ɇ₴** ₳₦Đ ₵ØɄⱠĐ₦'₮ ⱧɄ₦₮ ₳₦Ɏ₮Ⱨł₦₲!"
-                else:
-                    num_mobs = random.choices([1, 2, 3, 4], [54, 43, 33, 21], k=1)[0]
-                    coin_reward = 0
-                    mobs_hunted = []
-                    for _ in range(num_mobs):
-                        possible_mobs = [mob for mob in mobs if mob[1] >= 1500]
-                        mob = random.choices(possible_mobs, weights=[mob[2] for mob in possible_mobs], k=1)[0]
-                        mob_name, reward, _, _ = mob
-                        coin_reward += reward
-                        mobs_hunted.append(mob_name)
-                    if coin_data[user_id] < INFINITY_THRESHOLD: 
-                        coin_data[user_id] = coin_data.get(user_id, 0) + coin_reward
-                    embed.add_field(name=f"ɎØɄ ⱧɄ₦₮ɆĐ ł₦ ₳ ₵Ⱨ₳Ø₴ ฿ⱠłⱫⱫ₳ⱤĐ! :", value=f"ɎØɄ ⱧɄ₦₮ɆĐ {num_mobs} ₳₦ł₥₳Ⱡ₴ ₳₮ ₮ⱧɆ ₴₳₥Ɇ ₮ł₥Ɇ!", inline=False)
-                    embed.add_field(name="₥Ø฿₴ ⱧɄ₦₮ɆĐ:", value=", ".join(mobs_hunted), inline=False)
-                    embed.add_field(name="ⱤɆ₩₳ⱤĐ:", value=f"ɎØɄ Ɇ₳Ɽ₦ɆĐ **{coin_reward:,} ₵Øł₦₴**!", inline=False)
-            else: 
-                embed.description = "₮ⱧɆ ฿ⱠłⱫⱫ₳ⱤĐ'₴ ₮Ⱨł₵₭ ₴₦Ø₩ ⱤɆĐɄ₵ɆĐ Vł₴ł฿łⱠł₮Ɏ, ₳₦Đ ɎØɄ ₵ØɄⱠĐ₦'₮ ⱧɄ₦₮ ₳₦Ɏ₮Ⱨł₦₲!"
-        else: 
-            if random.random() <= 0.50:    
-                num_mobs = random.choices([1, 2, 3], [55, 39, 25], k=1)[0]
-                coin_reward = 0
-                mobs_hunted = []
-                for _ in range(num_mobs):
-                    possible_mobs = [mob for mob in mobs if mob[1] >= 500]
-                    mob = random.choices(possible_mobs, weights=[mob[2] for mob in possible_mobs], k=1)[0]
-                    mob_name, reward, _, _ = mob
-                    coin_reward += reward
-                    mobs_hunted.append(mob_name)
-                if coin_data[user_id] < INFINITY_THRESHOLD: 
-                    coin_data[user_id] = coin_data.get(user_id, 0) + coin_reward
-                embed.add_field(name=f"ɎØɄ ⱧɄ₦₮ɆĐ ł₦ ₵Ⱨ₳Ø₴ ₴₦Ø₩Ɏ :", value=f"ɎØɄ ⱧɄ₦₮ɆĐ {num_mobs} ₳₦ł₥₳Ⱡ₴ ₳₮ ₮ⱧɆ ₴₳₥Ɇ ₮ł₥Ɇ!", inline=False)
-                embed.add_field(name="₥Ø฿₴ ⱧɄ₦₮ɆĐ:", value=", ".join(mobs_hunted), inline=False)
-                embed.add_field(name="ⱤɆ₩₳ⱤĐ:", value=f"ɎØɄ Ɇ₳Ɽ₦ɆĐ **{coin_reward:,} ₵Øł₦₴**!", inline=False)
-            else: 
-                embed.description = "₮ⱧɆ ₩Ɇ₳₮ⱧɆⱤ ₩₳₴ ₮ØØ ₵ØⱠĐ, ₳₦Đ ɎØɄ ₵ØɄⱠĐ₦'₮ ⱧɄ₦₮ ₳₦Ɏ₮Ⱨł₦₲!"
-
-    elif sub_weather == "Rainy":
-        # Rainy weather logic
-        num_mobs = random.choices([1, 2, 4, 5, 6, 7, 8, 9, 10], [64, 57, 52, 47, 43, 37, 33, 26, 15], k=1)[0]
-        coin_reward = 0
-        mobs_hunted = []
-        for _ in range(num_mobs):
-                    possible_mobs = [mob for mob in mobs if mob[1] >= 500]
-                    mob = random.choices(possible_mobs, weights=[mob[2] for mob in possible_mobs], k=1)[0]
-                    mob_name, reward, _, _ = mob
-                    coin_reward += reward
-                    mobs_hunted.append(mob_name)
-        if coin_data[user_id] < INFINITY_THRESHOLD: 
-            coin_data[user_id] = coin_data.get(user_id, 0) + coin_reward
-        embed.add_field(name=f"ɎØɄ ⱧɄ₦₮ɆĐ ł₦ ₵Ⱨ₳Ø₴ Ɽ₳ł₦Ɏ :", value=f"ɎØɄ ⱧɄ₦₮ɆĐ {num_mobs} ₳₦ł₥₳Ⱡ₴ ₳₮ ₮ⱧɆ ₴₳₥Ɇ ₮ł₥Ɇ!", inline=False)
-        embed.add_field(name="₥Ø฿₴ ⱧɄ₦₮ɆĐ:", value=", ".join(mobs_hunted), inline=False)
-        embed.add_field(name="ⱤɆ₩₳ⱤĐ:", value=f"ɎØɄ Ɇ₳Ɽ₦ɆĐ **{coin_reward:,} ₵Øł₦₴**!", inline=False)
-
-    if sub_weather in ["Stormy", "Super Storm"]: 
-        num_mobs = random.choices([(1, 43), (2, 30), (3, 10)], k=1)[0][0] if sub_weather == "Stormy" else random.choices([(1, 54), (3, 22), (4, 15)], k=1)[0][0]
-        coin_reward = 0
-        mobs_hunted = []
-        for _ in range(num_mobs):
-            possible_mobs = [mob for mob in mobs if mob[1] >= 2000] if sub_weather == "Stormy" else [mob for mob in mobs if mob[1] >= 8000] 
-            mob = random.choices(possible_mobs, weights=[mob[2] for mob in possible_mobs], k=1)[0]
-            mob_name, reward, _, _ = mob
-            coin_reward += reward
-            mobs_hunted.append(mob_name)
-        if coin_data[user_id] < INFINITY_THRESHOLD: 
-            coin_data[user_id] = coin_data.get(user_id, 0) + coin_reward
-        embed.add_field(name=f"ɎØɄ ⱧɄ₦₮ɆĐ ł₦ ₵Ⱨ₳Ø₴ {sub_weather.upper()} :", 
-                        value=f"ɎØɄ ⱧɄ₦₮ɆĐ {num_mobs} ₳₦ł₥₳Ⱡ₴ ₳₮ ₮ⱧɆ ₴₳₥Ɇ ₮ł₥Ɇ!", inline=False)
-        embed.add_field(name="₥Ø฿₴ ⱧɄ₦₮ɆĐ:", value=", ".join(mobs_hunted), inline=False)
-        embed.add_field(name="ⱤɆ₩₳ⱤĐ:", value=f"ɎØɄ Ɇ₳Ɽ₦ɆĐ **{coin_reward:,} ₵Øł₦₴**! ", inline=False)
-        
-        
-        storm_probability = 0.40 if sub_weather == "Stormy" else 0.50
-        if random.random() <= storm_probability:
-            async with camp_users_lock:
-                storm_warned_users[user_id] = asyncio.get_event_loop().time()
-
-            await ctx.reply(embed=discord.Embed(
-                title=f" ₵Ⱨ₳Ø₴ {sub_weather.upper()} ₩₳Ɽ₦ł₦₲!",
-                description=f"<@{user_id}>, ₳ ₵Ⱨ₳Ø₴ {sub_weather.upper()}  ł₴ Ɽ₳₲ł₦₲! ₴ɆɆ₭ ₴ⱧɆⱠ₮ɆⱤ Ʉ₴ł₦₲ `!camp` ØⱤ Ɽł₴₭ ₮₳₭ł₦₲ Đ₳₥₳₲Ɇ!",
-                color=discord.Color.magenta()
-            ))
-        # --- Apply Storm Damage during Chaos --- 
-            async def storm_timeout():
-                await asyncio.sleep(STORM_WARNING_DURATION_CHAOS + 5)
-                try:
-                    async with camp_users_lock:
-                        if user_id in storm_warned_users:
-                            if user_id not in camp_users:
-                                # Apply damage logic
-                                player_data[user_id]["health"] = subtract_with_infinity(player_data[user_id]["health"], STORM_DAMAGE_CHAOS[sub_weather])
-                                await ctx.reply(embed=discord.Embed(
-                                    title=f"₵₳Ʉ₲Ⱨ₮ ł₦ ₮ⱧɆ ₵Ⱨ₳Ø₴ {sub_weather.upper()}!",
-                                    description=f"<@{user_id}> ɎØɄ ₮ØØ₭ {STORM_DAMAGE_CHAOS[sub_weather]} Đ₳₥₳₲Ɇ ₣ⱤØ₥ ₮ⱧɆ {sub_weather.upper()}!",
-                                    color=discord.Color.dark_gray()
-                                ))
-                                del storm_warned_users[user_id] 
-                                return
-                            else:  # Player is in camp
-                                # Apply camp logic
-                                damage_taken = CAMP_DEGRADATION_CHAOS[sub_weather]
-                                player_data[user_id]['camp_durability'] -= damage_taken
-                                if player_data[user_id]['camp_durability'] <= 0:
-                                    # Camp destroyed 
-                                    remaining_damage = damage_taken 
-                                    player_data[user_id]['health'] = subtract_with_infinity(player_data[user_id]['health'], remaining_damage)
-                                    await ctx.reply(embed=discord.Embed(
-                                        title="₵₳₥₱ ĐɆ₴₮ⱤØɎɆĐ! ",
-                                        description=f"<@{user_id}> ɎØɄⱤ ₵₳₥₱ Ⱨ₳₴ ฿ɆɆ₦ ĐɆ₴₮ⱤØɎɆĐ ฿Ɏ ₮ⱧɆ ₵Ⱨ₳Ø₴ {sub_weather.upper()}! You also took **{remaining_damage}** damage!",
-                                        color=discord.Color.red()
-                                    ))
-                                    del camp_users[user_id]
-                                    del storm_warned_users[user_id]
-                                    return
-                                else:
-                                    await save_data("player_data", {
-                                        'user_id': int(user_id),
-                                        'gun_durability': player_data[user_id]['gun_durability'],
-                                        'ammo': player_data[user_id]['ammo'],
-                                        'health': player_data[user_id]['health'],
-                                        'camp_durability': player_data[user_id]['camp_durability']
-                                    }, upsert=True)
-                                    storm_damage_embed = discord.Embed(
-                                        title=f"₵Ⱨ₳Ø₴ {sub_weather.upper()} Đ₳₥₳₲Ɇ!",
-                                        description=f"ɎØɄⱤ ₵₳₥₱ ₮ØØ₭ **{damage_taken}** ĐɄⱤ₳฿łⱠł₮Ɏ Đ₳₥₳₲Ɇ ₣ⱤØ₥ ₮ⱧɆ {sub_weather.upper()}!",
-                                        color=discord.Color.dark_gray()
-                                    )
-                                    storm_damage_embed.add_field(name="Camp Durability:", value=handle_infinity(player_data[user_id]['camp_durability']), inline=False)
-                                    del storm_warned_users[user_id]
-                                    await ctx.reply(embed=storm_damage_embed)
-                                    return
-                except Exception as e:
-                    print(f"Error applying storm damage: {e}")
-                    await ctx.reply(f"An error occurred while applying storm damage. Please contact an admin.")
-                finally:
-                    async with camp_users_lock:
-                        # Weather update message moved inside finally block
-                        await ctx.send(embed=discord.Embed(title="₩Ɇ₳₮ⱧɆⱤ Ʉ₱Đ₳₮Ɇ", description=f"<@{user_id}>, ₮ⱧɆ ₵Ⱨ₳Ø₴ {sub_weather.upper()} Ⱨ₳₴ ₱₳₴₴ɆĐ!", color=discord.Color.gold()))
-                return
-
-            await storm_timeout()
-
-    await save_data('coin_data', {'user_id': int(user_id), 'coins': coin_data[user_id]}, upsert=True)
-    await save_data('player_data', { 
-        'user_id': int(user_id),                                                                                                                                                                                                                                                                                                                                                            
-        'gun_durability': player_data[user_id]['gun_durability'],
-        'ammo': player_data[user_id]['ammo'],
-        'health': player_data[user_id]['health'],
-        'camp_durability': player_data[user_id]['camp_durability'],
-        'healing_potions': player_data[user_id]['healing_potions']
+                loss = await apply_defeat(user_id)
+            except Exception as e:
+                print(f"Error processing defeat for {user_id}: {e!r}")
+                continue
+            if loss is not None:
+                losses.append((user_id, loss))
+        if losses:
+            try:
+                await announce_defeats(losses)
+            except Exception as e:
+                print(f"Error announcing {len(losses)} defeats: {e!r}")
+
+async def apply_defeat(user_id: str) -> Optional[Dict[str, Any]]:
+    """Takes the defeat losses and resets health. Returns the losses, or None if no longer defeated."""
+    data = game().player_data.get(user_id)
+    if data is None or data["health"] > 0:
+        return None  # Healed or edited back up before we got to it
+    losses = {}
+    # Apply loss logic to each item using subtract_with_infinity
+    for item in ["gun_durability", "ammo", "camp_durability", "healing_potions"]:
+        loss = data[item] // 2  # Calculate loss
+        data[item] = subtract_with_infinity(data[item], loss)
+        losses[item] = loss
+    set_health(user_id, 100)
+    await save_data('player_data', {
+        'user_id': int(user_id),
+        'gun_durability': data['gun_durability'],
+        'ammo': data['ammo'],
+        'health': data['health'],
+        'camp_durability': data['camp_durability'],
+        'healing_potions': data['healing_potions']
     }, upsert=True)
-
-    # Add Player Stats to Embed for Hunt Results
-    embed.add_field(name="❤️ Health:", value=handle_infinity(player_data[user_id]["health"]), inline=True)  
-    embed.add_field(name="<:shotgun:1267441675639459964> Durability:", value=handle_infinity(player_data[user_id]["gun_durability"]), inline=True) 
-    embed.add_field(name="<:ammo:1267441870519144518> Ammo:", value=handle_infinity(player_data[user_id]["ammo"]), inline=True)  
-    embed.set_footer(text="WARNING The data is just a reference, the error can be from 2 to 3 compared to normal. For more accuracy, use the `!inventory` command.")
-    await ctx.reply(embed=embed)
-    return embed
+    return losses
+
+def pack_defeat_messages(losses: List[tuple]) -> List[tuple]:
+    """Packs (user_id, losses) into as few (content, embeds) messages as Discord's limits allow.
+
+    One field per player, EMBED_MAX_FIELDS per embed, MESSAGE_MAX_EMBEDS embeds
+    and MESSAGE_MAX_EMBED_CHARS of embed text per message, and the mentions
+    have to fit in the message content.
+    """
+    title = "Defeat Losses"
+    suffix = " You are out of health and have been defeated!"
+    messages = []
+    mentions, embeds, chars = [], [], 0
+    for user_id, loss in losses:
+        user = user_cache.get(int(user_id)) or bot.get_user(int(user_id))
+        field_name = f"{user.name if user else f'Player {user_id}'}:"
+        value = ", ".join(f"{item.replace('_', ' ').title()} -{handle_infinity(amount)}" for item, amount in loss.items())
+        mention = f"<@{user_id}>"
+        new_embed = not embeds or len(embeds[-1].fields) >= EMBED_MAX_FIELDS
+        # Counted exactly as added below, since Discord rejects a message over the limit
+        size = len(field_name) + len(value) + (len(title) if new_embed else 0)
+        if mentions and (len(" ".join(mentions)) + 1 + len(mention) + len(suffix) > MESSAGE_MAX_CONTENT
+                         or chars + size > MESSAGE_MAX_EMBED_CHARS
+                         or (new_embed and len(embeds) >= MESSAGE_MAX_EMBEDS)):
+            messages.append((" ".join(mentions) + suffix, embeds))
+            mentions, embeds, chars = [], [], 0
+            new_embed = True
+            size = len(field_name) + len(value) + len(title)
+        if new_embed:
+            embeds.append(discord.Embed(title=title, color=discord.Color.red()))
+        embeds[-1].add_field(name=field_name, value=value, inline=False)
+        mentions.append(mention)
+        chars += size
+    if mentions:
+        messages.append((" ".join(mentions) + suffix, embeds))
+    return messages
+
+async def announce_defeats(losses: List[tuple]) -> None:
+    channel = bot.get_channel(game().hunt_channel_id)
+    for content, embeds in pack_defeat_messages(losses):
+        await send_with_backoff(channel, content=content, embeds=embeds)
+
+async def send_with_backoff(channel, attempts: int = 3, **kwargs):
+    """channel.send that waits out 429s and retries 5xx instead of dropping the message."""
+    for attempt in range(attempts):
+        try:
+            return await channel.send(**kwargs)
+        except discord.HTTPException as e:
+            if attempt == attempts - 1 or not (e.status == 429 or e.status >= 500):
+                raise
+            if e.status == 429:
+                delay = float(e.response.headers.get("Retry-After", 1))
+                print(f"Rate limited, retrying in {delay} seconds.")
+            else:
+                delay = 2 ** attempt
+            await asyncio.sleep(delay)
 
 #-- CAMP --
 @bot.command(name='camp')
 @in_hunt_channel()
 async def camp_command(ctx):
-    global camp_users, player_data, current_weather, current_sub_weather
     user_id = str(ctx.author.id)
     await initialize_player_data(user_id)
+    current_weather, current_sub_weather = game().weather_state.weather, game().weather_state.sub_weather
 
-    async with camp_users_lock:
-        if (current_weather == "Chaos" and current_sub_weather in ["Stormy", "Super Storm"]) or \
-           (current_weather in ["Stormy", "Super Storm"] and current_weather != "Chaos"):
-            if user_id in camp_users:
-                await ctx.reply("You are already in a camp.")
-                return
+    in_storm = (current_weather == "Chaos" and current_sub_weather in ["Stormy", "Super Storm"]) or \
+               (current_weather in ["Stormy", "Super Storm"] and current_weather != "Chaos")
+    if not in_storm:
+        await ctx.reply(
+            "You can only set up camp during a storm or chaos storm."
+        )
+        return
 
-            # --- Check for Minimum Durability and Warn ---
-            required_durability = 40 if current_weather == "Stormy" else 70 
-            if current_weather == "Chaos":
-                required_durability = 80 if current_sub_weather == "Stormy" else 200  
-
-            if player_data[user_id]['camp_durability'] < required_durability:
-                await ctx.reply(
-                    f"Your camp is too damaged to fully withstand this "
-                    f"{'₵Ⱨ₳Ø₴ ' if current_weather == 'Chaos' else ''}{current_sub_weather if current_weather == 'Chaos' else current_weather}! "
-                    f"You need at least {required_durability} durability. "
-                    f"It may be destroyed."
-                )
+    # Only the camp_users update needs the lock; replies go out after it is released
+    async with game().camp_users_lock:
+        already_camping = user_id in game().camp_users
+        if not already_camping:
+            game().camp_users[user_id] = asyncio.get_event_loop().time()
+    if already_camping:
+        await ctx.reply("You are already in a camp.")
+        return
 
-            # --- Set Up Camp Regardless ---
-            camp_users[user_id] = asyncio.get_event_loop().time()
+    # --- Check for Minimum Durability and Warn ---
+    required_durability = 40 if current_weather == "Stormy" else 70 
+    if current_weather == "Chaos":
+        required_durability = 80 if current_sub_weather == "Stormy" else 200  
 
-            embed = discord.Embed(title="🏕️ Camp Setup", color=discord.Color.green())
-            embed.description = "You set up camp. If you want to leave, use `!uncamp`."
-            embed.add_field(
-                name="Camp Durability:",
-                value=handle_infinity(player_data[user_id]['camp_durability']),
-                inline=False
-            )
-            await ctx.reply(embed=embed)
-        else:
-            await ctx.reply(
-                "You can only set up camp during a storm or chaos storm."
-            )
-            return
+    if game().player_data[user_id]['camp_durability'] < required_durability:
+        await ctx.reply(
+            f"Your camp is too damaged to fully withstand this "
+            f"{'₵Ⱨ₳Ø₴ ' if current_weather == 'Chaos' else ''}{current_sub_weather if current_weather == 'Chaos' else current_weather}! "
+            f"You need at least {required_durability} durability. "
+            f"It may be destroyed."
+        )
+
+    embed = discord.Embed(title="🏕️ Camp Setup", color=discord.Color.green())
+    embed.description = "You set up camp. If you want to leave, use `!uncamp`."
+    embed.add_field(
+        name="Camp Durability:",
+        value=handle_infinity(game().player_data[user_id]['camp_durability']),
+        inline=False
+    )
+    await ctx.reply(embed=embed)
 
 # --- Uncamp Command ---
 @bot.command(name='uncamp')
 @in_hunt_channel()
 async def uncamp_command(ctx):
-    global camp_users
     user_id = str(ctx.author.id)
-    async with camp_users_lock:  
-        if user_id in camp_users:
-            del camp_users[user_id]
-            await ctx.reply("You left your camp.")
-        else:
-            await ctx.reply("You are not currently in a camp.")
+    async with game().camp_users_lock:  
+        was_camping = game().camp_users.pop(user_id, None) is not None
+    if was_camping:
+        await ctx.reply("You left your camp.")
+    else:
+        await ctx.reply("You are not currently in a camp.")
+
+# --- Forecast Command ---
+FORECAST_MAX_LINES = 8  # Per spell, to stay inside an embed field
+
+def forecast_unix(clock_time: float) -> int:
+    return int(weather_clock.wall() + (clock_time - weather_clock.now()))
+
+def describe_spell(spell: Dict[str, Any], starts_at: float, after: float = None) -> str:
+    """Timing, Chaos sub-weathers and blizzard windows of one spell. `after` leaves out what has passed."""
+    ends_at = starts_at + spell['duration']
+    lines = [f"<t:{forecast_unix(starts_at)}:t> - <t:{forecast_unix(ends_at)}:t> (<t:{forecast_unix(starts_at)}:R>)"]
+    events = []
+    for position, sub_weather in enumerate(spell['sub_weathers']):
+        sub_start = starts_at + position * CHAOS_SUB_WEATHER_DURATION
+        if after is None or sub_start + CHAOS_SUB_WEATHER_DURATION > after:
+            events.append((sub_start, f"<t:{forecast_unix(sub_start)}:t> {WEATHER_EMOJIS.get(sub_weather, '')} {sub_weather}"))
+    for start, end in spell['blizzards']:
+        if after is None or starts_at + end > after:
+            events.append((starts_at + start, f"<t:{forecast_unix(starts_at + start)}:t> {WEATHER_EMOJIS['Blizzard']} "
+                                              f"Blizzard for {end - start}s"))
+    events.sort(key=lambda event: event[0])
+    lines += [line for _, line in events[:FORECAST_MAX_LINES]]
+    if len(events) > FORECAST_MAX_LINES:
+        lines.append(f"...and {len(events) - FORECAST_MAX_LINES} more")
+    return "\n".join(lines)
+
+@bot.command(name='forecast')
+@in_hunt_or_allowed_channels()
+async def forecast_command(ctx):
+    """Shows the rest of the current weather and the next spells of the precomputed timeline."""
+    embed = discord.Embed(title="Weather Forecast", color=discord.Color.blue())
+    embed.add_field(
+        name=f"Now: {WEATHER_EMOJIS.get(game().weather_state.weather, '🌀')} {game().weather_state.weather}",
+        value=describe_spell(game().weather_state.spell, game().weather_state.starts_at, after=weather_clock.now()),
+        inline=False)
+    starts_at = game().weather_state.ends_at
+    for spell in game().weather_forecast.upcoming():
+        embed.add_field(name=f"{WEATHER_EMOJIS.get(spell['weather'], '🌀')} {spell['weather']}",
+                        value=describe_spell(spell, starts_at), inline=False)
+        starts_at += spell['duration']
+    embed.set_footer(text="Weather set by an admin replaces the forecast from that point on.")
+    await ctx.reply(embed=embed)
 
 # --- Shop Command ---
 @bot.command(name='shop')
 @in_hunt_or_allowed_channels() 
 async def shop_command(ctx):
     """Shows the shop's current items."""
-    global player_data
 
     async def buy_item(interaction, item_name):
-        global coin_data, player_data
         user_id = str(interaction.user.id)
         item = shop_items[item_name]
         cost_per_item = item['price']
@@ -1521,7 +3068,6 @@ async def shop_command(ctx):
         modal.add_item(quantity_input)
 
         async def modal_submit(interaction: discord.Interaction):
-            global player_data
             try:
                 quantity = int(quantity_input.value)
                 if quantity <= 0:
@@ -1532,21 +3078,21 @@ async def shop_command(ctx):
                     return
                 total_cost = cost_per_item * quantity
 
-                if coin_data.get(user_id, 0) < total_cost and coin_data.get(user_id, 0) < INFINITY_THRESHOLD:
+                if game().coin_data.get(user_id, 0) < total_cost and game().coin_data.get(user_id, 0) < INFINITY_THRESHOLD:
                     await interaction.response.send_message(
                     "You don't have enough coins!", ephemeral=True
                     )
                     return
     
-                coin_data[user_id] -= total_cost 
+                game().coin_data[user_id] -= total_cost 
                 await save_data(
                     'coin_data',
-                    {'user_id': int(user_id), 'coins': coin_data[user_id]},
+                    {'user_id': int(user_id), 'coins': game().coin_data[user_id]},
                     upsert=True
                 )
 
-                if user_id not in player_data:
-                    player_data[user_id] = {
+                if user_id not in game().player_data:
+                    game().player_data[user_id] = {
                         "gun_durability": 30,
                         "ammo": 30,
                         "health": 100,
@@ -1555,25 +3101,25 @@ async def shop_command(ctx):
                     }
 
                 if item_name == "ShotGun":
-                    player_data[user_id]["gun_durability"] = add_with_infinity(player_data[user_id]["gun_durability"], 10 * quantity) 
+                    game().player_data[user_id]["gun_durability"] = add_with_infinity(game().player_data[user_id]["gun_durability"], 10 * quantity) 
                 elif item_name == "A box of Ammo":
-                    player_data[user_id]["ammo"] = add_with_infinity(player_data[user_id]["ammo"], 5 * quantity) 
+                    game().player_data[user_id]["ammo"] = add_with_infinity(game().player_data[user_id]["ammo"], 5 * quantity) 
                 elif item_name == "Camp":
-                    if 'camp_durability' not in player_data[user_id]:
-                        player_data[user_id]['camp_durability'] = 0
-                    player_data[user_id]['camp_durability'] = add_with_infinity(player_data[user_id]['camp_durability'], 10 * quantity)
+                    if 'camp_durability' not in game().player_data[user_id]:
+                        game().player_data[user_id]['camp_durability'] = 0
+                    game().player_data[user_id]['camp_durability'] = add_with_infinity(game().player_data[user_id]['camp_durability'], 10 * quantity)
                 elif item_name == "Healing Potion":
-                    player_data[user_id]["healing_potions"] = add_with_infinity(player_data[user_id]["healing_potions"], quantity)
+                    game().player_data[user_id]["healing_potions"] = add_with_infinity(game().player_data[user_id]["healing_potions"], quantity)
 
                 await save_data(
                     'player_data',
                     {
                         'user_id': int(user_id),
-                        'gun_durability': player_data[user_id]['gun_durability'],
-                        'ammo': player_data[user_id]['ammo'],
-                        'health': player_data[user_id]['health'],
-                        'camp_durability': player_data[user_id]['camp_durability'],
-                        'healing_potions': player_data[user_id]['healing_potions'] 
+                        'gun_durability': game().player_data[user_id]['gun_durability'],
+                        'ammo': game().player_data[user_id]['ammo'],
+                        'health': game().player_data[user_id]['health'],
+                        'camp_durability': game().player_data[user_id]['camp_durability'],
+                        'healing_potions': game().player_data[user_id]['healing_potions'] 
                     },
                     upsert=True
                 )
@@ -1588,30 +3134,30 @@ async def shop_command(ctx):
                     "Invalid input. Please enter a number.", ephemeral=True
                 )
 
-        modal.on_submit = modal_submit
+        modal.on_submit = in_game(modal_submit)
         await interaction.response.send_modal(modal)
     # --- Create Buttons ---
     gun_button = Button(label="Buy ShotGun (20 coins)",
                         style=discord.ButtonStyle.primary,
                         custom_id="buy_gun")
-    gun_button.callback = lambda interaction: buy_item(interaction, "ShotGun")
+    gun_button.callback = in_game(lambda interaction: buy_item(interaction, "ShotGun"))
 
     ammo_button = Button(label="Buy A box of Ammo (10 coins)",
                          style=discord.ButtonStyle.primary,
                          custom_id="buy_ammo")
-    ammo_button.callback = lambda interaction: buy_item(interaction, "A box of Ammo")
+    ammo_button.callback = in_game(lambda interaction: buy_item(interaction, "A box of Ammo"))
     camp_button = Button(
         label="Buy Camp (50 coins)",
         style=discord.ButtonStyle.primary,
         custom_id="buy_camp",
     )
-    camp_button.callback = lambda interaction: buy_item(interaction, "Camp")
+    camp_button.callback = in_game(lambda interaction: buy_item(interaction, "Camp"))
     potion_button = Button(
         label="Buy Healing Potion (50 coins)",
         style=discord.ButtonStyle.primary,
         custom_id="buy_potion"
     )
-    potion_button.callback = lambda interaction: buy_item(interaction, "Healing Potion")
+    potion_button.callback = in_game(lambda interaction: buy_item(interaction, "Healing Potion"))
 
     view = View(timeout=200)
     view.add_item(gun_button)
@@ -1657,7 +3203,7 @@ async def shop_command(ctx):
 @in_hunt_or_allowed_channels() 
 async def stats_command(ctx, target_user: discord.Member = None):
     """Displays the player's stats: coins, inventory, health, and a potion button."""
-    global coin_data, player_data, stats_messages # Access the global dictionary
+    global stats_messages # Access the global dictionary
     user = target_user or ctx.author
     user_id = user.id  # Use user.id to get an integer ID
     await initialize_player_data(str(user_id)) 
@@ -1667,10 +3213,10 @@ async def stats_command(ctx, target_user: discord.Member = None):
     embed.set_thumbnail(url=user.avatar.url)
 
     # --- Wealth ---
-    embed.add_field(name="**🪙 Wealth:**", value=f"{handle_infinity(coin_data.get(str(user_id), 0))} 🪙", inline=True) 
+    embed.add_field(name="**🪙 Wealth:**", value=f"{handle_infinity(game().coin_data.get(str(user_id), 0))} 🪙", inline=True) 
 
     # --- Health (Square Loading Bar Style - 10 blocks, 1 block = 10 health) ---
-    health = player_data[str(user_id)]["health"] # Use str(user_id) here
+    health = game().player_data[str(user_id)]["health"] # Use str(user_id) here
     if health >= INFINITY_THRESHOLD:
         health_bar = "🟥" * 10 
         health_display = "∞/∞"
@@ -1682,10 +3228,10 @@ async def stats_command(ctx, target_user: discord.Member = None):
 
     # --- Inventory ---
     inventory_str = (
-        f"**<:shotgun:1267441675639459964> Shotgun Durability:** {handle_infinity(player_data[str(user_id)]['gun_durability'])}\n" # str(user_id) here
-        f"**<:ammo:1267441870519144518> Ammo:** {handle_infinity(player_data[str(user_id)]['ammo'])}\n" # str(user_id) here
-        f"**🏕️ Camp Durability:** {handle_infinity(player_data[str(user_id)]['camp_durability'])}\n" # str(user_id) here
-        f"**🧪 Healing Potions:** {handle_infinity(player_data[str(user_id)]['healing_potions'])}" # str(user_id) here
+        f"**<:shotgun:1267441675639459964> Shotgun Durability:** {handle_infinity(game().player_data[str(user_id)]['gun_durability'])}\n" # str(user_id) here
+        f"**<:ammo:1267441870519144518> Ammo:** {handle_infinity(game().player_data[str(user_id)]['ammo'])}\n" # str(user_id) here
+        f"**🏕️ Camp Durability:** {handle_infinity(game().player_data[str(user_id)]['camp_durability'])}\n" # str(user_id) here
+        f"**🧪 Healing Potions:** {handle_infinity(game().player_data[str(user_id)]['healing_potions'])}" # str(user_id) here
     )
     embed.add_field(name="**🎒Inventory:**", value=inventory_str, inline=False)
 
@@ -1701,13 +3247,13 @@ async def stats_command(ctx, target_user: discord.Member = None):
             await interaction.response.defer()
             return
 
-        async with camp_users_lock:
-            if player_data[str(user_id)]['healing_potions'] > 0 and player_data[str(user_id)]['health'] < 100:
-                player_data[str(user_id)]['health'] = min(player_data[str(user_id)]['health'] + 5, 100)
-                player_data[str(user_id)]['healing_potions'] -= 1
+        async with game().camp_users_lock:
+            if game().player_data[str(user_id)]['healing_potions'] > 0 and game().player_data[str(user_id)]['health'] < 100:
+                set_health(str(user_id), min(game().player_data[str(user_id)]['health'] + 5, 100))
+                game().player_data[str(user_id)]['healing_potions'] -= 1
 
                 # Update health bar 
-                health = player_data[str(user_id)]['health']
+                health = game().player_data[str(user_id)]['health']
                 health_percentage = int(health // 10)
                 health_bar = "🟥" * health_percentage + "⬛" * (10 - health_percentage)
                 health_display = f"{health}/100"
@@ -1715,30 +3261,30 @@ async def stats_command(ctx, target_user: discord.Member = None):
 
                 # Update inventory string (including healing potions)
                 inventory_str = (
-                    f"**<:shotgun:1267441675639459964> Shotgun Durability:** {handle_infinity(player_data[str(user_id)]['gun_durability'])}\n"
-                    f"**<:ammo:1267441870519144518> Ammo:** {handle_infinity(player_data[str(user_id)]['ammo'])}\n"
-                    f"**🏕️ Camp Durability:** {handle_infinity(player_data[str(user_id)]['camp_durability'])}\n"
-                    f"**🧪 Healing Potions:** {handle_infinity(player_data[str(user_id)]['healing_potions'])}"
+                    f"**<:shotgun:1267441675639459964> Shotgun Durability:** {handle_infinity(game().player_data[str(user_id)]['gun_durability'])}\n"
+                    f"**<:ammo:1267441870519144518> Ammo:** {handle_infinity(game().player_data[str(user_id)]['ammo'])}\n"
+                    f"**🏕️ Camp Durability:** {handle_infinity(game().player_data[str(user_id)]['camp_durability'])}\n"
+                    f"**🧪 Healing Potions:** {handle_infinity(game().player_data[str(user_id)]['healing_potions'])}"
                 )
                 embed.set_field_at(2, name="**🎒Inventory:**", value=inventory_str, inline=False) 
 
                 await save_data('player_data', {
                     'user_id': int(user_id),
-                    'gun_durability': player_data[str(user_id)]['gun_durability'],
-                    'ammo': player_data[str(user_id)]['ammo'],
-                    'health': player_data[str(user_id)]['health'],
-                    'camp_durability': player_data[str(user_id)]['camp_durability'],
-                    'healing_potions': player_data[str(user_id)]['healing_potions']
+                    'gun_durability': game().player_data[str(user_id)]['gun_durability'],
+                    'ammo': game().player_data[str(user_id)]['ammo'],
+                    'health': game().player_data[str(user_id)]['health'],
+                    'camp_durability': game().player_data[str(user_id)]['camp_durability'],
+                    'healing_potions': game().player_data[str(user_id)]['healing_potions']
                 }, upsert=True)
 
                 await message.edit(embed=embed, view=view) 
             else:
-                message_text = "You are already at full health!" if player_data[str(user_id)]['health'] >= 100 else "You have no healing potions!"
+                message_text = "You are already at full health!" if game().player_data[str(user_id)]['health'] >= 100 else "You have no healing potions!"
                 await interaction.response.defer()
                 await interaction.response.send_message(message_text, ephemeral=True)
 
     use_potion_button = Button(label="Use Potion", style=discord.ButtonStyle.red)
-    use_potion_button.callback = use_potion_callback
+    use_potion_button.callback = in_game(use_potion_callback)
     view = View(timeout=300)
     view.add_item(use_potion_button)
 
@@ -1826,7 +3372,7 @@ async def create_market_command(ctx):
 async def market_command(ctx, page: int = 1):
     """Displays the available market listings."""
 
-    global markets, coin_data, market_view  # Access global view object
+    global markets, market_view  # Access global view object
     items_per_page = 5
     total_pages = math.ceil(len(markets) / items_per_page)
 
@@ -1844,7 +3390,7 @@ async def market_command(ctx, page: int = 1):
         await update_market_embed(interaction, new_page)
 
     async def next_page(interaction, current_page: int):
-        global markets, coin_data, market_view
+        global markets, market_view
         new_page = min(total_pages, current_page + 1)
         await update_market_embed(interaction, new_page)
 
@@ -1859,14 +3405,14 @@ async def market_command(ctx, page: int = 1):
         market_view.add_item(previous_button)
         market_view.add_item(next_button)
 
-    sorted_coins = sorted(coin_data.items(),
+    sorted_coins = sorted(game().coin_data.items(),
                           key=lambda item: item[1],
                           reverse=True)
 
     async def update_market_embed(interaction=None,
                                   current_page: int = 1,
                                   view=None):
-        global markets, coin_data, market_view  # Access coin_data here
+        global markets, market_view  # Access coin_data here
         start_index = (current_page - 1) * items_per_page
         end_index = start_index + items_per_page
         market_list = markets[start_index:end_index]
@@ -1925,26 +3471,10 @@ async def buy_command(ctx, market_id: int ):
         return
 
     cost = market['cost'] 
-    if coin_data.get(buyer_id, 0) < cost and coin_data.get(buyer_id, 0) < INFINITY_THRESHOLD: 
+    if await transfer_coins(buyer_id, str(market['seller']), cost) is None:
         await ctx.send("You don't have enough coins to buy this service.")
         return
 
-    coin_data[buyer_id] = coin_data.get(buyer_id, 0) - cost
-    coin_data[buyer_id] -= cost
-    await save_data('coin_data', {
-        'user_id': int(buyer_id),
-        'coins': coin_data[buyer_id]
-    },
-                    upsert=True)
-
-    seller_id_str = str(market['seller'])
-    coin_data[seller_id_str] += cost 
-    await save_data('coin_data', {
-        'user_id': int(market['seller']),
-        'coins': coin_data[seller_id_str]  
-    },
-                    upsert=True)
-
     transaction_id = len(transactions) + 1
     transaction = {
         'id': transaction_id,
@@ -1987,21 +3517,15 @@ async def pay_command(ctx, amount: int, user: discord.User):
     if amount <= 0:
         await ctx.send("Amount must be positive.")
         return
-    # --- Calculate Before Values ---
-    payer_coins_before = handle_infinity(coin_data.get(payer, 0))
-    payee_coins_before = handle_infinity(coin_data.get(payee, 0))
-    # --- Check if payer has enough coins ---
-    if coin_data.get(payer, 0) < amount and coin_data.get(payer, 0) < INFINITY_THRESHOLD:
+    # --- Move the coins (checks the balance and saves both sides) ---
+    balances = await transfer_coins(payer, payee, amount)
+    if balances is None:
         await ctx.send("You don't have enough coins to make this payment.")
         return
-    coin_data[payer] = subtract_with_infinity(coin_data.get(payer, 0), amount)
-    coin_data[payee] = add_with_infinity(coin_data.get(payee, 0), amount)
-    # --- Save Data ---
-    await save_data('coin_data', {'user_id': int(payer), 'coins': coin_data[payer]}, upsert=True)
-    await save_data('coin_data', {'user_id': int(payee), 'coins': coin_data[payee]}, upsert=True)
-    # --- Calculate After Values ---
-    payer_coins_after = handle_infinity(coin_data.get(payer, 0))
-    payee_coins_after = handle_infinity(coin_data.get(payee, 0))
+    payer_coins_before = handle_infinity(balances['payer_before'])
+    payee_coins_before = handle_infinity(balances['payee_before'])
+    payer_coins_after = handle_infinity(balances['payer_after'])
+    payee_coins_after = handle_infinity(balances['payee_after'])
 
     embed = discord.Embed(title="✅ Successful Transaction ✅", color=discord.Color.green())
     embed.add_field(name="From:", value=f"{ctx.author.mention}\n**Before:** {payer_coins_before} coins\n**After:** {payer_coins_after} coins", inline=True)
@@ -2014,12 +3538,11 @@ async def pay_command(ctx, amount: int, user: discord.User):
 @in_allowed_channels()
 async def top_command(ctx, page: int = 1):
     """🪙 View the top users with the most coins (paginated)."""
-    global coin_data
     if page <= 0:
         await ctx.send("Invalid page number. Please enter a positive number.")
         return
 
-    sorted_users = sorted(coin_data.items(),
+    sorted_users = sorted(game().coin_data.items(),
                           key=lambda item: item[1],
                           reverse=True)
 
@@ -2082,21 +3605,20 @@ async def top_command(ctx, page: int = 1):
         await update_leaderboard(new_page, message, interaction, top_command,
                                  view)
 
-    previous_button.callback = previous_page
-    next_button.callback = next_page
+    previous_button.callback = in_game(previous_page)
+    next_button.callback = in_game(next_page)
 
 
 # --- Bottom Command ---
 @bot.command(name='bottom')
 @in_allowed_channels()
 async def bottom_command(ctx, page: int = 1):
-    global coin_data
     """⚠️ Redlist."""
     if page <= 0:
         await ctx.send("Invalid page number. Please enter a positive number.")
         return
 
-    sorted_users = sorted(coin_data.items(), key=lambda item: item[1])
+    sorted_users = sorted(game().coin_data.items(), key=lambda item: item[1])
 
     total_pages = math.ceil(len(sorted_users) / ITEMS_PER_PAGE)
     if page > total_pages:
@@ -2155,8 +3677,8 @@ async def bottom_command(ctx, page: int = 1):
         await update_leaderboard(new_page, message, interaction,
                                  bottom_command, view)
 
-    previous_button.callback = previous_page
-    next_button.callback = next_page
+    previous_button.callback = in_game(previous_page)
+    next_button.callback = in_game(next_page)
 
 
 #update_learderboard
@@ -2164,11 +3686,10 @@ async def update_leaderboard(page: int, message: discord.Message,
                              interaction: discord.Interaction, command_to_call,
                              view: View):
     await interaction.response.defer()
-    global coin_data
     sorted_users = sorted(
-        coin_data.items(), key=lambda item: item[1],
+        game().coin_data.items(), key=lambda item: item[1],
         reverse=True) if command_to_call == top_command else sorted(
-            coin_data.items(), key=lambda item: item[1])
+            game().coin_data.items(), key=lambda item: item[1])
 
     total_pages = math.ceil(len(sorted_users) / ITEMS_PER_PAGE)
     start_index = (page - 1) * ITEMS_PER_PAGE
@@ -2286,8 +3807,7 @@ def create_embed(title, description, color=discord.Color.gold()):
 @has_role(1227279982435500032)
 async def bioweather_command(ctx, weather: str = None):
     """Changes the weather in the game, including Chaos."""
-    global weather_task
-    channel = bot.get_channel(HUNT_CHANNEL_ID)
+    channel = bot.get_channel(game().hunt_channel_id)
     valid_weather = ["Sunny", "Snowy", "Rainy", "Stormy", "Super Storm"]
 
     if weather is not None:
@@ -2308,7 +3828,7 @@ async def delete_all_markets_command(ctx):
     log_admin_command(ctx.author.name, "!delete_all_markets")
     global markets
     markets = []
-    await supabase.table('markets').delete().execute()
+    await storage.delete('markets')
     await ctx.send("All markets have been deleted.")
 
 
@@ -2318,7 +3838,7 @@ async def delete_market_command(ctx, market_id: int):
     log_admin_command(ctx.author.name, f"!delete_market {market_id}")
     global markets
     markets = [market for market in markets if market['id'] != market_id]
-    await supabase.table('markets').delete().eq('id', market_id).execute()
+    await storage.delete('markets', 'id', market_id)
     await ctx.send(f"Market with ID {market_id} has been deleted.")
 
 
@@ -2330,15 +3850,15 @@ async def give_command(ctx, amount: str, user: discord.User):
         amount = int(amount)
         user_id = str(user.id)
 
-        coins_before = coin_data.get(user_id, 0) 
+        coins_before = game().coin_data.get(user_id, 0) 
         coins_before_display = handle_infinity(coins_before)
 
         if amount == 0:
             await ctx.send("Amount cannot be zero.")
             return
-        coin_data[user_id] = add_with_infinity(coins_before, amount) 
-        coin_data[user_id] = INFINITY_THRESHOLD if coin_data[user_id] >= INFINITY_THRESHOLD else coin_data[user_id]
-        coins_after = handle_infinity(coin_data[user_id])
+        game().coin_data[user_id] = add_with_infinity(coins_before, amount) 
+        game().coin_data[user_id] = INFINITY_THRESHOLD if game().coin_data[user_id] >= INFINITY_THRESHOLD else game().coin_data[user_id]
+        coins_after = handle_infinity(game().coin_data[user_id])
 
         embed = discord.Embed(title="✅Success✅", color=discord.Color.green())
         embed.description = f"{user.mention} has {coins_before_display} -> {coins_after} coins!"
@@ -2346,7 +3866,7 @@ async def give_command(ctx, amount: str, user: discord.User):
 
     except ValueError:
         await ctx.send("Invalid amount. Please enter a number.")
-    await save_data('coin_data', {'user_id': int(user_id), 'coins': coin_data[user_id]}, upsert=True) 
+    await save_data('coin_data', {'user_id': int(user_id), 'coins': game().coin_data[user_id]}, upsert=True) 
 
 @bot.command(name='setcoin')
 @has_role(1227279982435500032)
@@ -2356,17 +3876,17 @@ async def setcoin_command(ctx, amount: str, user: discord.User):
         amount = int(amount)  
         user_id = str(user.id)
 
-        coins_before = coin_data.get(user_id, 0)
+        coins_before = game().coin_data.get(user_id, 0)
         coins_before_display = handle_infinity(coins_before)
 
         # --- Directly set the coin amount ---
-        coin_data[user_id] = amount
+        game().coin_data[user_id] = amount
 
         # --- Apply infinity thresholds AFTER setting ---
-        coin_data[user_id] = INFINITY_THRESHOLD if coin_data[user_id] >= INFINITY_THRESHOLD else coin_data[user_id]
-        coin_data[user_id] = NEGATIVE_INFINITY_THRESHOLD if coin_data[user_id] <= NEGATIVE_INFINITY_THRESHOLD else coin_data[user_id]
+        game().coin_data[user_id] = INFINITY_THRESHOLD if game().coin_data[user_id] >= INFINITY_THRESHOLD else game().coin_data[user_id]
+        game().coin_data[user_id] = NEGATIVE_INFINITY_THRESHOLD if game().coin_data[user_id] <= NEGATIVE_INFINITY_THRESHOLD else game().coin_data[user_id]
 
-        coins_after = handle_infinity(coin_data[user_id]) 
+        coins_after = handle_infinity(game().coin_data[user_id]) 
 
         embed = discord.Embed(title="✅Success✅", color=discord.Color.green())
         embed.description = f"{user.mention} has {coins_before_display} -> {coins_after} coins!"
@@ -2374,7 +3894,7 @@ async def setcoin_command(ctx, amount: str, user: discord.User):
 
     except ValueError:
         await ctx.send("Invalid amount. Please enter a number.")
-    await save_data('coin_data', {'user_id': int(user_id), 'coins': coin_data[user_id]}, upsert=True) 
+    await save_data('coin_data', {'user_id': int(user_id), 'coins': game().coin_data[user_id]}, upsert=True) 
 
 
 @bot.command(name='see_all_transactions')
@@ -2418,8 +3938,8 @@ async def set_all_coins_command(ctx, amount: str):
         new_amount = amount
         new_amount = float("inf") if new_amount > 2147483647 else new_amount
         display_amount = handle_infinity(new_amount) 
-        for user_id in coin_data.keys():
-            coin_data[user_id] = new_amount
+        for user_id in game().coin_data.keys():
+            game().coin_data[user_id] = new_amount
         embed = discord.Embed(title="✅Success✅", color=discord.Color.green())
         embed.description = (
             f"All users' coin amounts have been set to {display_amount}!")
@@ -2461,21 +3981,42 @@ async def demote_command(ctx, member: discord.Member):
 @bot.command(name='force_chaos_check')
 @has_role(1227279982435500032)
 async def force_chaos_check_command(ctx):
-    global last_weathers, current_weather
+    last_weathers = game().weather_state.last_weathers
     print(f"Current last_weathers: {last_weathers}")
 
     if len(last_weathers) == 5:
         if len(set(last_weathers)) == 5:
             print("Chaos condition met!")
-            channel = bot.get_channel(HUNT_CHANNEL_ID)
-            current_weather = "Chaos"
+            channel = bot.get_channel(game().hunt_channel_id)
+            # The forecast override resets the history along with the rest of the state
             await change_weather(channel, new_weather="Chaos", duration=CHAOS_DURATION)
-            last_weathers = []  # Clear the list
         else:
             print("Chaos condition NOT met. Duplicate weather in last 5.") 
     else:
         print("Chaos condition NOT met. Not enough unique weather types yet.")
 
+@bot.command(name='replay_hunt')
+@has_role(1227279982435500032)
+async def replay_hunt_command(ctx, hunt_id: str):
+    """Re-rolls a logged hunt from its seed and checks it against the log."""
+    hunt_id = hunt_id.lower()
+    record = await asyncio.to_thread(find_hunt_record, hunt_id)
+    if record is None:
+        await ctx.send(f"No hunt `{hunt_id}` in the hunt log.")
+        return
+    matches, outcome = replay_hunt_record(record)
+    embed = discord.Embed(title=f"Hunt {hunt_id}", color=discord.Color.green() if matches else discord.Color.red())
+    embed.add_field(name="Hunter:", value=f"<@{record['user_id']}>", inline=True)
+    embed.add_field(name="Weather:", value=outcome['rule'], inline=True)
+    embed.add_field(name="When:", value=f"<t:{int(record['at'])}:f>", inline=True)
+    embed.add_field(name="Result:", value=f"{outcome['result']}, {outcome['coins']:,} coins, {outcome['damage']} damage"
+                                          f"{', storm warning' if outcome['storm'] else ''}", inline=False)
+    embed.add_field(name="Mobs Hunted:", value=", ".join(outcome['mobs']) or "-", inline=False)
+    embed.add_field(name="Replay:", value="Matches the log" if matches else
+                    f"Differs from the log (the mob table or rules changed?)\nLogged: {record['outcome']['result']}, "
+                    f"{record['outcome']['coins']:,} coins", inline=False)
+    await ctx.send(embed=embed)
+
 @bot.command(name='edit_user')
 @commands.has_role(1227279982435500032)
 async def edit_user_command(ctx, target_user: discord.User):
@@ -2544,28 +4085,28 @@ async def edit_user_command(ctx, target_user: discord.User):
         modal.add_item(healing_potions_input)
 
         async def modal_submit(interaction: discord.Interaction):
-            global player_data
 
-            if target_user_id not in player_data:
-                player_data[target_user_id] = {}
+            if target_user_id not in game().player_data:
+                game().player_data[target_user_id] = {}
 
             try:
                 # Get values from input fields and apply infinity logic
-                player_data[target_user_id]["gun_durability"] = int(gun_durability_input.value)
-                player_data[target_user_id]["ammo"] = int(ammo_input.value)
-                player_data[target_user_id]["camp_durability"] = int(camp_durability_input.value)
-                player_data[target_user_id]["health"] = int(health_input.value)
-                player_data[target_user_id]["healing_potions"] = int(healing_potions_input.value)
-                for key in ["gun_durability", "ammo", "camp_durability", "healing_potions", "health"]:
-                    if player_data[target_user_id][key] >= INFINITY_THRESHOLD:
-                        player_data[target_user_id][key] = INFINITY_THRESHOLD
+                game().player_data[target_user_id]["gun_durability"] = int(gun_durability_input.value)
+                game().player_data[target_user_id]["ammo"] = int(ammo_input.value)
+                game().player_data[target_user_id]["camp_durability"] = int(camp_durability_input.value)
+                health = min(int(health_input.value), INFINITY_THRESHOLD)
+                game().player_data[target_user_id]["healing_potions"] = int(healing_potions_input.value)
+                for key in ["gun_durability", "ammo", "camp_durability", "healing_potions"]:
+                    if game().player_data[target_user_id][key] >= INFINITY_THRESHOLD:
+                        game().player_data[target_user_id][key] = INFINITY_THRESHOLD
+                set_health(target_user_id, health)
                 await interaction.response.send_message(
                     f"Updated {target_user.mention}'s data:\n\n"
-                    f"**Gun Durability:** {handle_infinity(player_data[target_user_id]['gun_durability'])}\n"
-                    f"**Ammo:** {handle_infinity(player_data[target_user_id]['ammo'])}\n"
-                    f"**Camp Durability:** {handle_infinity(player_data[target_user_id]['camp_durability'])}\n"
-                    f"**Health:** {handle_infinity(player_data[target_user_id]['health'])}\n"
-                    f"**Healing Potions:** {handle_infinity(player_data[target_user_id]['healing_potions'])}",
+                    f"**Gun Durability:** {handle_infinity(game().player_data[target_user_id]['gun_durability'])}\n"
+                    f"**Ammo:** {handle_infinity(game().player_data[target_user_id]['ammo'])}\n"
+                    f"**Camp Durability:** {handle_infinity(game().player_data[target_user_id]['camp_durability'])}\n"
+                    f"**Health:** {handle_infinity(game().player_data[target_user_id]['health'])}\n"
+                    f"**Healing Potions:** {handle_infinity(game().player_data[target_user_id]['healing_potions'])}",
                     ephemeral=True
                 )
 
@@ -2579,19 +4120,19 @@ async def edit_user_command(ctx, target_user: discord.User):
                 'player_data',
                 {
                     'user_id': int(target_user_id),
-                    'gun_durability': player_data[target_user_id]['gun_durability'],
-                    'ammo': player_data[target_user_id]['ammo'],
-                    'health': player_data[target_user_id].get('health', 100),
-                    'camp_durability': player_data[target_user_id].get('camp_durability', 100),
-                    'healing_potions': player_data[target_user_id].get('healing_potions', 0)
+                    'gun_durability': game().player_data[target_user_id]['gun_durability'],
+                    'ammo': game().player_data[target_user_id]['ammo'],
+                    'health': game().player_data[target_user_id].get('health', 100),
+                    'camp_durability': game().player_data[target_user_id].get('camp_durability', 100),
+                    'healing_potions': game().player_data[target_user_id].get('healing_potions', 0)
                 },
                 upsert=True
             )
 
-        modal.on_submit = modal_submit
+        modal.on_submit = in_game(modal_submit)
         await interaction.response.send_modal(modal)
 
-    button.callback = button_callback
+    button.callback = in_game(button_callback)
     view = View(timeout=900)
     view.add_item(button)
     await ctx.reply(embed=embed, view=view)
@@ -2873,21 +4414,14 @@ async def force_pay_command(ctx, amount: int, payer: discord.User, payee: discor
         await ctx.send("Amount must be positive.")
         return
 
-    payer_coins_before = handle_infinity(coin_data.get(payer_id, 0))
-    payee_coins_before = handle_infinity(coin_data.get(payee_id, 0))
-
-    if coin_data.get(payer_id, 0) != INFINITY_THRESHOLD and coin_data.get(payer_id, 0) < amount:
+    balances = await transfer_coins(payer_id, payee_id, amount)
+    if balances is None:
         await ctx.send(f"{payer.mention} doesn't have enough coins to make this payment.")
         return
-
-    coin_data[payer_id] = subtract_with_infinity(coin_data.get(payer_id, 0), amount) 
-    coin_data[payee_id] = add_with_infinity(coin_data.get(payee_id, 0), amount) 
-
-    await save_data('coin_data', {'user_id': int(payer_id), 'coins': coin_data[payer_id]}, upsert=True)
-    await save_data('coin_data', {'user_id': int(payee_id), 'coins': coin_data[payee_id]}, upsert=True)
-
-    payer_coins_after = handle_infinity(coin_data.get(payer_id, 0))
-    payee_coins_after = handle_infinity(coin_data.get(payee_id, 0))
+    payer_coins_before = handle_infinity(balances['payer_before'])
+    payee_coins_before = handle_infinity(balances['payee_before'])
+    payer_coins_after = handle_infinity(balances['payer_after'])
+    payee_coins_after = handle_infinity(balances['payee_after'])
 
     embed = discord.Embed(title="✅ Forceful Transaction ✅", color=discord.Color.red())
     embed.add_field(name="From:", value=f"{payer.mention}\n**Before:** {payer_coins_before} coins\n**After:** {payer_coins_after} coins", inline=True)
@@ -2954,13 +4488,353 @@ async def remove_member(ctx, member: discord.Member):
         AUTHORIZED_MEMBER.remove(member.id)
         await ctx.send(f"{member.mention} has been removed from the authorized members list.")
 
+# --- Benchmarks ---
+def benchmark_mob_sampling(hunts: int = 20000) -> None:
+    """Compares the old per-mob list rebuild + random.choices with the alias tables."""
+    def legacy_draw(min_reward, k):
+        coin_reward = 0
+        mobs_hunted = []
+        for _ in range(k):
+            possible_mobs = [mob for mob in mobs if mob[1] >= min_reward]
+            mob = random.choices(possible_mobs, weights=[mob[2] for mob in possible_mobs], k=1)[0]
+            coin_reward += mob[1]
+            mobs_hunted.append(mob[0])
+        return mobs_hunted, coin_reward
+
+    # Check the tables encode exactly the weighted distribution
+    for threshold, sampler in mob_samplers.items():
+        total = sum(mob[2] for mob in sampler.mobs)
+        error = max(abs(p - next(mob[2] for mob in sampler.mobs if mob[0] == name) / total)
+                    for name, p in sampler.probabilities().items())
+        print(f"threshold {threshold:>5}: {len(sampler.mobs):>2} mobs, max probability error {error:.2e}")
+
+    # A Rainy hunt: the most mobs per hunt
+    sizes = random.choices(*HUNT_RULES["Rainy"]['num_mobs'], k=hunts)
+    for name, draw in (("legacy", legacy_draw), ("alias", draw_mobs)):
+        start = time.perf_counter()
+        for k in sizes:
+            draw(10, k)
+        elapsed = time.perf_counter() - start
+        print(f"{name:>6}: {elapsed / hunts * 1e6:.2f} us per hunt")
+        if name == "legacy":
+            legacy_elapsed = elapsed
+    print(f"speedup: {legacy_elapsed / elapsed:.1f}x")
+
+# --- Economy Simulator ---
+# Offline Monte Carlo over HUNT_RULES, the same table the hunt command uses.
+
+def simulate_hunts(rule: Dict[str, Any], hunts: int, np_rng, camp_rate: float = 0.0, chunk: int = 250000):
+    """Runs `hunts` hunts of one scenario with NumPy. Returns (coins, health_loss, camp_loss) arrays."""
+    import numpy as np
+    pool = mob_samplers[rule['min_reward']].mobs
+    rewards = np.array([mob[1] for mob in pool], dtype=np.int64)
+    chances = np.array([mob[2] for mob in pool], dtype=np.float64)
+    chances /= chances.sum()
+    counts, count_weights = rule['num_mobs']
+    counts = np.array(counts)
+    count_p = np.array(count_weights, dtype=np.float64) / sum(count_weights)
+    coins, health, camp = [], [], []
+    for start in range(0, hunts, chunk):
+        n = min(chunk, hunts - start)
+        num_mobs = np_rng.choice(counts, p=count_p, size=n)
+        # Draw the widest hunt for everyone, then keep the first num_mobs columns
+        draws = rewards[np_rng.choice(len(pool), p=chances, size=(n, counts.max()))]
+        reward = np.where(np.arange(counts.max()) < num_mobs[:, None], draws, 0).sum(axis=1)
+        health_loss = np.zeros(n, dtype=np.int64)
+        camp_loss = np.zeros(n, dtype=np.int64)
+        if 'attempt' in rule:
+            attempted = np_rng.random(n) <= rule['attempt']
+            reward = np.where(attempted, reward, 0)
+            if 'fail' in rule:
+                failed = attempted & (np_rng.random(n) <= rule['fail'])
+                reward = np.where(failed, 0, reward)
+                health_loss += np.where(failed, rule['fail_damage'], 0)
+        if 'exhaust' in rule:
+            exhausted = np_rng.random(n) <= rule['exhaust']
+            reward = np.where(exhausted, 0, reward)
+            health_loss += np.where(exhausted, rule['exhaust_damage'], 0)
+        if 'storm' in rule:
+            warn_chance, damage, degradation = rule['storm']
+            warned = np_rng.random(n) <= warn_chance
+            camped = warned & (np_rng.random(n) < camp_rate)
+            health_loss += np.where(warned & ~camped, damage, 0)
+            camp_loss += np.where(camped, degradation, 0)
+        coins.append(reward)
+        health.append(health_loss)
+        camp.append(camp_loss)
+    return np.concatenate(coins), np.concatenate(health), np.concatenate(camp)
+
+def run_economy_simulator() -> None:
+    import argparse
+    try:
+        import numpy as np
+    except ImportError:
+        print("The simulator needs NumPy: pip install -r requirements-dev.txt")
+        exit(1)
+    parser = argparse.ArgumentParser(prog='simulate', description="Monte Carlo hunt economy per weather. Needs NumPy (requirements-dev.txt).")
+    parser.add_argument('--hunts', type=int, default=1000000, help="hunts per weather")
+    parser.add_argument('--weather', action='append', choices=list(HUNT_RULES), help="limit to these weathers")
+    parser.add_argument('--camp-rate', type=float, default=0.0, help="chance a warned hunter camps in time")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(sys.argv[2:])
+    np_rng = np.random.default_rng(args.seed)
+    print(f"{'weather':<24}{'mean':>12}{'std':>14}{'p50':>10}{'p90':>10}{'p99':>12}{'p99.9':>12}{'hp/hunt':>9}{'camp/hunt':>10}{'sec':>6}")
+    for name in args.weather or HUNT_RULES:
+        start = time.perf_counter()
+        coins, health_loss, camp_loss = simulate_hunts(HUNT_RULES[name], args.hunts, np_rng, args.camp_rate)
+        p50, p90, p99, p999 = np.percentile(coins, [50, 90, 99, 99.9])
+        print(f"{name:<24}{coins.mean():>12,.1f}{coins.std():>14,.1f}{p50:>10,.0f}{p90:>10,.0f}{p99:>12,.0f}{p999:>12,.0f}"
+              f"{health_loss.mean():>9.2f}{camp_loss.mean():>10.2f}{time.perf_counter() - start:>6.2f}")
+
+def replay_hunt_log() -> None:
+    """Re-rolls every hunt in a log file (default HUNT_LOG_PATH) and reports mismatches."""
+    path = sys.argv[2] if len(sys.argv) > 2 else HUNT_LOG_PATH
+    replayed = mismatched = 0
+    start = time.perf_counter()
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            record = json.loads(line)
+            matches, _ = replay_hunt_record(record)
+            replayed += 1
+            if not matches:
+                mismatched += 1
+                print(f"mismatch: hunt {record['seed']} ({record['outcome']['rule']})")
+    elapsed = time.perf_counter() - start
+    print(f"replayed {replayed} hunts, {mismatched} mismatched, {replayed / max(elapsed, 1e-9):,.0f} hunts/s")
+
+# --- Weather Simulator ---
+# Runs the real weather code on a VirtualClock: days of weather in seconds.
+
+class VirtualClock(WeatherClock):
+    """Clock that only moves when advanced. Sleepers wake in deadline order, with no real waiting."""
+
+    def __init__(self, wall_start: float = None):
+        self.time = 0.0
+        self.wall_start = time.time() if wall_start is None else wall_start
+        self.timers: List[tuple] = []  # heap of (deadline, seq, future)
+        self.seq = 0
+
+    def now(self) -> float:
+        return self.time
+
+    def wall(self) -> float:
+        return self.wall_start + self.time
+
+    async def sleep(self, delay: float) -> None:
+        future = asyncio.get_running_loop().create_future()
+        self.seq += 1
+        heapq.heappush(self.timers, (self.time + max(0.0, delay), self.seq, future))
+        await future
+
+    async def wait(self, event: asyncio.Event, timeout: float) -> bool:
+        if not event.is_set():
+            waiter = asyncio.ensure_future(event.wait())
+            timer = asyncio.ensure_future(self.sleep(timeout))
+            try:
+                await asyncio.wait((waiter, timer), return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                waiter.cancel()
+                timer.cancel()
+        return event.is_set()
+
+    def next_deadline(self) -> Optional[float]:
+        # Cancelled sleepers stay in the heap until they reach the top
+        while self.timers and self.timers[0][2].done():
+            heapq.heappop(self.timers)
+        return self.timers[0][0] if self.timers else None
+
+    def advance_to(self, deadline: float) -> None:
+        self.time = max(self.time, deadline)
+        while self.timers and self.timers[0][0] <= self.time:
+            future = heapq.heappop(self.timers)[2]
+            if not future.done():
+                future.set_result(None)
+
+class SimulatedChannel:
+    """Stands in for the hunt channel and counts what would be sent."""
+
+    def __init__(self):
+        self.sent = 0
+
+    async def send(self, *args, **kwargs):
+        self.sent += 1
+
+class SimulatedStorage(StorageBackend):
+    """In-memory storage for the weather simulator; only what weather persistence uses."""
+
+    def __init__(self):
+        self.rows: Dict[tuple, Dict[str, Any]] = {}
+        self.writes = 0
+
+    async def select_one(self, table_name, column, value, filters=None):
+        return self.rows.get((table_name, value))
+
+    async def read_page(self, table_name, columns, order_by, start, stop, since=None, filters=None):
+        return []
+
+    async def insert(self, table_name, row):
+        await self.bulk_upsert(table_name, [row], 'id')
+
+    async def update(self, table_name, row, column='user_id'):
+        await self.bulk_upsert(table_name, [row], column)
+
+    async def bulk_upsert(self, table_name, rows, on_conflict):
+        self.writes += 1
+        for row in rows:
+            self.rows[(table_name, row[on_conflict])] = json.loads(json.dumps(row))
+
+    async def delete(self, table_name, column=None, value=None):
+        self.rows = {key: row for key, row in self.rows.items()
+                     if key[0] != table_name or (column and row.get(column) != value)}
+
+async def settle_weather_tasks(clock: VirtualClock, live_tasks: set, stats: Counter) -> None:
+    """Lets every woken task run until all of them are parked on the clock again."""
+    idle, mark = 0, None
+    while idle < 5:
+        await asyncio.sleep(0)
+        for task in asyncio.all_tasks() - live_tasks:
+            live_tasks.add(task)
+            stats['tasks'] += 1
+        state = (clock.seq, len(clock.timers))
+        idle = idle + 1 if state == mark else 0
+        mark = state
+    for task in [task for task in live_tasks if task.done()]:
+        live_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            stats['failed'] += 1
+            print(f"task {task.get_coro().__name__} failed: {task.exception()!r}")
+
+async def simulate_weather_days(days: float, seed: Optional[str]) -> Dict[str, Any]:
+    """Runs the weather controller for `days` of virtual time and collects what happened."""
+    global weather_clock, storage
+    clock = VirtualClock()
+    weather_clock = clock
+    storage = SimulatedStorage()
+    simulated = GuildGame(DEFAULT_GUILD_ID)
+    simulated.weather_state = WeatherState(seed)
+    simulated.weather_controller = WeatherController(channel=SimulatedChannel())
+    use_game(simulated)
+    # Everything the controller plays must match the timeline forecast at the start
+    forecast = [(spell['index'], spell['weather'], spell['sub_weathers'])
+                for spell in game().weather_forecast.upcoming(int(days * 86400 / CHAOS_SUB_WEATHER_DURATION) + 2)]
+    played = []
+    this_task = asyncio.current_task()
+    live_tasks = {this_task}
+    stats = Counter()
+    # Tasks that fail between two checks are reported by the loop when they are dropped
+    asyncio.get_running_loop().set_exception_handler(
+        lambda loop, context: stats.update(failed=1) or print(f"task failed: {context['message']}"))
+    previous_spell = game().weather_state.spell['index']
+
+    game().weather_controller.start()
+    end = days * 86400
+    while True:
+        await settle_weather_tasks(clock, live_tasks, stats)
+        if game().weather_state.spell['index'] != previous_spell:
+            previous_spell = game().weather_state.spell['index']
+            played.append((previous_spell, game().weather_state.weather, game().weather_state.spell['sub_weathers']))
+            stats['chaos_spells'] += game().weather_state.chaos
+        if game().weather_state.chaos and game().weather_state.sub_weather is not None:
+            stats['wrong_sub_weather'] += game().weather_state.sub_weather != game().weather_state.spell['sub_weathers'][
+                int((clock.time - game().weather_state.starts_at) // CHAOS_SUB_WEATHER_DURATION)]
+        live = [task for task in live_tasks if task is not this_task]
+        stats['peak_tasks'] = max(stats['peak_tasks'], len(live))
+        cycles = sum(task.get_coro().__name__ == 'blizzard_cycle' for task in live)
+        stats['overlapping_blizzard_cycles'] += cycles > 1
+        stats['blizzard_outside_snow'] += game().blizzard_event.is_set() and not game().weather_state.snowy
+
+        deadline = clock.next_deadline()
+        step_to = end if deadline is None else min(deadline, end)
+        elapsed = step_to - clock.time
+        stats['chaos_seconds'] += elapsed * game().weather_state.chaos
+        stats['snow_seconds'] += elapsed * game().weather_state.snowy
+        stats['blizzard_seconds'] += elapsed * (game().weather_state.snowy and game().blizzard_event.is_set())
+        if deadline is None or deadline > end:
+            break
+        clock.advance_to(deadline)
+
+    # Shut down and make sure nothing is left running
+    game().weather_controller.task.cancel()
+    stop_blizzard()
+    if game().weather_persist_task:
+        await game().weather_persist_task
+    await settle_weather_tasks(clock, live_tasks, stats)
+    leaked = [task for task in asyncio.all_tasks() if task is not this_task]
+
+    # The last saved row must resume to the state we stopped in
+    saved = game().weather_state.to_dict()
+    resumed = WeatherState()
+    resumed.restore((await storage.select_one(GAME_STATE_TABLE, 'id', game().guild_id))['state'])
+    stats['resume_mismatch'] = resumed.to_dict() != saved
+    stats['forecast_mismatch'] = played != forecast[:len(played)]
+
+    stats.update(transitions=game().weather_controller.transitions, errors=game().weather_controller.errors,
+                 messages=game().weather_controller.channel.sent, state_writes=storage.writes, timers=clock.seq,
+                 leaked=len(leaked))
+    return stats
+
+def run_weather_simulator() -> None:
+    import argparse
+    import contextlib
+    import io
+    parser = argparse.ArgumentParser(prog='simulate_weather', description="Runs days of weather on a virtual clock.")
+    parser.add_argument('--days', type=float, default=7)
+    parser.add_argument('--seed', default=None, help="weather seed (default WEATHER_SEED)")
+    args = parser.parse_args(sys.argv[2:])
+    start = time.perf_counter()
+    # The weather code logs every transition; keep only the report
+    with contextlib.redirect_stdout(io.StringIO()) as log:
+        stats = asyncio.run(simulate_weather_days(args.days, args.seed))
+    elapsed = time.perf_counter() - start
+    errors = [line for line in log.getvalue().splitlines() if 'failed' in line]
+    days = args.days
+    print(f"simulated {days:g} days in {elapsed:.2f}s ({days * 86400 / elapsed:,.0f}x real time)")
+    print(f"transitions {stats['transitions']}, messages {stats['messages']}, state writes {stats['state_writes']}")
+    print(f"chaos: {stats['chaos_spells']} spells, {stats['chaos_spells'] / days:.2f}/day, "
+          f"{stats['chaos_seconds'] / (days * 864):.1f}% of the time")
+    print(f"blizzard coverage: {stats['blizzard_seconds'] / max(stats['snow_seconds'], 1) * 100:.1f}% of "
+          f"{stats['snow_seconds'] / 3600:.1f}h snow")
+    print(f"tasks: {stats['tasks']} created, peak {stats['peak_tasks']} live, {stats['leaked']} leaked, "
+          f"{stats['failed']} failed; {stats['timers']} timers")
+    for line in errors:
+        print(line)
+    problems = {name: stats[name] for name in ('leaked', 'failed', 'errors', 'overlapping_blizzard_cycles',
+                                                'blizzard_outside_snow', 'resume_mismatch', 'forecast_mismatch',
+                                                'wrong_sub_weather') if stats[name]}
+    assert not problems and not errors, f"weather simulation found problems: {problems}"
+
 # --- Run Bot ---
+# Offline tools: python "main (3).py" <tool>  (they don't open storage or the journal)
+# `simulate` also needs NumPy, which is only in requirements-dev.txt
+CLI_TOOLS = {
+    'bench_mobs': benchmark_mob_sampling,
+    'simulate': run_economy_simulator,
+    'replay_hunts': replay_hunt_log,
+    'simulate_weather': run_weather_simulator,
+}
+
+if __name__ == "__main__" and len(sys.argv) > 1:
+    if sys.argv[1] not in CLI_TOOLS:
+        print(f"Unknown tool {sys.argv[1]!r}. Available: {', '.join(CLI_TOOLS)} "
+              f"(simulate needs NumPy: pip install -r requirements-dev.txt)")
+        exit(1)
+    CLI_TOOLS[sys.argv[1]]()
+    exit(0)
+
 # Get Discord token from environment variables
 discord_token = os.getenv("DISCORD_TOKEN")
 if not discord_token:
     print("Error: DISCORD_TOKEN not found in .env file")
     exit(1)
+# Existing rows, the hunt channel and DMs belong to this guild; without it they would be lost to guild 0
+if not DEFAULT_GUILD_ID:
+    print("Error: DEFAULT_GUILD_ID not found in .env file (set it to the id of the bot's original guild)")
+    exit(1)
+open_storage()
+# Unmigrated tables would fail every guild read and write, so don't start on them
+guild_tables_problem = asyncio.run(check_guild_tables())
+if guild_tables_problem:
+    print(f"Error: {guild_tables_problem}. Run migrations/001_guild_partition.sql on the database first")
+    exit(1)
 
 bot.run(discord_token)
-
-
@@ -0,0 +1,33 @@
+-- Per-guild economy tables (Supabase / Postgres).
+--
+-- Run once, before starting a bot that partitions coin_data and player_data by
+-- guild. Existing rows are moved to the bot's original guild: set
+-- default_guild_id below to the same value as DEFAULT_GUILD_ID in .env.
+-- The SQLite backend and the local journal migrate themselves on startup.
+
+do $$
+declare
+    default_guild_id bigint := 0;  -- DEFAULT_GUILD_ID
+begin
+    if default_guild_id = 0 then
+        raise exception 'Set default_guild_id to DEFAULT_GUILD_ID before running this migration';
+    end if;
+
+    alter table coin_data add column if not exists guild_id bigint;
+    update coin_data set guild_id = default_guild_id where guild_id is null;
+    alter table coin_data alter column guild_id set not null;
+    alter table coin_data drop constraint if exists coin_data_pkey;
+    alter table coin_data add primary key (guild_id, user_id);
+
+    alter table player_data add column if not exists guild_id bigint;
+    update player_data set guild_id = default_guild_id where guild_id is null;
+    alter table player_data alter column guild_id set not null;
+    alter table player_data drop constraint if exists player_data_pkey;
+    alter table player_data add primary key (guild_id, user_id);
+
+    -- One weather row per guild, keyed by the guild id
+    alter table game_state alter column id type bigint;
+end $$;
+
+-- Let PostgREST see the new column and keys straight away
+notify pgrst, 'reload schema';